@@ -0,0 +1,4 @@
+"""In-process access to the Databricks AI Security Framework (DASF) compendium."""
+from .engine import DASFEngine, load_engine
+
+__all__ = ["DASFEngine", "load_engine"]
@@ -0,0 +1,252 @@
+"""Command line entry point: ``python -m dasf <command>``.
+
+``ingest`` writes the DASF tables with the local (no JVM) or the Spark backend,
+``validate`` checks the compendium TSVs before anything is written, ``parity`` checks that both backends produce identical tables, ``benchmark``
+replays the assistant's question set against the in-process engine, ``rollout`` deploys
+the tables and functions to many workspaces and catalogs concurrently and ``replay``
+asks the question set to a Genie space (or its local mock) concurrently.
+"""
+import argparse
+import json
+import sys
+
+from .sheets import RESOURCES_DIR
+
+
+def _spark():
+    from pyspark.sql import SparkSession
+
+    return SparkSession.builder.getOrCreate()
+
+
+def ingest(args):
+    from .ingest import LocalBackend, SparkBackend
+    from .metrics import StageMetrics
+    from .validate import ValidationError
+
+    if args.backend == "spark" and (not args.catalog or not args.schema):
+        raise SystemExit("--catalog and --schema are required with --backend spark")
+    # The stage metrics are also kept for a run that fails validation
+    metrics = StageMetrics()
+    try:
+        if args.backend == "local":
+            paths = LocalBackend(args.output, args.format).ingest(args.resources, metrics, args.revision, args.changes)
+            for table, path in paths.items():
+                print(f"{table}: {path}")
+        else:
+            changed = SparkBackend(_spark(), args.catalog, args.schema).ingest(args.resources, metrics, args.revision, args.changes)
+            print(f"changed tables: {', '.join(sorted(changed)) or 'none'}")
+    except ValidationError as e:
+        raise SystemExit(f"ingest: {e}")
+    finally:
+        print(metrics.summary())
+        if args.metrics:
+            metrics.write_json(args.metrics)
+    return 0
+
+
+def validate(args):
+    from .validate import validate_resources
+
+    report = validate_resources(args.resources, args.strict)
+    if args.output:
+        report.write_json(args.output)
+    print(json.dumps(report.as_dict(), indent=2, ensure_ascii=False))
+    return 0 if report.ok else 1
+
+
+def parity(args):
+    from .ingest import parity as compare
+
+    differences = compare(_spark(), args.resources)
+    for table, (only_spark, only_local) in differences.items():
+        print(f"{table}: {len(only_spark)} rows only in Spark, {len(only_local)} rows only in Python")
+        for row in only_spark[: args.show]:
+            print(f"  spark:  {row}")
+        for row in only_local[: args.show]:
+            print(f"  python: {row}")
+    if not differences:
+        print("Spark and Python ingestion produce identical tables")
+    return 1 if differences else 0
+
+
+def benchmark(args):
+    from .benchmark import benchmark as run
+
+    report = run(args.iterations, args.resources, args.questions, args.graph_iterations)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+def rollout(args):
+    from .rollout import Target, load_targets, report, rollout as deploy
+    from .validate import ValidationError
+
+    targets = load_targets(args.targets) if args.targets else []
+    mock = None
+    if args.mock:
+        from .mock_server import MockWorkspace
+
+        mock = MockWorkspace(fail_requests=args.mock_failures).start()
+        targets = [t._replace(workspace=mock.url) for t in targets] or [
+            Target(mock.url, f"dasf_mock_{i}", "dasf", "resources", "mock") for i in range(4)
+        ]
+    elif not targets:
+        raise SystemExit("--targets is required without --mock")
+    try:
+        statuses = deploy(targets, args.resources, args.workers, args.force, args.retries, args.backoff)
+    except ValidationError as e:
+        raise SystemExit(f"rollout: {e}")
+    finally:
+        if mock is not None:
+            mock.stop()
+    result = report(statuses)
+    if mock is not None:
+        result["mock"] = {"requests": mock.requests, "connections": len(mock.connections), "statements": len(mock.statements)}
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 1 if result["failed"] else 0
+
+
+def replay(args):
+    from .replay import GenieClient, engine_answerer, ingested_engine, load_question_set, replay as ask, report
+
+    if args.mock or args.expand:
+        from .engine import DASFEngine
+
+        try:
+            engine = ingested_engine(args.tables) if args.tables else DASFEngine.from_resources(args.resources)
+        except ValueError as e:
+            raise SystemExit(f"replay --tables: {e}")
+    questions = load_question_set(args.questions, args.expand, engine if args.expand else None)
+    workspace, space_id, mock = args.workspace, args.space_id, None
+    if args.mock:
+        from .mock_server import MockWorkspace
+
+        mock = MockWorkspace(fail_requests=args.mock_failures, pending_polls=args.mock_polls, genie=engine_answerer(engine, questions)).start()
+        workspace, space_id = mock.url, space_id or "mock"
+    elif not workspace or not space_id:
+        raise SystemExit("--workspace and --space-id are required without --mock")
+    client = GenieClient(
+        workspace, space_id, concurrency=args.concurrency, retries=args.retries, backoff=args.backoff,
+        poll_interval=args.poll_interval, max_poll_interval=args.max_poll_interval, timeout=args.timeout,
+    )
+    try:
+        results, elapsed = ask(client, questions, args.repeat)
+    finally:
+        if mock is not None:
+            mock.stop()
+    result = report(results, elapsed, client.pool.opened)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(json.dumps({k: v for k, v in result.items() if k != "results"}, indent=2, ensure_ascii=False))
+    return 1 if result["failed"] or result["mismatched"] else 0
+
+
+def search(args):
+    from .retrieval import RetrievalIndex
+    from .sheets import load_controls, load_risks
+
+    try:
+        if args.index:
+            index = RetrievalIndex.load(args.index)
+        else:
+            index = RetrievalIndex.from_tables(load_risks(args.resources), load_controls(args.resources), embeddings=args.method != "bm25")
+        results = index.search(args.query, args.k, args.entity_type, args.method)
+    except (ImportError, ValueError) as e:
+        raise SystemExit(f"search --method {args.method}: {e}")
+    print(json.dumps([r._asdict() for r in results], indent=2, ensure_ascii=False))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m dasf", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="write the DASF tables from the compendium TSVs")
+    ingest_parser.add_argument("--backend", choices=("local", "spark"), default="local")
+    ingest_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    ingest_parser.add_argument("--output", default="dasf_tables", help="output directory of the local backend")
+    ingest_parser.add_argument("--format", choices=("parquet", "jsonl"), help="local output format (parquet when pyarrow is installed)")
+    ingest_parser.add_argument("--revision", help="revision to file the compendium under in the revision history (its latest DASF revision by default)")
+    ingest_parser.add_argument("--metrics", help="append the stage metrics to this JSON Lines log")
+    ingest_parser.add_argument("--changes", help="also append the rows this ingest inserted, updated or deleted to this JSON Lines stream")
+    ingest_parser.add_argument("--catalog", help="Unity Catalog catalog of the spark backend")
+    ingest_parser.add_argument("--schema", help="schema of the spark backend")
+    ingest_parser.set_defaults(run=ingest)
+
+    validate_parser = commands.add_parser("validate", help="check the compendium TSVs' headers, ids, references and Yes/No cells and report the findings as JSON")
+    validate_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    validate_parser.add_argument("--strict", action="store_true", help="fail on dangling references and disagreements between the sheets too")
+    validate_parser.add_argument("--output", help="also write the JSON report to this file")
+    validate_parser.set_defaults(run=validate)
+
+    parity_parser = commands.add_parser("parity", help="compare the tables produced by the Spark and local backends")
+    parity_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    parity_parser.add_argument("--show", type=int, default=5, help="differing rows to print per table")
+    parity_parser.set_defaults(run=parity)
+
+    benchmark_parser = commands.add_parser("benchmark", help="replay the question set and report latency percentiles as JSON")
+    benchmark_parser.add_argument("--iterations", type=int, default=1000)
+    benchmark_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    benchmark_parser.add_argument("--graph-iterations", type=int, default=20, help="repetitions of the graph build and set cover timings")
+    benchmark_parser.add_argument("--questions", help="question set to replay (resources/questions.txt and the benchmark questions by default)")
+    benchmark_parser.add_argument("--output", help="also write the JSON report to this file")
+    benchmark_parser.set_defaults(run=benchmark)
+
+    rollout_parser = commands.add_parser("rollout", help="deploy the tables and functions to many targets and report each one's status as JSON")
+    rollout_parser.add_argument("--targets", help="JSON list of {workspace, catalog, schema, volume, warehouse_id} targets")
+    rollout_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    rollout_parser.add_argument("--workers", type=int, default=4, help="targets deployed concurrently")
+    rollout_parser.add_argument("--retries", type=int, default=5, help="retries of a request after a transient failure")
+    rollout_parser.add_argument("--backoff", type=float, default=0.5, help="initial retry delay in seconds, doubled per retry")
+    rollout_parser.add_argument("--force", action="store_true", help="rewrite every table and function regardless of fingerprints")
+    rollout_parser.add_argument("--mock", action="store_true", help="deploy to a local mock of the statement API instead")
+    rollout_parser.add_argument("--mock-failures", type=int, default=0, help="requests the mock answers with HTTP 503")
+    rollout_parser.add_argument("--output", help="also write the JSON report to this file")
+    rollout_parser.set_defaults(run=rollout)
+
+    replay_parser = commands.add_parser("replay", help="ask the question set to a Genie space concurrently and report latency and regressions as JSON")
+    replay_parser.add_argument("--workspace", help="workspace URL of the Genie space")
+    replay_parser.add_argument("--space-id", help="id of the Genie space")
+    replay_parser.add_argument("--questions", help="question set to ask (resources/questions.txt and the benchmark questions by default)")
+    replay_parser.add_argument("--expand", action="store_true", help="also ask templated questions about every risk id and mitigation control id")
+    replay_parser.add_argument("--repeat", type=int, default=1, help="times the question set is asked")
+    replay_parser.add_argument("--concurrency", type=int, default=8, help="questions in flight, and pooled connections")
+    replay_parser.add_argument("--retries", type=int, default=5, help="retries of a request after a transient failure")
+    replay_parser.add_argument("--backoff", type=float, default=0.5, help="initial retry delay in seconds, doubled per retry")
+    replay_parser.add_argument("--poll-interval", type=float, default=0.5, help="initial message polling interval in seconds, doubled per poll")
+    replay_parser.add_argument("--max-poll-interval", type=float, default=5.0, help="longest message polling interval in seconds")
+    replay_parser.add_argument("--timeout", type=float, default=600, help="seconds a question may take")
+    replay_parser.add_argument("--mock", action="store_true", help="ask a local mock Genie space answering from the DASF tables instead")
+    replay_parser.add_argument("--tables", help="tables written by the local ingest backend for the mock to answer from (parsed from --resources otherwise)")
+    replay_parser.add_argument("--mock-failures", type=int, default=0, help="requests the mock answers with HTTP 503")
+    replay_parser.add_argument("--mock-polls", type=int, default=1, help="polls the mock keeps a message executing for")
+    replay_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    replay_parser.add_argument("--output", help="also write the JSON report, with every question's result, to this file")
+    replay_parser.set_defaults(run=replay)
+
+    search_parser = commands.add_parser("search", help="rank risks and controls by how well their descriptions match a free-text query")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=5, help="number of results")
+    search_parser.add_argument("--entity-type", choices=("", "risk", "control"), default="", help="restrict the results to risks or controls")
+    search_parser.add_argument("--method", choices=("bm25", "embedding", "hybrid"), default="bm25", help="embedding and hybrid need NumPy")
+    search_parser.add_argument("--index", help="retrieval index saved by the local ingest backend (built from --resources otherwise)")
+    search_parser.add_argument("--resources", default=RESOURCES_DIR, help="directory of the compendium TSVs")
+    search_parser.set_defaults(run=search)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Local latency benchmark of the assistant's question set.
+
+The function calls behind each entry of ``resources/questions.txt`` and of
+:data:`BENCHMARK_QUESTIONS` are replayed many times against the in-process
+:class:`dasf.engine.DASFEngine`, whose methods take the parameters of the UC functions
+declared in :mod:`dasf.functions` and return their rows.
+The latency percentiles and row counts per function are reported as JSON that can be
+diffed across commits, along with the build and set cover timings of the risk/control
+graph over the full compendium.
+"""
+import json
+import os
+import platform
+import time
+from collections import defaultdict
+
+from .engine import DASFEngine
+from .ingest import local_tables
+from .graph import RiskControlGraph
+from .incremental import combined_fingerprint, file_fingerprint
+from .schema import CONTROLS, MAPPING, RISKS
+from .sheets import RESOURCES_DIR
+
+QUESTIONS_FILE = os.path.join(RESOURCES_DIR, "questions.txt")
+
+# Questions replayed after those of resources/questions.txt, reaching the functions its sample questions do not
+BENCHMARK_QUESTIONS = (
+    "What is the smallest set of mitigation controls that covers all RAG risks?",
+    "Get details of risk missing data classification",
+    "Which risks and controls deal with prompt injection through retrieved documents?",
+    "What changed in the latest DASF revision?",
+    "How many risks are there per system component?",
+)
+
+# Function calls behind each question of resources/questions.txt and BENCHMARK_QUESTIONS; questions answered without a function map to ()
+QUESTION_CALLS = {
+    "Who are you?": (),
+    "What is DASF?": (),
+    "How many risks are there in the AI system according to DASF? List all risks in an AI system": (
+        ("dasf_summary", ("total",)),
+        ("risks_in_ai_system_components", ()),
+    ),
+    "What risks apply for a RAG deployment model?": (
+        ("risks_for_deployment_models", (2, False)),
+    ),
+    "Get details of risk Data poisoning": (
+        ("risks_in_ai_system_component_by_risk_name", ("Data poisoning",)),
+    ),
+    "List mitigation controls and AWS documentation links for the risk id Datasets 3.1": (
+        ("databricks_ai_mitigation_controls_by_risk_id", ("Datasets 3.1",)),
+    ),
+    "Just limit the above out put to mitigation control id, conrol and aws documentation link": (
+        ("databricks_ai_mitigation_controls_by_risk_id_projected", ("Datasets 3.1", "docs_aws")),
+    ),
+    "What other risks are covered by the mitigation control DASF 1?": (
+        ("risks_in_ai_system_by_mitigation_controls_id", ("DASF 1",)),
+    ),
+    "What is the smallest set of mitigation controls that covers all RAG risks?": (
+        ("dasf_minimum_control_set", ("RAG", "")),
+    ),
+    "Get details of risk missing data classification": (
+        ("risks_in_ai_system_component_by_risk_name", ("missing data classification",)),
+    ),
+    "Which risks and controls deal with prompt injection through retrieved documents?": (
+        ("dasf_search_text", ("prompt injection through retrieved documents",)),
+    ),
+    "How many risks are there per system component?": (
+        ("dasf_summary", ("system_component",)),
+    ),
+    "What changed in the latest DASF revision?": (
+        ("dasf_revision_changes", ()),
+    ),
+}
+
+def read_questions(path=None):
+    """Questions of ``path``, one per line; those of resources/questions.txt followed by BENCHMARK_QUESTIONS by default."""
+    if path is None:
+        return read_questions(QUESTIONS_FILE) + list(BENCHMARK_QUESTIONS)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def question_calls(questions):
+    """Function calls behind ``questions``, and the questions without a known mapping."""
+    calls, unmapped = [], []
+    for question in questions:
+        if question in QUESTION_CALLS:
+            calls.extend(QUESTION_CALLS[question])
+        else:
+            unmapped.append(question)
+    return calls, unmapped
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run(call, calls, iterations=1000):
+    """Replay ``calls`` ``iterations`` times through ``call(function, *args)``.
+
+    Returns per function the number of calls, p50/p95/p99/max latency in milliseconds
+    and the rows returned by the last call of each argument list.
+    """
+    latencies = defaultdict(list)
+    rows = defaultdict(dict)
+    for _ in range(iterations):
+        for function, args in calls:
+            start = time.perf_counter()
+            result = call(function, *args)
+            latencies[function].append((time.perf_counter() - start) * 1000)
+            rows[function][json.dumps(args)] = len(result)
+    report = {}
+    for function, values in sorted(latencies.items()):
+        values.sort()
+        report[function] = {
+            "calls": len(values),
+            "p50_ms": round(percentile(values, 0.50), 4),
+            "p95_ms": round(percentile(values, 0.95), 4),
+            "p99_ms": round(percentile(values, 0.99), 4),
+            "max_ms": round(values[-1], 4),
+            "rows": dict(sorted(rows[function].items())),
+        }
+    return report
+
+
+def _timed(function, iterations):
+    values = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = function()
+        values.append((time.perf_counter() - start) * 1000)
+    values.sort()
+    timings = {"p50_ms": round(percentile(values, 0.50), 4), "max_ms": round(values[-1], 4)}
+    return timings, result
+
+
+def graph_benchmark(tables, iterations=20):
+    """Timings of the risk/control graph over the full compendium: building its bitsets, the
+    co-mitigation pairs and the greedy and exact control covers of every deployment model and component scope."""
+    risks, mapping = tables[RISKS.table], tables[MAPPING.table]
+    build, graph = _timed(lambda: RiskControlGraph(risks, mapping), iterations)
+    comitigation, pairs = _timed(graph.comitigation_rows, iterations)
+    greedy, greedy_rows = _timed(lambda: graph.control_cover_rows(risks, exact=False), iterations)
+    exact, exact_rows = _timed(lambda: graph.control_cover_rows(risks), iterations)
+    return {
+        "iterations": iterations,
+        "risks": len(graph.risk_ids),
+        "controls": len(graph.control_ids),
+        "edges": len(mapping),
+        "build": build,
+        "comitigation": dict(comitigation, rows=len(pairs)),
+        "greedy_cover": dict(greedy, rows=len(greedy_rows)),
+        "exact_cover": dict(exact, rows=len(exact_rows), optimal=all(row.optimal for row in exact_rows)),
+        "scopes": len({(row.deployment_models_mask, row.component_name) for row in exact_rows}),
+    }
+
+
+def benchmark(iterations=1000, resources_dir=RESOURCES_DIR, questions_file=None, graph_iterations=20):
+    """Benchmark report of the question set against the in-process engine, as a JSON-serializable dict."""
+    tables = local_tables(resources_dir)
+    engine = DASFEngine.from_resources(resources_dir)
+
+    def call(function, *args):
+        return getattr(engine, function)(*args)
+
+    calls, unmapped = question_calls(read_questions(questions_file))
+    return {
+        "iterations": iterations,
+        "data_version": combined_fingerprint(*(file_fingerprint(os.path.join(resources_dir, sheet.file)) for sheet in (RISKS, CONTROLS))),
+        "python": platform.python_version(),
+        "unmapped_questions": unmapped,
+        "functions": run(call, calls, iterations),
+        "graph": graph_benchmark(tables, graph_iterations),
+    }
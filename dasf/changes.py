@@ -0,0 +1,100 @@
+"""Row-level change events of the risks and controls tables, load after load.
+
+Every ingest replaces the rows of ``risks_in_ai_system_components`` and
+``databricks_ai_mitigation_controls`` with those of the compendium it parsed. To tell downstream
+systems what an ingest changed, the rows of the previous load are compared with the new
+rows by key (risk_id and mitigation_control_id): a key only in the new rows is an insert,
+a key only in the previous rows a delete, and a key in both whose row hash differs an
+update, listing the columns whose values differ. Values are compared as text (see
+:func:`dasf.revisions.field_text`), so rows read back from Spark, the SQL Statement
+Execution API or the local files compare equal to freshly parsed ones.
+
+The events of a load are appended to ``dasf_change_log`` under the next load version,
+and optionally to a JSON Lines stream. A load that changes nothing appends nothing and
+takes no version, so a consumer syncs by applying the events of the versions after the
+last one it saw.
+"""
+import json
+import os
+from collections import namedtuple
+
+from .crosswalk import CONTROL, RISK
+from .ids import control_id_sort_key, risk_id_sort_key
+from .revisions import HISTORIES, field_text, row_hash
+from .schema import CHANGE_LOG, column_names
+
+# Rows of dasf_change_log
+ChangeEvent = namedtuple("ChangeEvent", column_names(CHANGE_LOG))
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+# Sort key of the ids of each entity type, so events follow the natural id order
+_ID_SORT_KEYS = {RISK: risk_id_sort_key, CONTROL: control_id_sort_key}
+
+
+def row_changes(entity_type, previous_rows, rows):
+    """(operation, entity id, changed fields, row) of every row of ``entity_type`` changed from ``previous_rows`` to ``rows``.
+
+    ``row`` is the new row, or None for a delete. Rows without an id are ignored.
+    """
+    _, sheet, id_column, _ = HISTORIES[entity_type]
+    names = column_names(sheet)
+    previous = {getattr(row, id_column): row for row in previous_rows if getattr(row, id_column) is not None}
+    current = {getattr(row, id_column): row for row in rows if getattr(row, id_column) is not None}
+    changes = []
+    for entity_id, row in current.items():
+        if entity_id not in previous:
+            changes.append((INSERT, entity_id, [], row))
+            continue
+        changed = [name for name in names if field_text(getattr(row, name)) != field_text(getattr(previous[entity_id], name))]
+        if changed:
+            changes.append((UPDATE, entity_id, changed, row))
+    changes.extend((DELETE, entity_id, [], None) for entity_id in previous.keys() - current.keys())
+    return sorted(changes, key=lambda change: _ID_SORT_KEYS[entity_type](change[1]))
+
+
+def change_events(previous, current, version, loaded_at, revision=None):
+    """dasf_change_log rows of a load under ``version``, from the previous and new rows by entity type.
+
+    ``loaded_at`` is the load's start time (a datetime or ISO 8601 text) and ``revision``
+    the compendium revision it ingested. Risks come first, then controls.
+    """
+    if not isinstance(loaded_at, str):
+        loaded_at = loaded_at.isoformat()
+    events = []
+    for entity_type in HISTORIES:
+        names = column_names(HISTORIES[entity_type][1])
+        for operation, entity_id, changed, row in row_changes(entity_type, previous.get(entity_type, ()), current.get(entity_type, ())):
+            values = None if row is None else [getattr(row, name) for name in names]
+            events.append(
+                ChangeEvent(
+                    version,
+                    len(events) + 1,
+                    loaded_at,
+                    revision,
+                    entity_type,
+                    entity_id,
+                    operation,
+                    changed,
+                    None if values is None else row_hash(values),
+                    None if values is None else json.dumps(dict(zip(names, values)), ensure_ascii=False),
+                )
+            )
+    return events
+
+
+def next_version(versions):
+    """Version of the next load that changes a row, after the recorded ``versions`` (any iterable of ints or NULLs)."""
+    return max((v for v in versions if v is not None), default=0) + 1
+
+
+def append_jsonl(path, events):
+    """Append ``events`` to the JSON Lines stream at ``path``, one object per event."""
+    if not events:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event._asdict(), ensure_ascii=False) + "\n")
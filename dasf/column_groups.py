@@ -0,0 +1,119 @@
+"""Column groups of the wide-row lookups, and their paginated variants.
+
+The detail lookups return every detail column of a risk (28) or a control (24): long
+descriptions, the documentation links of three clouds and a dozen framework cells. A
+follow-up such as "only the control id, title and AWS documentation link" needs three of
+them. The ``*_projected`` variants of those lookups take a column group and return the
+identifying columns plus the group's columns, with the other columns NULL:
+
+- core: the description and categorical details;
+- docs_aws, docs_azure, docs_gcp: the Databricks documentation link of one cloud;
+- frameworks: the external standard mappings;
+- full: every detail column.
+
+Their rows are ordered by id and paginated by limit and offset, each with its position and
+the total number of rows. The returned columns stay fixed, so the group is a CASE over the
+parameter in the projection; when the function is called with a literal group, Spark folds
+the CASE into NULLs and prunes the excluded columns from the table scan.
+"""
+from .crosswalk import CONTROL_FRAMEWORK_COLUMNS, RISK_FRAMEWORK_COLUMNS
+from .schema import CONTROLS, RISKS, detail_column_names
+
+CORE = "core"
+DOCS_AWS = "docs_aws"
+DOCS_AZURE = "docs_azure"
+DOCS_GCP = "docs_gcp"
+FRAMEWORKS = "frameworks"
+FULL = "full"
+DEFAULT_GROUP = CORE
+# Rows per page; a limit of 0 returns every row from the offset
+DEFAULT_LIMIT = 25
+
+PROJECTED_SUFFIX = "_projected"
+# Lookups with a projected variant, named by PROJECTED_SUFFIX
+PROJECTED = (
+    "risks_in_ai_system_component_by_risk_id",
+    "risks_for_deployment_models",
+    "databricks_ai_mitigation_control_by_mitigation_control_id",
+    "databricks_ai_mitigation_controls_by_risk_id",
+    "risks_in_ai_system_by_mitigation_controls_id",
+)
+
+# Columns returned whatever the group, by table
+IDENTITY = {
+    RISKS.table: ("risk_id", "risk_name"),
+    CONTROLS.table: ("mitigation_control_id", "control"),
+}
+# Columns of each group but full, by table; a group a sheet has no columns of returns its identifying columns alone
+COLUMN_GROUPS = {
+    RISKS.table: {
+        CORE: ("system_component", "risk_description", "mitigation_control_ids", "revision", "ai_novelty"),
+        FRAMEWORKS: (*RISK_FRAMEWORK_COLUMNS.values(), "nist_800_53_controls_mapping_rationale"),
+    },
+    CONTROLS.table: {
+        CORE: (
+            "risk_id",
+            "description",
+            "databricks_shared_responsibility",
+            "databricks_product_reference",
+            "dasf_revision",
+            "security_control_type",
+            "ai_system_component_step",
+            "ai_system_novelty",
+        ),
+        DOCS_AWS: ("databricks_documentation_aws",),
+        DOCS_AZURE: ("databricks_documentation_azure",),
+        DOCS_GCP: ("databricks_documentation_gcp",),
+        FRAMEWORKS: tuple(CONTROL_FRAMEWORK_COLUMNS.values()),
+    },
+}
+GROUPS = (CORE, DOCS_AWS, DOCS_AZURE, DOCS_GCP, FRAMEWORKS, FULL)
+# Order of the paginated rows, by table: natural id order, see dasf.ids
+_PAGE_ORDER = {
+    RISKS.table: "lower({p}component_name), {p}component_number, {p}component_sub_number, {p}risk_id",
+    CONTROLS.table: "try_cast(regexp_extract({p}mitigation_control_id, '[0-9]+', 0) AS INT), {p}mitigation_control_id",
+}
+
+
+def column_groups(sheet, name):
+    """Groups returning detail column ``name`` of ``sheet``, or None for an identifying column."""
+    if name in IDENTITY[sheet.table]:
+        return None
+    return tuple(group for group, names in COLUMN_GROUPS[sheet.table].items() if name in names) + (FULL,)
+
+
+def group_columns(sheet, group):
+    """Detail columns of ``sheet`` returned for ``group`` (case-insensitive)."""
+    group = (group or "").lower()
+    return {name for name in detail_column_names(sheet) if column_groups(sheet, name) is None or group in column_groups(sheet, name)}
+
+
+def column_group_sql(sheet, name, alias, group_param):
+    """Projection of detail column ``name``, NULL unless ``group_param`` is one of its groups."""
+    column = f"{alias}.{name}" if alias else name
+    groups = column_groups(sheet, name)
+    if groups is None:
+        return column
+    return f"CASE WHEN lower({group_param}) IN ({', '.join(repr(g) for g in groups)}) THEN {column} END AS {name}"
+
+
+def page_order_sql(sheet, alias=None):
+    """ORDER BY expressions numbering the rows of a paginated lookup over ``sheet``."""
+    return _PAGE_ORDER[sheet.table].format(p=f"{alias}." if alias else "")
+
+
+def page_predicate_sql(position, limit_param, offset_param):
+    """Predicate keeping the rows of the page after ``offset_param``, all of them for a limit of 0."""
+    return f"{position} > {offset_param} AND ({limit_param} = 0 OR {position} <= {offset_param} + {limit_param})"
+
+
+def page(rows, row_type, included, limit=DEFAULT_LIMIT, offset=0):
+    """Rows ``offset + 1`` to ``offset + limit`` of ordered detail ``rows`` as ``row_type`` (position, total_count, details),
+    with the columns outside ``included`` as None."""
+    start = max(offset, 0)
+    end = None if limit == 0 else max(offset + limit, 0)
+    fields = row_type._fields[2:]
+    return [
+        row_type(position, len(rows), *(value if name in included else None for name, value in zip(fields, row)))
+        for position, row in enumerate(rows[start:end], start + 1)
+    ]
@@ -0,0 +1,262 @@
+"""Crosswalk from external standards to DASF risks and mitigation controls.
+
+Both sheets carry one free-text column per standard (MITRE ATLAS, MITRE ATT&CK, OWASP
+LLM and ML Top 10, NIST 800-53, HITRUST, ENISA, ISO 42001, ISO 27001, EU AI Act), e.g.
+"AC-2:Account Management,  AC-3:Access Enforcement" or "AML.T0020: Poison Training
+Data AML.T0019: Published Poisoned Datasets". The parsers here explode those cells into
+one (entity_type, entity_id, framework, reference_id) row per referenced standard
+control, so a reverse lookup such as "which risks map to NIST AC-2" is an index hit.
+"""
+import re
+from collections import namedtuple
+
+from .ids import control_id_sort_key, risk_id_sort_key
+
+CrosswalkEntry = namedtuple("CrosswalkEntry", ["entity_type", "entity_id", "framework", "reference_id"])
+
+RISK = "risk"
+CONTROL = "control"
+
+FRAMEWORKS = (
+    "mitre_atlas",
+    "mitre_attack",
+    "owasp_llm",
+    "owasp_ml",
+    "nist_800_53",
+    "hitrust",
+    "enisa",
+    "iso_42001",
+    "iso_27001",
+    "eu_ai_act",
+)
+
+# Other spellings of the framework names accepted by the lookups, after framework_key's normalization
+FRAMEWORK_ALIASES = {
+    "atlas": "mitre_atlas",
+    "attack": "mitre_attack",
+    "att_ck": "mitre_attack",
+    "mitre_att_ck": "mitre_attack",
+    "owasp_llm_top_10": "owasp_llm",
+    "owasp_llm_top_10_2025": "owasp_llm",
+    "owasp_ml_top_10": "owasp_ml",
+    "nist": "nist_800_53",
+    "nist_800_53_rev_5": "nist_800_53",
+    "iso_42001_2023": "iso_42001",
+    "iso_27001_2022": "iso_27001",
+    "eu_ai": "eu_ai_act",
+}
+
+# Frameworks without identifiers, whose references are phrases matched by substring
+FREE_TEXT_FRAMEWORKS = ("hitrust", "enisa")
+
+NO_MAPPING = "no mapping"
+
+_SPACES = re.compile(r"\s+")
+
+_ATLAS = re.compile(r"\bAML\.(?:TA|T|M)\d{4}(?:\.\d{3})?")
+# ATT&CK ids, also found in the ATLAS columns ("M1030 Network Segmentation"), but not ATLAS ids
+_ATTACK = re.compile(r"(?<![.\w])(?:TA|T|M)\d{4}(?:\.\d{3})?\b")
+_OWASP_LLM = re.compile(r"\bLLM\d{2}")
+_OWASP_ML = re.compile(r"\bML\d{2}(?=:20\d\d)")
+_NIST = re.compile(r"\b(?P<family>[A-Z]{2})(?:-(?P<number>\d+)(?: *\((?P<enhancement>\d+)\))?|(?= *:| family\b))")
+_NIST_RANGE = re.compile(r"\bto *$")
+_ISO = re.compile(r"\bA\.\d+(?:\.\d+)*")
+_EU_AI_ACT = re.compile(r"\bArticle +\d+(?:\.\d+)*", re.IGNORECASE)
+_HITRUST_ARROW = re.compile(r" *- ?> *")
+_SENTENCE_END = re.compile(r"(?<=\.) +")
+
+
+def _ids(pattern):
+    def parse(text, context):
+        return [_SPACES.sub(" ", m.group(0)) for m in pattern.finditer(text)]
+
+    return parse
+
+
+def _article(text, context):
+    return ["Article " + m.group(0).split()[-1] for m in _EU_AI_ACT.finditer(text)]
+
+
+def _nist(text, context):
+    """NIST 800-53 controls, enhancements and families, expanding 'AC-1:... to AC-23:...' ranges."""
+    references = []
+    previous = None
+    for match in _NIST.finditer(text):
+        family, number, enhancement = match["family"], match["number"], match["enhancement"]
+        if number is None:
+            references.append(family)
+            previous = None
+            continue
+        number = int(number)
+        if (
+            previous is not None
+            and previous.group("family") == family
+            and enhancement is None
+            and _NIST_RANGE.search(text, previous.end(), match.start())
+        ):
+            references.extend(f"{family}-{n}" for n in range(int(previous["number"]) + 1, number))
+        references.append(f"{family}-{number}" + (f"({enhancement})" if enhancement else ""))
+        previous = match
+    return references
+
+
+def _sentences(text, context):
+    return [_SPACES.sub(" ", s).strip().rstrip(".") for s in _SENTENCE_END.split(text) if s.strip(" .")]
+
+
+def _hitrust(text, context):
+    """'Category -> Item' phrases.
+
+    Entries are not delimited, as in 'Supply chain -> Verification of origin ... Model
+    robustness -> Adversarial training', so each text between two arrows is split at the
+    category it ends with, out of the categories seen at the start of a cell (``context``).
+    """
+    segments = [_SPACES.sub(" ", s).strip() for s in _HITRUST_ARROW.split(text.strip())]
+    if len(segments) == 1:
+        return [segments[0]] if segments[0] else []
+    references = []
+    category = segments[0]
+    for segment in segments[1:-1]:
+        following = next((c for c in context if segment.endswith(" " + c)), None)
+        if following is None:
+            references.append(f"{category} -> {segment}")
+            continue
+        references.append(f"{category} -> {segment[: -len(following) - 1].strip()}")
+        category = following
+    references.append(f"{category} -> {segments[-1]}")
+    return references
+
+
+# Framework columns of each sheet and the parsers applied to them, as (framework, parser) pairs
+_PARSERS = {
+    "mitre_atlas": (("mitre_atlas", _ids(_ATLAS)), ("mitre_attack", _ids(_ATTACK))),
+    "mitre_attack": (("mitre_attack", _ids(_ATTACK)),),
+    "owasp_llm": (("owasp_llm", _ids(_OWASP_LLM)),),
+    "owasp_ml": (("owasp_ml", _ids(_OWASP_ML)),),
+    "nist_800_53": (("nist_800_53", _nist),),
+    "hitrust": (("hitrust", _hitrust),),
+    "enisa": (("enisa", _sentences),),
+    "iso_42001": (("iso_42001", _ids(_ISO)),),
+    "iso_27001": (("iso_27001", _ids(_ISO)),),
+    "eu_ai_act": (("eu_ai_act", _article),),
+}
+
+RISK_FRAMEWORK_COLUMNS = {
+    "mitre_atlas": "mitre_atlas_as_of_q3_2024",
+    "mitre_attack": "mitre_attack_as_of_q3_2024",
+    "owasp_llm": "owasp_llm_top_10_2025",
+    "owasp_ml": "owasp_ml_top_10_v0_3",
+    "nist_800_53": "nist_800_53_rev_5",
+    "hitrust": "hitrust",
+    "enisa": "enisa_securing_ml_algorithms",
+    "iso_42001": "iso_42001_2023_controls_objectives_and_controls_annex_a",
+    "iso_27001": "iso_27001_2022_information_security_control_reference_annex_a",
+    "eu_ai_act": "eu_ai_act",
+}
+
+CONTROL_FRAMEWORK_COLUMNS = dict(
+    RISK_FRAMEWORK_COLUMNS,
+    mitre_atlas="mitre_atlas_q3_2024",
+    mitre_attack="mitre_attack_q3_2024",
+    iso_42001="iso_42001_2023_controls_objectives_controls_annex_a",
+)
+
+
+def _cells(rows, columns):
+    for row in rows:
+        for framework, column in columns.items():
+            cell = getattr(row, column)
+            if cell is not None and cell.strip() and cell.strip().lower() != NO_MAPPING:
+                yield row, framework, cell
+
+
+def _hitrust_categories(*cells):
+    categories = set()
+    for cell in cells:
+        segments = _HITRUST_ARROW.split(cell.strip(), maxsplit=1)
+        if len(segments) > 1:
+            categories.add(_SPACES.sub(" ", segments[0]).strip())
+    # Longest first, so 'Supply chain attacks' is preferred over 'Supply chain'
+    return sorted(categories, key=len, reverse=True)
+
+
+def parse_references(column_framework, text, context=()):
+    """(framework, reference_id) pairs referenced by one framework column cell."""
+    if text is None or text.strip().lower() in ("", NO_MAPPING):
+        return []
+    return [(framework, reference) for framework, parse in _PARSERS[column_framework] for reference in parse(text, context)]
+
+
+def _sort_key(entry):
+    entity_key = risk_id_sort_key(entry.entity_id) if entry.entity_type == RISK else control_id_sort_key(entry.entity_id)
+    return (entry.framework, reference_key(entry.reference_id), entry.entity_type, entity_key)
+
+
+def build_crosswalk(risks, controls):
+    """Explode the framework columns of both sheets into sorted, deduplicated crosswalk entries.
+
+    ``risks`` and ``controls`` are rows with ``risk_id``/``mitigation_control_id`` and the
+    framework columns named in RISK_FRAMEWORK_COLUMNS/CONTROL_FRAMEWORK_COLUMNS.
+    """
+    cells = [(RISK, row.risk_id, framework, cell) for row, framework, cell in _cells(risks, RISK_FRAMEWORK_COLUMNS)]
+    cells += [
+        (CONTROL, row.mitigation_control_id, framework, cell)
+        for row, framework, cell in _cells(controls, CONTROL_FRAMEWORK_COLUMNS)
+    ]
+    categories = _hitrust_categories(*(cell for _, _, framework, cell in cells if framework == "hitrust"))
+    entries = {
+        CrosswalkEntry(entity_type, entity_id, framework, reference)
+        for entity_type, entity_id, column_framework, cell in cells
+        if entity_id is not None
+        for framework, reference in parse_references(column_framework, cell, categories)
+    }
+    return sorted(entries, key=_sort_key)
+
+
+def framework_key(text):
+    """Canonical framework name of a lookup such as 'NIST 800-53', 'ATLAS' or 'owasp_llm'."""
+    key = re.sub(r"[^a-z0-9]+", "_", (text or "").strip().lower()).strip("_")
+    return FRAMEWORK_ALIASES.get(key, key)
+
+
+def reference_key(text):
+    """Case-insensitive lookup key of a reference id, e.g. 'si-7(8)' for 'SI-7 (8)'."""
+    return _SPACES.sub(" ", (text or "").strip()).replace(" (", "(").lower()
+
+
+def reference_ancestors(key):
+    """Keys a reference answers to besides its own: 'a.6.2' and 'a.6' for 'a.6.2.6', 'si-7' and 'si' for 'si-7(8)'."""
+    return [key[:i] for i in range(1, len(key)) if key[i] in ".(-"]
+
+
+def framework_key_sql(param):
+    """Spark SQL expression equivalent to framework_key of a function parameter."""
+    key = f"regexp_replace(regexp_replace(lower(trim({param})), '[^a-z0-9]+', '_'), '^_+|_+$', '')"
+    aliases = " ".join(f"WHEN '{alias}' THEN '{framework}'" for alias, framework in FRAMEWORK_ALIASES.items())
+    return f"CASE {key} {aliases} ELSE {key} END"
+
+
+def reference_key_sql(param):
+    """Spark SQL expression equivalent to reference_key of a function parameter."""
+    return f"lower(replace(regexp_replace(trim({param}), ' +', ' '), ' (', '('))"
+
+
+def reference_match_sql(alias, framework_param, reference_param):
+    """Spark SQL predicate over crosswalk rows ``alias`` with the lookup semantics of DASFEngine.
+
+    A reference id matches itself and every reference below it ('AC' matches 'AC-2',
+    'A.6.2' matches 'A.6.2.6'). HITRUST and ENISA phrases match by substring. A NULL or
+    empty framework matches every framework.
+    """
+    key = reference_key_sql(reference_param)
+    reference = f"lower({alias}.reference_id)"
+    free_text = ", ".join(f"'{f}'" for f in FREE_TEXT_FRAMEWORKS)
+    return (
+        f"(nullif(trim({framework_param}), '') IS NULL OR {alias}.framework = {framework_key_sql(framework_param)})\n"
+        f"AND {key} <> ''\n"
+        f"AND ({reference} = {key}\n"
+        f"  OR startswith({reference}, {key} || '.')\n"
+        f"  OR startswith({reference}, {key} || '(')\n"
+        f"  OR startswith({reference}, {key} || '-')\n"
+        f"  OR ({alias}.framework IN ({free_text}) AND contains({reference}, {key})))"
+    )
@@ -0,0 +1,93 @@
+"""Deployment models of the DASF risks packed into an integer bitmask.
+
+The risks sheet has one Yes/No column per deployment model. Ingestion packs them into
+the ``deployment_models_mask`` column, one bit per model, so "risks of a RAG deployment"
+or "risks shared by fine-tuned and pre-trained LLMs" are bitwise tests of one column.
+"""
+import re
+from collections import namedtuple
+
+from .ids import risk_id_sort_key
+
+DeploymentModel = namedtuple("DeploymentModel", ["name", "source", "column", "bit", "aliases"])
+
+DEPLOYMENT_MODELS = (
+    DeploymentModel("predictive_ml_models", "Predictive ML Models", "is_predictive_ml_models", 1, ("predictive", "predictive_ml", "predictive_ml_model")),
+    DeploymentModel("rag_llms", "RAG - LLMs", "is_rag_llms", 2, ("rag", "rag_llm")),
+    DeploymentModel("fine_tuned_llms", "Fine-tuned LLMs", "is_fine_tuned_llms", 4, ("fine_tuned", "fine_tuned_llm", "finetuned")),
+    DeploymentModel("pre_trained_llms", "Pre-trained LLMs", "is_pre_trained_llms", 8, ("pre_trained", "pre_trained_llm", "pretrained")),
+    DeploymentModel("foundational_llms", "Foundational LLMs", "is_foundational_llms", 16, ("foundational", "foundational_llm", "foundation_model", "foundation_models")),
+    DeploymentModel("external_models", "External Models", "is_external_models", 32, ("external", "external_model")),
+)
+
+ALL_DEPLOYMENT_MODELS = sum(m.bit for m in DEPLOYMENT_MODELS)
+
+DeploymentModelRisks = namedtuple("DeploymentModelRisks", ["deployment_model", "deployment_model_bit", "risk_ids", "risk_count"])
+
+_KEYS = {key: m.bit for m in DEPLOYMENT_MODELS for key in (m.name, *m.aliases)}
+_SEPARATORS = re.compile(r"[,;+&|]| and | or ")
+
+# Spark SQL equivalent of deployment_models_mask, over the risks sheet's source columns
+DEPLOYMENT_MODELS_MASK_EXPRESSION = " | ".join(
+    f"CASE WHEN lower(trim(`{m.source}`)) = 'yes' THEN {m.bit} ELSE 0 END" for m in DEPLOYMENT_MODELS
+)
+
+
+def deployment_models_mask(values):
+    """Bitmask of the deployment models a risk applies to, from its Yes/No cells keyed by source header."""
+    return sum(m.bit for m in DEPLOYMENT_MODELS if (values[m.source] or "").strip().lower() == "yes")
+
+
+def _model_key(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
+
+
+def parse_deployment_models(text):
+    """Bitmask of a list of deployment model names such as 'RAG, fine-tuned LLMs'.
+
+    Raises ValueError for a name that is not a deployment model.
+    """
+    mask = 0
+    for name in _SEPARATORS.split((text or "").lower()):
+        key = _model_key(name)
+        if not key:
+            continue
+        if key not in _KEYS:
+            raise ValueError(f"Unknown deployment model {name.strip()!r}, expected one of {[m.name for m in DEPLOYMENT_MODELS]}")
+        mask |= _KEYS[key]
+    return mask
+
+
+def deployment_model_names(mask):
+    """Names of the deployment models set in ``mask``."""
+    return [m.name for m in DEPLOYMENT_MODELS if mask & m.bit]
+
+
+def matches_deployment_models(risk_mask, mask, match_all=False):
+    """Whether a risk applies to any (or, with ``match_all``, every) deployment model in ``mask``."""
+    if match_all:
+        return risk_mask & mask == mask
+    return risk_mask & mask != 0
+
+
+def deployment_model_risk_sets(risks):
+    """One row per deployment model with the naturally sorted ids of the risks applying to it.
+
+    ``risks`` are rows with ``risk_id`` and ``deployment_models_mask`` fields.
+    """
+    risks = sorted((r for r in risks if r.risk_id is not None), key=lambda r: risk_id_sort_key(r.risk_id))
+    rows = []
+    for m in DEPLOYMENT_MODELS:
+        ids = [r.risk_id for r in risks if (r.deployment_models_mask or 0) & m.bit]
+        rows.append(DeploymentModelRisks(m.name, m.bit, ids, len(ids)))
+    return rows
+
+
+def deployment_models_mask_sql(param):
+    """Spark SQL expression equivalent to parse_deployment_models of a function parameter, NULL for unknown names."""
+    names = f"filter(transform(split(lower({param}), '[,;+&|]| and | or '), name -> regexp_replace(regexp_replace(trim(name), '[^a-z0-9]+', '_'), '^_+|_+$', '')), key -> key <> '')"
+    cases = " ".join(
+        f"WHEN key IN ({', '.join(repr(k) for k in (m.name, *m.aliases))}) THEN {m.bit}" for m in DEPLOYMENT_MODELS
+    )
+    bits = f"transform({names}, key -> CASE {cases} END)"
+    return f"aggregate({bits}, 0, (mask, bit) -> mask | bit)"
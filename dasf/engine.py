@@ -0,0 +1,390 @@
+"""Indexed, in-process query engine over the DASF compendium.
+
+Every UC function declared in :mod:`dasf.functions` has a method of the same name here
+returning the same output columns. The TSVs are parsed once and the joins behind the
+functions are resolved into hash indexes up front, so each lookup is a dictionary hit.
+"""
+import bisect
+import functools
+from collections import defaultdict, namedtuple
+
+from .column_groups import DEFAULT_GROUP, DEFAULT_LIMIT, GROUPS, group_columns, page
+from .crosswalk import CONTROL, FREE_TEXT_FRAMEWORKS, RISK, build_crosswalk, framework_key, reference_ancestors, reference_key
+from .deployment import ALL_DEPLOYMENT_MODELS, deployment_model_risk_sets, matches_deployment_models, parse_deployment_models
+from .graph import RiskControlGraph
+from .ids import control_id_sort_key, normalize_risk_id, parse_component_query, risk_id_sort_key
+from .resolve import DEFAULT_CANDIDATES, EntityResolver
+from .retrieval import DEFAULT_RESULTS, RetrievalIndex
+from .revisions import RevisionHistory
+from .schema import CONTROLS, RISKS
+from .sheets import RESOURCES_DIR, ControlDetail, RiskDetail, build_mapping, detail, load_controls, load_risks
+from .summary import dimension_key, summary_order_key, summary_rows
+
+RiskSummary = namedtuple("RiskSummary", ["risk_id", "system_component", "risk_name"])
+ControlSummary = namedtuple("ControlSummary", ["mitigation_control_id", "control", "risk_id"])
+# Rows of the batched join lookups, prefixed with the requested id they were found for
+MappedControlDetail = namedtuple("MappedControlDetail", ["mapped_risk_id", *ControlDetail._fields])
+MappedRiskDetail = namedtuple("MappedRiskDetail", ["mapped_mitigation_control_id", *RiskDetail._fields])
+# Rows of the column-projected lookups, prefixed with their position and the number of rows over all pages
+ProjectedRiskDetail = namedtuple("ProjectedRiskDetail", ["position", "total_count", *RiskDetail._fields])
+ProjectedControlDetail = namedtuple("ProjectedControlDetail", ["position", "total_count", *ControlDetail._fields])
+
+
+def _index(rows, details, key):
+    index = defaultdict(list)
+    for row, out in zip(rows, details):
+        value = key(row)
+        if value is not None:
+            index[value].append(out)
+    return dict(index)
+
+
+def _batch(index, keys):
+    return [d for key in dict.fromkeys(keys or ()) for d in index.get(key, ())]
+
+
+def _mapped_batch(index, keys, row_type):
+    return [row_type(key, *d) for key in dict.fromkeys(keys or ()) for d in index.get(key, ())]
+
+
+def _component_key(text):
+    return normalize_risk_id(text or "").lower()
+
+
+class DASFEngine:
+    """Hash-indexed view over the risks, mitigation controls and their mapping.
+
+    Result rows are immutable namedtuples shared between calls.
+    """
+
+    def __init__(self, risks, controls, mapping, crosswalk=None, history=None):
+        self.risks = tuple(risks)
+        self.controls = tuple(controls)
+        self.mapping = tuple(mapping)
+        self.crosswalk = tuple(crosswalk if crosswalk is not None else build_crosswalk(self.risks, self.controls))
+        risk_details = [detail(r, RiskDetail) for r in self.risks]
+        control_details = [detail(c, ControlDetail) for c in self.controls]
+
+        self._risks_by_id = _index(self.risks, risk_details, lambda r: r.risk_id)
+        self._risks_by_name = _index(self.risks, risk_details, lambda r: r.risk_name)
+        self._risks_by_system_component = _index(self.risks, risk_details, lambda r: r.system_component)
+        self._controls_by_id = _index(self.controls, control_details, lambda c: c.mitigation_control_id)
+
+        # Component index: exact matches by lower-cased component name, prefix matches by
+        # bisecting the sorted (component, number, sub-number) keys
+        components = sorted(
+            ((_component_key(r.component_name), r.component_number, r.component_sub_number), d)
+            for r, d in zip(self.risks, risk_details)
+            if r.component_name is not None
+        )
+        self._component_keys = [key for key, _ in components]
+        self._component_rows = [d for _, d in components]
+        self._risks_by_component = defaultdict(list)
+        for (name, number, sub_number), d in components:
+            self._risks_by_component[name].append((number, sub_number, d))
+        self._risks_by_component = dict(self._risks_by_component)
+
+        # Resolve both directions of the mapping join once, keeping the mapping's row order
+        controls_by_risk_id = defaultdict(list)
+        risks_by_control_id = defaultdict(list)
+        for edge in self.mapping:
+            controls_by_risk_id[edge.risk_id].extend(self._controls_by_id.get(edge.mitigation_control_id, ()))
+            risks_by_control_id[edge.mitigation_control_id].extend(self._risks_by_id.get(edge.risk_id, ()))
+        self._controls_by_risk_id = dict(controls_by_risk_id)
+        self._risks_by_control_id = dict(risks_by_control_id)
+
+        # Risks of every combination of deployment models, for both any and all matches
+        self._risks_by_deployment_models = {
+            (mask, match_all): [d for r, d in zip(self.risks, risk_details) if matches_deployment_models(r.deployment_models_mask or 0, mask, match_all)]
+            for mask in range(ALL_DEPLOYMENT_MODELS + 1)
+            for match_all in (False, True)
+        }
+        self._deployment_model_risks = deployment_model_risk_sets(self.risks)
+
+        # Crosswalk index: every reference under its own key and the keys of the references above it
+        # ('a.6.2' and 'a.6' for 'A.6.2.6'), plus the HITRUST and ENISA phrases for substring matches
+        crosswalk_by_key = defaultdict(list)
+        free_text = defaultdict(list)
+        for entry in self.crosswalk:
+            key = reference_key(entry.reference_id)
+            for k in (key, *reference_ancestors(key)):
+                crosswalk_by_key[k].append(entry)
+            if entry.framework in FREE_TEXT_FRAMEWORKS:
+                free_text[entry.framework].append((key, entry))
+        self._crosswalk_by_key = dict(crosswalk_by_key)
+        self._free_text_crosswalk = dict(free_text)
+
+        # Bitset graph of the mapping: risk co-mitigation and the minimum control set of every
+        # deployment model combination and component, as precomputed into the graph tables
+        self.graph = RiskControlGraph(self.risks, self.mapping)
+        self._related_risks = {risk_id: self.graph.related_risks(risk_id) for risk_id in self.graph.risk_ids}
+        control_cover = defaultdict(list)
+        for row in self.graph.control_cover_rows(self.risks):
+            control_cover[(row.deployment_models_mask, _component_key(row.component_name))].append(row)
+        self._control_cover = dict(control_cover)
+
+        # Trigram and token index of the risk and control ids and names, as built into dasf_entity_index
+        self.resolver = EntityResolver.from_tables(self.risks, self.controls)
+        self.retrieval = RetrievalIndex.from_tables(self.risks, self.controls)
+        # Precomputed counts, as materialized into dasf_summary
+        summary = defaultdict(list)
+        for row in sorted(summary_rows(self.risks, self.controls, self.mapping), key=summary_order_key):
+            summary[row.dimension].append(row)
+        self._summary = dict(summary)
+        self._summary_rows = [row for rows in self._summary.values() for row in rows]
+        # Revision history of the compendium: this compendium alone unless a stored history is given
+        self.history = history if history is not None else RevisionHistory.from_compendium(self.risks, self.controls)
+
+        # Detail columns returned for each column group of the projected lookups
+        self._risk_groups = {group: group_columns(RISKS, group) for group in GROUPS}
+        self._control_groups = {group: group_columns(CONTROLS, group) for group in GROUPS}
+
+        self._risk_summaries = [RiskSummary(r.risk_id, r.system_component, r.risk_name) for r in self.risks]
+        self._control_summaries = [ControlSummary(c.mitigation_control_id, c.control, c.risk_id) for c in self.controls]
+
+    @classmethod
+    def from_resources(cls, resources_dir=RESOURCES_DIR):
+        """Build an engine from the compendium TSVs in ``resources_dir``."""
+        risks, controls = load_risks(resources_dir), load_controls(resources_dir)
+        return cls(risks, controls, build_mapping(risks, controls))
+
+    # AI Lifecycle Risks
+
+    def risks_in_ai_system_components(self):
+        """Risk id, system component and full risk title for every risk."""
+        return list(self._risk_summaries)
+
+    def risks_in_ai_system_for_component(self, risk_id_param):
+        """Risks for a risk id or component lookup.
+
+        A full risk id such as 'Raw Data 1.10' matches exactly (and not 'Raw Data 1.1'),
+        'Data Prep 2' matches that component number, and a bare component name such as
+        'Model Serving' matches every component starting with it.
+        """
+        query = parse_component_query(risk_id_param)
+        if query.component_number is None:
+            return self._component_prefix(query.component_name)
+        return [
+            d
+            for number, sub_number, d in self._risks_by_component.get(query.component_name, ())
+            if number == query.component_number and query.component_sub_number in (None, sub_number)
+        ]
+
+    def risks_in_ai_system_by_component(self, component_name_param):
+        """Risks of a component such as 'Data Prep', matched exactly and case-insensitively."""
+        return [d for _, _, d in self._risks_by_component.get(_component_key(component_name_param), ())]
+
+    def risks_in_ai_system_by_component_prefix(self, component_prefix_param):
+        """Risks of every component starting with ``component_prefix_param``, such as 'Model Serving'."""
+        return self._component_prefix(_component_key(component_prefix_param))
+
+    def _component_prefix(self, prefix):
+        start = bisect.bisect_left(self._component_keys, (prefix,))
+        end = bisect.bisect_left(self._component_keys, (prefix + "\U0010ffff",))
+        return self._component_rows[start:end]
+
+    def risks_in_ai_system_component_by_risk_id(self, risk_id_param):
+        """All details for a risk by risk id, or by the risk id it matches once normalized ('raw data 1.1')."""
+        if risk_id_param not in self._risks_by_id:
+            risk_id_param = self.resolver.resolve_id(risk_id_param, RISK)
+        return list(self._risks_by_id.get(risk_id_param, ()))
+
+    def risks_in_ai_system_component_by_risk_name(self, risk_name_param):
+        """All details for a risk by risk name, or of the best matching risk name when none matches exactly."""
+        if risk_name_param in self._risks_by_name:
+            return list(self._risks_by_name[risk_name_param])
+        return list(self._risks_by_id.get(self.resolver.resolve_name(risk_name_param, RISK), ()))
+
+    def risks_in_ai_system_component_by_risk_ids(self, risk_ids_param):
+        """All details for each risk of a list of risk ids, in one lookup."""
+        return _batch(self._risks_by_id, risk_ids_param)
+
+    def risks_in_ai_system_component_by_risk_names(self, risk_names_param):
+        """All details for each risk of a list of risk names, in one lookup."""
+        return _batch(self._risks_by_name, risk_names_param)
+
+    def risks_in_ai_system_by_system_component(self, system_component_param):
+        """All risks of a system component category such as 'Data operations'."""
+        return list(self._risks_by_system_component.get(system_component_param, ()))
+
+    def risks_for_deployment_models(self, mask_param, match_all_param=False):
+        """Risks applying to any (or, with ``match_all_param``, every) deployment model of a bitmask.
+
+        ``mask_param`` is a deployment_models_mask value such as 2 (RAG LLMs) or 6 (RAG and
+        fine-tuned LLMs), or a list of deployment model names such as 'RAG, fine-tuned'.
+        """
+        mask = parse_deployment_models(mask_param) if isinstance(mask_param, str) else mask_param
+        return list(self._risks_by_deployment_models.get((mask & ALL_DEPLOYMENT_MODELS, bool(match_all_param)), ()))
+
+    def deployment_models_mask(self, deployment_models_param):
+        """Bitmask of a list of deployment model names such as 'RAG, fine-tuned LLMs'."""
+        return parse_deployment_models(deployment_models_param)
+
+    def dasf_deployment_model_risks(self):
+        """Deployment model, its bit, and the ids and number of the risks applying to it, for every deployment model."""
+        return list(self._deployment_model_risks)
+
+    # Databricks AI Mitigation Controls
+
+    def databricks_ai_mitigation_controls(self):
+        """Mitigation control id, full control title and associated risk ids for every control."""
+        return list(self._control_summaries)
+
+    def databricks_ai_mitigation_control_by_mitigation_control_id(self, mitigation_control_id_param):
+        """All details of a control by mitigation control id, or by the id it matches once normalized ('dasf1')."""
+        if mitigation_control_id_param not in self._controls_by_id:
+            mitigation_control_id_param = self.resolver.resolve_id(mitigation_control_id_param, CONTROL)
+        return list(self._controls_by_id.get(mitigation_control_id_param, ()))
+
+    def databricks_ai_mitigation_control_by_mitigation_control_ids(self, mitigation_control_ids_param):
+        """All details of each control of a list of mitigation control ids, in one lookup."""
+        return _batch(self._controls_by_id, mitigation_control_ids_param)
+
+    # AI Lifecycle Risks and Mitigation Control mapping
+
+    def databricks_ai_mitigation_controls_by_risk_id(self, risk_id_param):
+        """All details of the mitigation controls mapped to a risk id, or to the risk id it matches once normalized."""
+        if risk_id_param not in self._controls_by_risk_id:
+            risk_id_param = self.resolver.resolve_id(risk_id_param, RISK)
+        return list(self._controls_by_risk_id.get(risk_id_param, ()))
+
+    def risks_in_ai_system_by_mitigation_controls_id(self, mitigation_controls_id_param):
+        """All details of the risks addressed by a mitigation control id, or by the id it matches once normalized."""
+        if mitigation_controls_id_param not in self._risks_by_control_id:
+            mitigation_controls_id_param = self.resolver.resolve_id(mitigation_controls_id_param, CONTROL)
+        return list(self._risks_by_control_id.get(mitigation_controls_id_param, ()))
+
+    def databricks_ai_mitigation_controls_by_risk_ids(self, risk_ids_param):
+        """All details of the mitigation controls mapped to each risk id of a list, with the risk id they map to."""
+        return _mapped_batch(self._controls_by_risk_id, risk_ids_param, MappedControlDetail)
+
+    def risks_in_ai_system_by_mitigation_controls_ids(self, mitigation_controls_ids_param):
+        """All details of the risks addressed by each mitigation control id of a list, with the control id addressing them."""
+        return _mapped_batch(self._risks_by_control_id, mitigation_controls_ids_param, MappedRiskDetail)
+
+    # Column-projected and paginated lookups
+
+    def risks_in_ai_system_component_by_risk_id_projected(self, risk_id_param, columns_param=DEFAULT_GROUP, limit_param=DEFAULT_LIMIT, offset_param=0):
+        """The columns of a column group ('core', 'docs_aws', 'frameworks', 'full', ...) of a risk by risk id."""
+        return self._risk_page(self.risks_in_ai_system_component_by_risk_id(risk_id_param), columns_param, limit_param, offset_param)
+
+    def risks_for_deployment_models_projected(self, mask_param, match_all_param=False, columns_param=DEFAULT_GROUP, limit_param=DEFAULT_LIMIT, offset_param=0):
+        """The columns of a column group of one page of the risks applying to a deployment models bitmask."""
+        return self._risk_page(self.risks_for_deployment_models(mask_param, match_all_param), columns_param, limit_param, offset_param)
+
+    def databricks_ai_mitigation_control_by_mitigation_control_id_projected(
+        self, mitigation_control_id_param, columns_param=DEFAULT_GROUP, limit_param=DEFAULT_LIMIT, offset_param=0
+    ):
+        """The columns of a column group of a control by mitigation control id."""
+        return self._control_page(
+            self.databricks_ai_mitigation_control_by_mitigation_control_id(mitigation_control_id_param), columns_param, limit_param, offset_param
+        )
+
+    def databricks_ai_mitigation_controls_by_risk_id_projected(self, risk_id_param, columns_param=DEFAULT_GROUP, limit_param=DEFAULT_LIMIT, offset_param=0):
+        """The columns of a column group of one page of the mitigation controls mapped to a risk id, e.g. ('Datasets 3.1', 'docs_aws')."""
+        return self._control_page(self.databricks_ai_mitigation_controls_by_risk_id(risk_id_param), columns_param, limit_param, offset_param)
+
+    def risks_in_ai_system_by_mitigation_controls_id_projected(
+        self, mitigation_controls_id_param, columns_param=DEFAULT_GROUP, limit_param=DEFAULT_LIMIT, offset_param=0
+    ):
+        """The columns of a column group of one page of the risks addressed by a mitigation control id."""
+        return self._risk_page(self.risks_in_ai_system_by_mitigation_controls_id(mitigation_controls_id_param), columns_param, limit_param, offset_param)
+
+    def _risk_page(self, rows, group, limit, offset):
+        included = self._risk_groups.get((group or "").lower()) or group_columns(RISKS, group)
+        return page(sorted(rows, key=lambda d: risk_id_sort_key(d.risk_id)), ProjectedRiskDetail, included, limit, offset)
+
+    def _control_page(self, rows, group, limit, offset):
+        included = self._control_groups.get((group or "").lower()) or group_columns(CONTROLS, group)
+        return page(sorted(rows, key=lambda d: control_id_sort_key(d.mitigation_control_id)), ProjectedControlDetail, included, limit, offset)
+
+    # Risk co-mitigation graph
+
+    def dasf_risk_comitigation_by_risk_id(self, risk_id_param):
+        """Risks sharing a mitigation control with a risk id, with the shared controls, most shared controls first."""
+        return list(self._related_risks.get(risk_id_param, ()))
+
+    def dasf_minimum_control_set(self, deployment_models_param="", component_name_param=""):
+        """Smallest set of mitigation controls covering every risk of some deployment models and a component.
+
+        ``deployment_models_param`` is a list of deployment model names such as 'RAG' or a
+        deployment_models_mask bitmask, matching risks applying to any of them; empty matches
+        every risk. ``component_name_param`` is a component such as 'Raw Data', empty for all.
+        Controls are ranked by the number of risks each adds to the ones ranked before it.
+        """
+        mask = parse_deployment_models(deployment_models_param) if isinstance(deployment_models_param, str) else deployment_models_param
+        return list(self._control_cover.get((mask & ALL_DEPLOYMENT_MODELS, _component_key(component_name_param)), ()))
+
+    # Entity resolution
+
+    def dasf_resolve_entity(self, text_param, k_param=DEFAULT_CANDIDATES, entity_type_param=""):
+        """The best matching risks and controls for a possibly misspelled or partial name or id, best first.
+
+        ``entity_type_param`` restricts the candidates to 'risk' or 'control'.
+        """
+        return self.resolver.resolve(text_param, k_param, entity_type_param or "")
+
+    # Free-text retrieval
+
+    def dasf_search_text(self, query_param, k_param=DEFAULT_RESULTS, entity_type_param=""):
+        """The risks and controls whose descriptions best match a free-text question by BM25, best first.
+
+        Each result carries the entity's best matching chunk. ``entity_type_param`` restricts them to 'risk' or 'control'.
+        """
+        return self.retrieval.search(query_param, k_param, entity_type_param or "")
+
+    # Precomputed counts
+
+    def dasf_summary(self, dimension_param=""):
+        """Counts of risks and controls by dimension ('total', 'system_component', ...; '' for every dimension)."""
+        if not dimension_param:
+            return list(self._summary_rows)
+        return list(self._summary.get(dimension_key(dimension_param), ()))
+
+    # Revision history
+
+    def dasf_revision_changes(self, revision_param="", entity_type_param=""):
+        """Risks and controls a revision ('' for the latest) added, removed or modified, with the changed fields."""
+        return self.history.changes(revision_param or "", entity_type_param or "")
+
+    def dasf_entity_revision_history(self, entity_id_param):
+        """Every change of a risk or control across the revisions, oldest first."""
+        return self.history.entity_history(entity_id_param)
+
+    # Framework crosswalk
+
+    def framework_crosswalk_by_reference(self, framework_param, reference_id_param):
+        """Crosswalk rows of a standard's reference id such as ('nist', 'AC-2').
+
+        A reference also matches the references below it ('AC' matches 'AC-2', 'A.6.2'
+        matches 'A.6.2.6'), HITRUST and ENISA phrases match by substring and an empty
+        framework matches every standard.
+        """
+        key = reference_key(reference_id_param)
+        if not key:
+            return []
+        framework = framework_key(framework_param) or None
+        entries = self._crosswalk_by_key.get(key, [])
+        for name, phrases in self._free_text_crosswalk.items():
+            if framework in (None, name):
+                entries = entries + [entry for phrase, entry in phrases if key in phrase]
+        return [entry for entry in dict.fromkeys(entries) if framework in (None, entry.framework)]
+
+    def risks_in_ai_system_by_framework_reference(self, framework_param, reference_id_param):
+        """All details of the risks referencing a standard's reference id, e.g. ('NIST 800-53', 'AC-2')."""
+        return self._crosswalk_entities(framework_param, reference_id_param, RISK, self._risks_by_id)
+
+    def databricks_ai_mitigation_controls_by_framework_reference(self, framework_param, reference_id_param):
+        """All details of the mitigation controls referencing a standard's reference id, e.g. ('ATLAS', 'AML.T0020')."""
+        return self._crosswalk_entities(framework_param, reference_id_param, CONTROL, self._controls_by_id)
+
+    def _crosswalk_entities(self, framework_param, reference_id_param, entity_type, details_by_id):
+        entries = self.framework_crosswalk_by_reference(framework_param, reference_id_param)
+        ids = dict.fromkeys(e.entity_id for e in entries if e.entity_type == entity_type)
+        return [d for entity_id in ids for d in details_by_id.get(entity_id, ())]
+
+
+@functools.lru_cache(maxsize=None)
+def load_engine(resources_dir=RESOURCES_DIR):
+    """Return the engine for ``resources_dir``, parsing the TSVs only on first use."""
+    return DASFEngine.from_resources(resources_dir)
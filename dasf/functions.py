@@ -0,0 +1,586 @@
+"""Declarative catalogue of the DASF Unity Catalog functions.
+
+Every UC function is described once by its name, parameters, returned columns, source,
+predicate and comment. The RETURNS clause and the projection are generated from the
+column specs in :mod:`dasf.schema`, so adding a function does not copy a column list.
+Each generated definition is fingerprinted and the fingerprint is kept at the end of the
+function's comment; :func:`deploy_functions` reads the deployed fingerprints from
+``information_schema.routines`` in one query and re-creates only the functions whose
+definition changed, in one batched submission.
+"""
+import hashlib
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .column_groups import DEFAULT_GROUP, DEFAULT_LIMIT, GROUPS, PROJECTED, PROJECTED_SUFFIX, column_group_sql, page_order_sql, page_predicate_sql
+from .crosswalk import reference_match_sql
+from .deployment import deployment_models_mask_sql
+from .ids import component_key_sql, component_query_sql
+from .retrieval import DEFAULT_RESULTS, SEARCH_FUNCTION, analyzed_terms_sql, search_source_sql
+from .resolve import DEFAULT_CANDIDATES, RESOLVE_FUNCTION, query_terms_sql, resolve_source_sql, resolved_lookup_sql
+from .schema import CONTROL_COVER, CONTROLS, CROSSWALK, ENTITY_INDEX, REVISION_DIFFS, RISK_COMITIGATION, RISKS, SUMMARY, TEXT_CHUNKS, TEXT_POSTINGS, Column, column_names, detail_column_names, projection, quote, returns_clause
+from .summary import SUMMARY_ORDER, dimension_key_sql
+
+# default: SQL literal of the parameter's default value, or None for a required parameter
+Parameter = namedtuple("Parameter", ["name", "type", "default"], defaults=(None,))
+# sheet, columns: the returned columns, the sheet's detail columns when columns is None; sheet is None for a scalar function
+# leading: derived columns returned before the sheet's columns, with the expression computing them
+# alias: alias of the sheet's table in source, qualifying the projection
+# source, predicate, order_by: FROM, WHERE and ORDER BY clauses of the function body
+# cte: (name, query) of a WITH clause, hint: optimizer hint after SELECT
+# returns, expression: type and RETURN expression of a scalar function
+Function = namedtuple(
+    "Function",
+    ["name", "parameters", "comment", "sheet", "columns", "leading", "alias", "source", "predicate", "order_by", "cte", "hint", "returns", "expression"],
+    defaults=(None, None, (), None, None, None, None, None, None, None, None),
+)
+
+FINGERPRINT_PREFIX = "dasf_sha256:"
+_FINGERPRINT = re.compile(r"\[" + re.escape(FINGERPRINT_PREFIX) + r"([0-9a-f]+)\]$")
+
+_RISKS_ORDER = "lower(risks.component_name), risks.component_number, risks.component_sub_number"
+_RISK_SUMMARY = ("risk_id", "system_component", "risk_name")
+_CONTROL_SUMMARY = ("mitigation_control_id", "control", "risk_id")
+
+
+def _exploded(param, column):
+    return f"(SELECT explode({param}) AS {column}) AS requested"
+
+
+FUNCTIONS = (
+    # Entity resolution, first as the by-id and by-name lookups fall back to it
+    Function(
+        RESOLVE_FUNCTION,
+        (
+            Parameter("text_param", "STRING"),
+            Parameter("k_param", "INT", str(DEFAULT_CANDIDATES)),
+            Parameter("entity_type_param", "STRING", "''"),
+        ),
+        "Returns the k best matching DASF risks and mitigation controls for a possibly misspelled, differently cased or partial risk name, risk id, control title or control id, e.g. 'missing data classification' or 'dasf1', scored from 0 to 1 by the trigrams and words they share. entity_type_param restricts the candidates to risk or control",
+        ENTITY_INDEX,
+        ("entity_type", "entity_id", "entity_name", "field"),
+        leading=(
+            Column(None, "rank", "INT", "Position of the candidate, best first", "candidates.rank"),
+            Column(None, "score", "DOUBLE", "Mean of the trigram and token Jaccard similarities of the text and the candidate's best field, 1 for a normalized exact match", "candidates.score"),
+        ),
+        alias="candidates",
+        cte=("requested_terms", query_terms_sql("text_param")),
+        source=resolve_source_sql(ENTITY_INDEX.table, "requested_terms", "entity_type_param"),
+        predicate="candidates.rank <= k_param",
+        order_by="candidates.rank",
+    ),
+    # Free-text retrieval over the risk and control descriptions
+    Function(
+        SEARCH_FUNCTION,
+        (
+            Parameter("query_param", "STRING"),
+            Parameter("k_param", "INT", str(DEFAULT_RESULTS)),
+            Parameter("entity_type_param", "STRING", "''"),
+        ),
+        "Returns the k DASF risks and mitigation controls whose descriptions best match a free-text question, e.g. 'attacker injects instructions into retrieved documents', ranked by BM25 with the best matching chunk of each. entity_type_param restricts the results to risk or control",
+        TEXT_CHUNKS,
+        ("entity_type", "entity_id", "field", "text"),
+        leading=(
+            Column(None, "rank", "INT", "Position of the result, best first", "results.rank"),
+            Column(None, "score", "DOUBLE", "BM25 score of the entity's best matching chunk", "results.score"),
+        ),
+        alias="results",
+        cte=("requested_terms", f"SELECT explode({analyzed_terms_sql('query_param')}) AS term"),
+        source=search_source_sql(TEXT_CHUNKS.table, TEXT_POSTINGS.table, "requested_terms", "entity_type_param"),
+        predicate="results.rank <= k_param",
+        order_by="results.rank",
+    ),
+    # AI Lifecycle Risks
+    Function(
+        "risks_in_ai_system_components",
+        (),
+        "Returns risk details consisting of risk id, system components, and the full risk title from Risks in AI system components table",
+        RISKS,
+        _RISK_SUMMARY,
+        source="risks_in_ai_system_components",
+    ),
+    # A full risk id matches exactly ('Raw Data 1.10' does not match 'Raw Data 1.1'), a bare component name matches as a prefix
+    Function(
+        "risks_in_ai_system_for_component",
+        (Parameter("risk_id_param", "STRING"),),
+        "Returns all related risk of AI system components and all the details associated to each risk based on Risk Category and or Risk ID",
+        RISKS,
+        alias="risks",
+        cte=("lookup", component_query_sql("risk_id_param")),
+        source="risks_in_ai_system_components AS risks, lookup",
+        predicate=(
+            "(lookup.component_number IS NULL AND startswith(lower(risks.component_name), lookup.component_name))\n"
+            "OR (lower(risks.component_name) = lookup.component_name\n"
+            "  AND risks.component_number = lookup.component_number\n"
+            "  AND (lookup.component_sub_number IS NULL OR risks.component_sub_number = lookup.component_sub_number))"
+        ),
+        order_by="risks.component_name, risks.component_number, risks.component_sub_number",
+    ),
+    Function(
+        "risks_in_ai_system_by_component",
+        (Parameter("component_name_param", "STRING"),),
+        "Returns all risks and their details for an AI system component such as Raw Data, Data Prep, Datasets or Model Management, matched exactly and case-insensitively",
+        RISKS,
+        source="risks_in_ai_system_components",
+        predicate=f"lower(component_name) = {component_key_sql('component_name_param')}",
+        order_by="component_number, component_sub_number",
+    ),
+    Function(
+        "risks_in_ai_system_by_component_prefix",
+        (Parameter("component_prefix_param", "STRING"),),
+        "Returns all risks and their details for the AI system components starting with a prefix such as Model Serving, matched case-insensitively",
+        RISKS,
+        source="risks_in_ai_system_components",
+        predicate=f"startswith(lower(component_name), {component_key_sql('component_prefix_param')})",
+        order_by="component_name, component_number, component_sub_number",
+    ),
+    Function(
+        "risks_in_ai_system_component_by_risk_id",
+        (Parameter("risk_id_param", "STRING"),),
+        "Returns all details for a risk in AI system components risk_id, also matching a differently cased or spaced risk id such as raw data 1.1",
+        RISKS,
+        source="risks_in_ai_system_components",
+        predicate=resolved_lookup_sql("risks_in_ai_system_components", "risk_id", "risk_id_param", "risk", "risk_id", by_id=True),
+    ),
+    Function(
+        "risks_in_ai_system_component_by_risk_name",
+        (Parameter("risk_name_param", "STRING"),),
+        "Returns all details for a risk in AI system components by risk name, or of the closest matching risk name when none matches exactly",
+        RISKS,
+        source="risks_in_ai_system_components",
+        predicate=resolved_lookup_sql("risks_in_ai_system_components", "risk_name", "risk_name_param", "risk", "risk_id", by_id=False),
+    ),
+    # Batched variants resolving every requested key in one semi-join against the exploded array
+    Function(
+        "risks_in_ai_system_component_by_risk_ids",
+        (Parameter("risk_ids_param", "ARRAY<STRING>"),),
+        "Returns all details for each risk in AI system components of a list of risk ids, e.g. array('Datasets 3.1', 'Raw Data 1.1')",
+        RISKS,
+        alias="risks",
+        source=f"risks_in_ai_system_components AS risks\nLEFT SEMI JOIN {_exploded('risk_ids_param', 'risk_id')}\nON risks.risk_id = requested.risk_id",
+    ),
+    Function(
+        "risks_in_ai_system_component_by_risk_names",
+        (Parameter("risk_names_param", "ARRAY<STRING>"),),
+        "Returns all details for each risk in AI system components of a list of risk names, e.g. array('Data poisoning', 'Model inversion')",
+        RISKS,
+        alias="risks",
+        source=f"risks_in_ai_system_components AS risks\nLEFT SEMI JOIN {_exploded('risk_names_param', 'risk_name')}\nON risks.risk_name = requested.risk_name",
+    ),
+    Function(
+        "deployment_models_mask",
+        (Parameter("deployment_models_param", "STRING"),),
+        "Returns the deployment_models_mask bitmask of a comma separated list of deployment models: predictive ML models (1), RAG LLMs (2), fine-tuned LLMs (4), pre-trained LLMs (8), foundational LLMs (16), external models (32). Returns NULL for an unknown deployment model",
+        returns="INT",
+        expression=deployment_models_mask_sql("deployment_models_param"),
+    ),
+    Function(
+        "risks_for_deployment_models",
+        (Parameter("mask_param", "INT"), Parameter("match_all_param", "BOOLEAN", "FALSE")),
+        "Returns all risks and their details applying to a set of deployment models given as a bitmask: predictive ML models 1, RAG LLMs 2, fine-tuned LLMs 4, pre-trained LLMs 8, foundational LLMs 16, external models 32, e.g. 2 for RAG or 6 for RAG and fine-tuned LLMs (use deployment_models_mask to convert names). With match_all_param TRUE only the risks applying to all of the deployment models are returned, otherwise those applying to any of them",
+        RISKS,
+        source="risks_in_ai_system_components",
+        predicate="CASE WHEN match_all_param THEN deployment_models_mask & mask_param = mask_param ELSE deployment_models_mask & mask_param <> 0 END",
+        order_by="lower(component_name), component_number, component_sub_number",
+    ),
+    # Databricks AI Mitigation Controls
+    Function(
+        "databricks_ai_mitigation_controls",
+        (),
+        "Returns the mitigation control id, full control title, and each risk associated to each control",
+        CONTROLS,
+        _CONTROL_SUMMARY,
+        source="databricks_ai_mitigation_controls",
+    ),
+    Function(
+        "databricks_ai_mitigation_control_by_mitigation_control_id",
+        (Parameter("mitigation_control_id_param", "STRING"),),
+        "Returns the mitigation control id, full control title, risk_id, description, and all the details of the control for a given mitigation control id, also matching a differently cased or spaced id such as dasf1",
+        CONTROLS,
+        source="databricks_ai_mitigation_controls",
+        predicate=resolved_lookup_sql(
+            "databricks_ai_mitigation_controls", "mitigation_control_id", "mitigation_control_id_param", "control", "mitigation_control_id", by_id=True
+        ),
+    ),
+    Function(
+        "databricks_ai_mitigation_control_by_mitigation_control_ids",
+        (Parameter("mitigation_control_ids_param", "ARRAY<STRING>"),),
+        "Returns all the details of each control of a list of mitigation control ids, e.g. array('DASF 1', 'DASF 12')",
+        CONTROLS,
+        alias="controls",
+        source=(
+            "databricks_ai_mitigation_controls AS controls\n"
+            f"LEFT SEMI JOIN {_exploded('mitigation_control_ids_param', 'mitigation_control_id')}\n"
+            "ON controls.mitigation_control_id = requested.mitigation_control_id"
+        ),
+    ),
+    # AI Lifecycle Risks and Mitigation Control mapping
+    Function(
+        "databricks_ai_mitigation_controls_by_risk_id",
+        (Parameter("risk_id_param", "STRING"),),
+        "Returns mitigation controls with control id, full control title, risk_id, description, and all the details of the control for a given risk id",
+        CONTROLS,
+        alias="controls",
+        hint="BROADCAST(risks_and_controls_mapping)",
+        source="databricks_ai_mitigation_controls as controls, risks_and_controls_mapping as risks_and_controls_mapping",
+        predicate="("
+        + resolved_lookup_sql("risks_and_controls_mapping", "risk_id", "risk_id_param", "risk", "risk_id", by_id=True, alias="risks_and_controls_mapping")
+        + ")\nand risks_and_controls_mapping.mitigation_control_id = controls.mitigation_control_id",
+    ),
+    Function(
+        "risks_in_ai_system_by_mitigation_controls_id",
+        (Parameter("mitigation_controls_id_param", "STRING"),),
+        "Returns all related risks addressed in a AI system components and all the details associated to each risk by a given mitigation control id",
+        RISKS,
+        alias="risks",
+        hint="BROADCAST(risks_and_controls_mapping)",
+        source="risks_in_ai_system_components as risks, risks_and_controls_mapping as risks_and_controls_mapping",
+        predicate="("
+        + resolved_lookup_sql(
+            "risks_and_controls_mapping", "mitigation_control_id", "mitigation_controls_id_param", "control", "mitigation_control_id", by_id=True,
+            alias="risks_and_controls_mapping",
+        )
+        + ")\nand risks_and_controls_mapping.risk_id = risks.risk_id",
+    ),
+    # Batched mapping lookups: the mapping is semi-joined with the requested ids once and each row is
+    # prefixed with the requested id it was found for, so the results of several ids can be told apart
+    Function(
+        "databricks_ai_mitigation_controls_by_risk_ids",
+        (Parameter("risk_ids_param", "ARRAY<STRING>"),),
+        "Returns the mitigation controls and all their details for each risk id of a list, e.g. array('Datasets 3.1', 'Raw Data 1.1'), with the risk id each control is mapped to",
+        CONTROLS,
+        leading=(Column(None, "mapped_risk_id", "STRING", "Requested risk id the control is mapped to", "mapping.risk_id"),),
+        alias="controls",
+        hint="BROADCAST(mapping)",
+        source=(
+            "(\n  SELECT * FROM risks_and_controls_mapping\n"
+            f"  LEFT SEMI JOIN {_exploded('risk_ids_param', 'risk_id')}\n"
+            "  ON risks_and_controls_mapping.risk_id = requested.risk_id\n) AS mapping\n"
+            "JOIN databricks_ai_mitigation_controls AS controls\n"
+            "ON mapping.mitigation_control_id = controls.mitigation_control_id"
+        ),
+    ),
+    Function(
+        "risks_in_ai_system_by_mitigation_controls_ids",
+        (Parameter("mitigation_controls_ids_param", "ARRAY<STRING>"),),
+        "Returns the risks in AI system components and all their details addressed by each mitigation control id of a list, e.g. array('DASF 1', 'DASF 5'), with the control id addressing each risk",
+        RISKS,
+        leading=(Column(None, "mapped_mitigation_control_id", "STRING", "Requested mitigation control id addressing the risk", "mapping.mitigation_control_id"),),
+        alias="risks",
+        hint="BROADCAST(mapping)",
+        source=(
+            "(\n  SELECT * FROM risks_and_controls_mapping\n"
+            f"  LEFT SEMI JOIN {_exploded('mitigation_controls_ids_param', 'mitigation_control_id')}\n"
+            "  ON risks_and_controls_mapping.mitigation_control_id = requested.mitigation_control_id\n) AS mapping\n"
+            "JOIN risks_in_ai_system_components AS risks\n"
+            "ON mapping.risk_id = risks.risk_id"
+        ),
+    ),
+    # Framework crosswalk: a reference also matches the references below it ('AC' matches 'AC-2'),
+    # HITRUST and ENISA phrases match by substring and an empty framework matches every standard
+    Function(
+        "framework_crosswalk_by_reference",
+        (Parameter("framework_param", "STRING"), Parameter("reference_id_param", "STRING")),
+        "Returns the DASF risks and mitigation controls (entity type and id) referencing a control, technique or article of an external standard. framework_param is one of mitre_atlas, mitre_attack, owasp_llm, owasp_ml, nist_800_53, hitrust, enisa, iso_42001, iso_27001, eu_ai_act (or empty for all), reference_id_param an id such as AC-2, AML.T0020, LLM01, A.6.2.6 or Article 15",
+        CROSSWALK,
+        column_names(CROSSWALK),
+        alias="crosswalk",
+        source="dasf_framework_crosswalk AS crosswalk",
+        predicate=reference_match_sql("crosswalk", "framework_param", "reference_id_param"),
+        order_by="crosswalk.framework, crosswalk.reference_id, crosswalk.entity_type, crosswalk.entity_id",
+    ),
+    Function(
+        "risks_in_ai_system_by_framework_reference",
+        (Parameter("framework_param", "STRING"), Parameter("reference_id_param", "STRING")),
+        "Returns all risks in AI system components and their details mapped to a control, technique or article of an external standard such as NIST 800-53 AC-2, MITRE ATLAS AML.T0020, OWASP LLM01, ISO 42001 A.6.2.6 or EU AI Act Article 15",
+        RISKS,
+        alias="risks",
+        source=(
+            "risks_in_ai_system_components AS risks\n"
+            "LEFT SEMI JOIN dasf_framework_crosswalk AS crosswalk\n"
+            "ON crosswalk.entity_type = 'risk' AND crosswalk.entity_id = risks.risk_id\n"
+            f"AND {reference_match_sql('crosswalk', 'framework_param', 'reference_id_param')}"
+        ),
+        order_by=_RISKS_ORDER,
+    ),
+    Function(
+        "databricks_ai_mitigation_controls_by_framework_reference",
+        (Parameter("framework_param", "STRING"), Parameter("reference_id_param", "STRING")),
+        "Returns all mitigation controls and their details mapped to a control, technique or article of an external standard such as NIST 800-53 AC-2, MITRE ATLAS AML.M0005, OWASP LLM01, ISO 27001 A.8.2 or EU AI Act Article 15",
+        CONTROLS,
+        alias="controls",
+        source=(
+            "databricks_ai_mitigation_controls AS controls\n"
+            "LEFT SEMI JOIN dasf_framework_crosswalk AS crosswalk\n"
+            "ON crosswalk.entity_type = 'control' AND crosswalk.entity_id = controls.mitigation_control_id\n"
+            f"AND {reference_match_sql('crosswalk', 'framework_param', 'reference_id_param')}"
+        ),
+        order_by="try_cast(regexp_extract(controls.mitigation_control_id, '[0-9]+', 0) AS INT)",
+    ),
+    # Risk co-mitigation graph, read from the tables precomputed by dasf.graph
+    Function(
+        "dasf_risk_comitigation_by_risk_id",
+        (Parameter("risk_id_param", "STRING"),),
+        "Returns the other risks mitigated by at least one of the mitigation controls of a given risk id, with the ids and number of the shared controls, most shared controls first",
+        RISK_COMITIGATION,
+        column_names(RISK_COMITIGATION),
+        source="dasf_risk_comitigation",
+        predicate="risk_id = risk_id_param",
+        order_by="shared_control_count DESC, related_risk_id",
+    ),
+    Function(
+        "dasf_minimum_control_set",
+        (Parameter("deployment_models_param", "STRING", "''"), Parameter("component_name_param", "STRING", "''")),
+        "Returns the smallest set of mitigation controls that together mitigate every risk applying to any of a comma separated list of deployment models (e.g. 'RAG' or 'RAG, fine-tuned LLMs', empty for all risks) within a system component (e.g. 'Raw Data', empty for all components), ranked by the number of additional risks each control covers",
+        CONTROL_COVER,
+        column_names(CONTROL_COVER),
+        alias="cover",
+        source="dasf_control_cover AS cover",
+        predicate=(
+            f"cover.deployment_models_mask = {deployment_models_mask_sql('deployment_models_param')}\n"
+            f"AND lower(cover.component_name) = {component_key_sql('component_name_param')}"
+        ),
+        order_by="cover.rank",
+    ),
+    # Precomputed counts, read from the summary table built by dasf.summary
+    Function(
+        "dasf_summary",
+        (Parameter("dimension_param", "STRING", "''"),),
+        "Returns precomputed counts of DASF risks and mitigation controls for counting questions: the total numbers of risks, controls and risk/control mappings (dimension total), risks per system_component, deployment_model and ai_novelty, controls per security_control_type, databricks_shared_responsibility and ai_system_novelty, and the distributions controls_per_risk and risks_per_control, each with its share of all risks or controls. dimension_param selects one dimension, empty for all",
+        SUMMARY,
+        column_names(SUMMARY),
+        source="dasf_summary",
+        predicate=f"dimension_param = '' OR dimension = {dimension_key_sql('dimension_param')}",
+        order_by=SUMMARY_ORDER,
+    ),
+    # Revision history, read from the diffs precomputed by dasf.revisions when a revision is ingested
+    Function(
+        "dasf_revision_changes",
+        (Parameter("revision_param", "STRING", "''"), Parameter("entity_type_param", "STRING", "''")),
+        "Returns the DASF risks and mitigation controls a compendium revision (e.g. 'DASF v 2.0', empty for the latest ingested revision) added, removed or modified compared with the revision ingested before it, with every changed field of a modified one and its previous and new values. entity_type_param restricts the changes to risk or control",
+        REVISION_DIFFS,
+        column_names(REVISION_DIFFS),
+        alias="diffs",
+        source="dasf_revision_diffs AS diffs",
+        predicate=(
+            "(diffs.revision = revision_param OR (revision_param = '' AND diffs.revision = (SELECT revision FROM dasf_revisions ORDER BY revision_number DESC LIMIT 1)))\n"
+            "AND (entity_type_param = '' OR diffs.entity_type = entity_type_param)"
+        ),
+        order_by="diffs.entity_type, diffs.entity_id, diffs.field",
+    ),
+    Function(
+        "dasf_entity_revision_history",
+        (Parameter("entity_id_param", "STRING"),),
+        "Returns every change of a DASF risk id or mitigation control id across the ingested compendium revisions, oldest revision first: when it was added or removed and which fields changed, with their previous and new values",
+        REVISION_DIFFS,
+        column_names(REVISION_DIFFS),
+        alias="diffs",
+        source="dasf_revision_diffs AS diffs JOIN dasf_revisions AS revisions ON revisions.revision = diffs.revision",
+        predicate="diffs.entity_id = entity_id_param",
+        order_by="revisions.revision_number, diffs.entity_type, diffs.field",
+    ),
+)
+
+
+def projected_function(function):
+    """Variant of a detail lookup returning the columns of a column group, one page at a time.
+
+    The lookup's query becomes a subquery numbering its rows in id order and projecting
+    the detail columns through :func:`dasf.column_groups.column_group_sql`; the variant
+    keeps the rows of the requested page.
+    """
+    columns = ",\n  ".join(column_group_sql(function.sheet, name, function.alias, "columns_param") for name in detail_column_names(function.sheet))
+    order = page_order_sql(function.sheet, function.alias)
+    query = (
+        f"SELECT {f'/*+ {function.hint} */ ' if function.hint else ''}row_number() OVER (ORDER BY {order}) AS position, CAST(count(*) OVER () AS INT) AS total_count,\n"
+        f"  {columns}\nFROM {function.source}"
+    )
+    if function.predicate:
+        query += f"\nWHERE {function.predicate}"
+    groups = ", ".join(GROUPS)
+    return function._replace(
+        name=function.name + PROJECTED_SUFFIX,
+        parameters=(
+            *function.parameters,
+            Parameter("columns_param", "STRING", f"'{DEFAULT_GROUP}'"),
+            Parameter("limit_param", "INT", str(DEFAULT_LIMIT)),
+            Parameter("offset_param", "INT", "0"),
+        ),
+        comment=(
+            f"{function.comment}. Returns only the id and title and the columns of a column group, the other columns NULL: "
+            f"columns_param is one of {groups} (e.g. docs_aws for the AWS documentation link). "
+            "The rows are ordered by id and paginated: limit_param rows (0 for all) after the first offset_param, "
+            "each with its position and the total_count of rows"
+        ),
+        columns=None,
+        leading=(
+            Column(None, "position", "INT", "Position of the row among all the rows of the lookup", "page.position"),
+            Column(None, "total_count", "INT", "Number of rows of the lookup over all pages", "page.total_count"),
+        ),
+        alias="page",
+        source=f"(\n{query}\n) AS page",
+        predicate=page_predicate_sql("page.position", "limit_param", "offset_param"),
+        order_by="page.position",
+        hint=None,
+    )
+
+
+# Column-projected and paginated variants of the wide-row lookups
+FUNCTIONS += tuple(projected_function(f) for f in FUNCTIONS if f.name in PROJECTED)
+
+
+def _signature(function):
+    parameters = ", ".join(
+        f"{p.name} {p.type}" + (f" DEFAULT {p.default}" if p.default is not None else "") for p in function.parameters
+    )
+    return f"{function.name}({parameters})"
+
+
+def _body(function):
+    if function.sheet is None:
+        return f"RETURNS {function.returns}", function.expression
+    leading = [f"{c.name} {c.type} COMMENT '{quote(c.comment)}'" for c in function.leading]
+    returns = ",\n  ".join([*leading, returns_clause(function.sheet, function.columns)])
+    select = ", ".join(
+        [*(f"{c.expression} AS {c.name}" for c in function.leading), projection(function.sheet, function.columns, function.alias)]
+    )
+    query = f"SELECT {f'/*+ {function.hint} */ ' if function.hint else ''}{select}\nFROM {function.source}"
+    if function.predicate:
+        query += f"\nWHERE {function.predicate}"
+    if function.order_by:
+        query += f"\nORDER BY {function.order_by}"
+    if function.cte:
+        name, cte = function.cte
+        query = f"WITH {name} AS (\n{cte}\n)\n{query}"
+    return f"RETURNS TABLE (\n  {returns}\n)", query
+
+
+def definition(function):
+    """CREATE OR REPLACE FUNCTION statement of ``function``, without its fingerprint."""
+    returns, body = _body(function)
+    return f"CREATE OR REPLACE FUNCTION {_signature(function)}\n{returns}\nCOMMENT '{quote(function.comment)}'\nRETURN\n{body}"
+
+
+def function_fingerprint(function):
+    """Short SHA-256 of a function's generated definition."""
+    return hashlib.sha256(definition(function).encode("utf-8")).hexdigest()[:16]
+
+
+def create_function_statement(function):
+    """CREATE OR REPLACE FUNCTION statement of ``function``, with its fingerprint at the end of the comment."""
+    returns, body = _body(function)
+    comment = f"{function.comment} [{FINGERPRINT_PREFIX}{function_fingerprint(function)}]"
+    return f"CREATE OR REPLACE FUNCTION {_signature(function)}\n{returns}\nCOMMENT '{quote(comment)}'\nRETURN\n{body}"
+
+
+def comment_fingerprint(comment):
+    """Fingerprint kept at the end of a deployed function's comment, or None."""
+    match = _FINGERPRINT.search(comment or "")
+    return match.group(1) if match else None
+
+
+def routines_query(catalog, schema):
+    """Query of the name and comment of every function deployed in ``catalog.schema``."""
+    return f"SELECT routine_name, comment FROM {catalog}.information_schema.routines WHERE routine_schema = '{quote(schema)}'"
+
+
+def deployed_fingerprints(spark, catalog, schema):
+    """Fingerprints of the functions deployed in ``catalog.schema``, by function name, read in one query."""
+    rows = spark.sql(routines_query(catalog, schema)).collect()
+    return {row.routine_name: comment_fingerprint(row.comment) for row in rows}
+
+
+def changed_functions(deployed, functions=FUNCTIONS):
+    """Functions missing from ``deployed`` or whose deployed fingerprint differs from their definition's."""
+    return [f for f in functions if deployed.get(f.name) != function_fingerprint(f)]
+
+
+# Error classes of runtimes that parse a SQL script but have SQL scripting disabled or unsupported;
+# runtimes that predate it fail to parse the script at BEGIN (see scripting_unsupported)
+SCRIPTING_UNSUPPORTED = ("UNSUPPORTED_FEATURE.SQL_SCRIPTING", "SQL_SCRIPTING_NOT_SUPPORTED", "spark.sql.scripting.enabled")
+
+
+def batch_statement(statements):
+    """One SQL script running ``statements`` in order, submitted as a single statement."""
+    return "BEGIN\n" + "\n".join(f"{statement.strip()};" for statement in statements) + "\nEND"
+
+
+def deploy_functions(spark, catalog, schema, functions=FUNCTIONS, force=False, max_workers=8):
+    """Re-create the functions whose definition changed in ``catalog.schema`` (every function with ``force``).
+
+    The changed definitions are submitted as one SQL script, dependencies first. Runtimes
+    without SQL scripting reject the script, in which case the statements are submitted
+    concurrently instead, one dependency wave at a time.
+    Returns the names of the re-created functions.
+    """
+    changed = list(functions) if force else changed_functions(deployed_fingerprints(spark, catalog, schema), functions)
+    submit_statements(spark.sql, [create_function_statement(f) for f in changed], max_workers)
+    return [f.name for f in changed]
+
+
+def scripting_unsupported(error):
+    """Whether ``error`` is a runtime rejecting a SQL script, rather than a statement of the script failing."""
+    message = str(error)
+    return any(marker in message for marker in SCRIPTING_UNSUPPORTED) or (
+        "PARSE_SYNTAX_ERROR" in message and "'BEGIN'" in message
+    )
+
+
+_CREATED_FUNCTION = re.compile(r"CREATE OR REPLACE FUNCTION\s+(?:[\w`]+\.)*`?(\w+)`?\s*\(", re.IGNORECASE)
+
+
+def statement_waves(statements):
+    """``statements`` in waves, each after the waves of the functions it calls.
+
+    A statement belongs to the wave after the last wave creating a function whose name it
+    calls, e.g. the resolved lookups after dasf_resolve_entity; statements keep their order
+    within a wave. Statements that create no function are in the first wave.
+    """
+    created = {}
+    for index, statement in enumerate(statements):
+        match = _CREATED_FUNCTION.match(statement.strip())
+        if match:
+            created[match.group(1).lower()] = index
+    calls = {
+        index: {
+            created[name]
+            for name in re.findall(r"\b(\w+)\s*\(", statement.lower())
+            if name in created and created[name] != index
+        }
+        for index, statement in enumerate(statements)
+    }
+    waves = {}
+
+    def wave(index, path=()):
+        if index not in waves:
+            if index in path:
+                raise ValueError(f"Circular function dependency in {[statements[i][:60] for i in path]}")
+            waves[index] = max((wave(called, path + (index,)) + 1 for called in calls[index]), default=0)
+        return waves[index]
+
+    for index in range(len(statements)):
+        wave(index)
+    return [[statements[i] for i in range(len(statements)) if waves[i] == w] for w in range(max(waves.values(), default=-1) + 1)]
+
+
+def submit_statements(execute, statements, max_workers=8):
+    """Run ``statements`` with ``execute`` as one SQL script, or concurrently if the runtime has no SQL scripting.
+
+    Functions are created before the functions calling them (see :func:`statement_waves`):
+    the script runs the waves in order, and without scripting the statements of a wave run
+    concurrently once the previous wave finished. Any other error of the script, such as a
+    statement failing, is raised.
+    """
+    if len(statements) == 1:
+        execute(statements[0])
+    elif statements:
+        waves = statement_waves(statements)
+        try:
+            execute(batch_statement([statement for wave in waves for statement in wave]))
+        except Exception as e:
+            if not scripting_unsupported(e):
+                raise
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for wave in waves:
+                    list(pool.map(execute, wave))
@@ -0,0 +1,259 @@
+"""Bitset-backed risk/control graph and minimum control set cover.
+
+The mapping is a bipartite graph between risks and mitigation controls. Each risk is
+an integer bitset of its controls and each control an integer bitset of the risks it
+mitigates, so "which risks does DASF 1 cover" or "which risks share a control with
+Datasets 3.1" are a few bitwise ORs. The same bitsets drive a set cover solver that
+returns the smallest set of controls mitigating every risk of a filtered subset (a
+deployment model, a component), ranked by the number of risks each control adds.
+Ingestion precomputes the risk co-mitigation pairs and the control cover of every
+deployment model and component combination into the ``dasf_risk_comitigation`` and
+``dasf_control_cover`` tables.
+"""
+from collections import namedtuple
+
+from .deployment import ALL_DEPLOYMENT_MODELS
+from .ids import control_id_sort_key, risk_id_sort_key
+
+RelatedRisk = namedtuple("RelatedRisk", ["risk_id", "related_risk_id", "shared_control_ids", "shared_control_count"])
+CoverStep = namedtuple("CoverStep", ["rank", "mitigation_control_id", "covered_risk_ids", "covered_risk_count"])
+# steps: the chosen controls in rank order; uncovered_risk_ids: risks of the subset no control mitigates;
+# optimal: whether the set is proven minimal, or the greedy set returned when the exact search ran out of nodes
+ControlCover = namedtuple("ControlCover", ["steps", "uncovered_risk_ids", "optimal"])
+# Rows of dasf_control_cover: a deployment_models_mask of 0 and an empty component_name select every risk
+ControlCoverRow = namedtuple(
+    "ControlCoverRow",
+    [
+        "deployment_models_mask",
+        "component_name",
+        "rank",
+        "mitigation_control_id",
+        "covered_risk_ids",
+        "covered_risk_count",
+        "scope_risk_count",
+        "optimal",
+    ],
+)
+
+# Nodes visited by the exact search before it falls back to the greedy cover
+MAX_SEARCH_NODES = 200_000
+
+
+def _count(bits):
+    return bin(bits).count("1")
+
+
+def _members(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _SearchExhausted(Exception):
+    pass
+
+
+class RiskControlGraph:
+    """Risks and mitigation controls as bitsets over each other, indexed in natural id order.
+
+    ``risks`` are rows with a ``risk_id`` field and ``mapping`` rows with ``risk_id`` and
+    ``mitigation_control_id`` fields. Risks without a mapped control are kept, with an
+    empty bitset, so a subset containing them reports them as uncovered.
+    """
+
+    def __init__(self, risks, mapping):
+        mapping = [e for e in mapping if e.risk_id is not None and e.mitigation_control_id is not None]
+        risk_ids = {r.risk_id for r in risks if r.risk_id is not None} | {e.risk_id for e in mapping}
+        self.risk_ids = sorted(risk_ids, key=risk_id_sort_key)
+        self.control_ids = sorted({e.mitigation_control_id for e in mapping}, key=control_id_sort_key)
+        self._risk_bits = {risk_id: 1 << i for i, risk_id in enumerate(self.risk_ids)}
+        self._control_bits = {control_id: 1 << i for i, control_id in enumerate(self.control_ids)}
+
+        # Controls of each risk and risks of each control
+        self.risk_controls = [0] * len(self.risk_ids)
+        self.control_risks = [0] * len(self.control_ids)
+        for edge in mapping:
+            r = self._risk_bits[edge.risk_id].bit_length() - 1
+            c = self._control_bits[edge.mitigation_control_id].bit_length() - 1
+            self.risk_controls[r] |= 1 << c
+            self.control_risks[c] |= 1 << r
+
+        # Risks sharing at least one control with each risk, itself excluded
+        self.risk_adjacency = []
+        for r, controls in enumerate(self.risk_controls):
+            adjacent = 0
+            for c in _members(controls):
+                adjacent |= self.control_risks[c]
+            self.risk_adjacency.append(adjacent & ~(1 << r))
+
+    def risk_mask(self, risk_ids):
+        """Bitset of ``risk_ids``, ignoring unknown ids."""
+        mask = 0
+        for risk_id in risk_ids or ():
+            mask |= self._risk_bits.get(risk_id, 0)
+        return mask
+
+    def control_mask(self, control_ids):
+        """Bitset of ``control_ids``, ignoring unknown ids."""
+        mask = 0
+        for control_id in control_ids or ():
+            mask |= self._control_bits.get(control_id, 0)
+        return mask
+
+    def risk_ids_of(self, mask):
+        """Risk ids of a risk bitset, in natural order."""
+        return [self.risk_ids[r] for r in _members(mask)]
+
+    def control_ids_of(self, mask):
+        """Mitigation control ids of a control bitset, in natural order."""
+        return [self.control_ids[c] for c in _members(mask)]
+
+    def risks_covered_by(self, control_ids):
+        """Ids of the risks mitigated by any of ``control_ids``."""
+        covered = 0
+        for c in _members(self.control_mask(control_ids)):
+            covered |= self.control_risks[c]
+        return self.risk_ids_of(covered)
+
+    def related_risks(self, risk_id):
+        """Risks sharing a control with ``risk_id``, most shared controls first."""
+        bit = self._risk_bits.get(risk_id)
+        if bit is None:
+            return []
+        r = bit.bit_length() - 1
+        controls = self.risk_controls[r]
+        related = []
+        for other in _members(self.risk_adjacency[r]):
+            shared = controls & self.risk_controls[other]
+            related.append(RelatedRisk(risk_id, self.risk_ids[other], self.control_ids_of(shared), _count(shared)))
+        return sorted(related, key=lambda row: (-row.shared_control_count, row.related_risk_id))
+
+    def comitigation_rows(self):
+        """Rows of dasf_risk_comitigation: every ordered pair of risks sharing a control."""
+        return [row for risk_id in self.risk_ids for row in self.related_risks(risk_id)]
+
+    def minimum_control_set(self, risk_ids, exact=True, max_nodes=MAX_SEARCH_NODES):
+        """Smallest set of controls mitigating every risk of ``risk_ids``, as a :class:`ControlCover`.
+
+        The greedy cover (the control adding the most uncovered risks first) is improved by a
+        branch and bound search when ``exact``; if the search visits more than ``max_nodes``
+        nodes the greedy cover is returned with ``optimal`` False.
+        """
+        subset = self.risk_mask(risk_ids)
+        return self._cover(subset, exact, max_nodes)
+
+    def _cover(self, subset, exact=True, max_nodes=MAX_SEARCH_NODES):
+        coverable = 0
+        for r in _members(subset):
+            if self.risk_controls[r]:
+                coverable |= 1 << r
+        # Only the controls mitigating a risk of the subset, restricted to the subset
+        candidates = [(c, risks & coverable) for c, risks in enumerate(self.control_risks) if risks & coverable]
+        chosen = _greedy(coverable, candidates)
+        optimal = False
+        if exact:
+            try:
+                chosen = _exact(coverable, candidates, chosen, max_nodes)
+                optimal = True
+            except _SearchExhausted:
+                pass
+        return ControlCover(self._rank(coverable, chosen), self.risk_ids_of(subset & ~coverable), optimal or not coverable)
+
+    def _rank(self, coverable, chosen):
+        # Order the chosen controls by the risks each adds to the ones before it, as the greedy cover does
+        steps, covered, remaining = [], 0, list(chosen)
+        while remaining:
+            best = max(remaining, key=lambda c: (_count(self.control_risks[c] & coverable & ~covered), -c))
+            remaining.remove(best)
+            added = self.control_risks[best] & coverable & ~covered
+            covered |= added
+            steps.append(CoverStep(len(steps) + 1, self.control_ids[best], self.risk_ids_of(added), _count(covered)))
+        return steps
+
+    def control_cover_rows(self, risks, exact=True, max_nodes=MAX_SEARCH_NODES):
+        """Rows of dasf_control_cover for every deployment model combination and component of ``risks``.
+
+        ``risks`` are rows with ``risk_id``, ``component_name`` and ``deployment_models_mask``
+        fields. A scope selects the risks applying to any deployment model of its mask (every
+        risk for 0) within its component (every component for ''); empty scopes have no rows.
+        """
+        # Risk bitsets of every deployment model bit and every component, intersected per scope
+        by_model = {bit: 0 for bit in _members(ALL_DEPLOYMENT_MODELS)}
+        by_component = {"": self.risk_mask(r.risk_id for r in risks)}
+        for r in risks:
+            bit = self._risk_bits.get(r.risk_id, 0)
+            for model in _members((r.deployment_models_mask or 0) & ALL_DEPLOYMENT_MODELS):
+                by_model[model] |= bit
+            if r.component_name is not None:
+                by_component[r.component_name] = by_component.get(r.component_name, 0) | bit
+        rows, covers = [], {}
+        for mask in range(ALL_DEPLOYMENT_MODELS + 1):
+            selected = by_component[""] if mask == 0 else 0
+            for model in _members(mask):
+                selected |= by_model[model]
+            for component in sorted(by_component, key=str.lower):
+                subset = selected & by_component[component]
+                if not subset:
+                    continue
+                # Many combinations select the same risks, so each distinct subset is solved once
+                if subset not in covers:
+                    covers[subset] = self._cover(subset, exact, max_nodes)
+                cover = covers[subset]
+                rows.extend(
+                    ControlCoverRow(mask, component, *step, _count(subset), cover.optimal) for step in cover.steps
+                )
+        return rows
+
+
+def _greedy(universe, candidates):
+    chosen, uncovered = [], universe
+    while uncovered:
+        c, risks = max(candidates, key=lambda candidate: (_count(candidate[1] & uncovered), -candidate[0]))
+        chosen.append(c)
+        uncovered &= ~risks
+    return chosen
+
+
+def _exact(universe, candidates, best, max_nodes):
+    """Minimum cover of ``universe`` by branch and bound, starting from the ``best`` cover known."""
+    # A control whose risks are a subset of another's is never needed in a minimum cover
+    kept = []
+    for c, risks in sorted(candidates, key=lambda candidate: (-_count(candidate[1]), candidate[0])):
+        if all(risks & ~other for _, other in kept):
+            kept.append((c, risks))
+    covering = dict(kept)
+    options = {r: [c for c, risks in kept if risks >> r & 1] for r in _members(universe)}
+    best = list(best)
+    nodes = 0
+
+    def lower_bound(uncovered):
+        # Risks with pairwise disjoint controls each need a control of their own
+        bound, used = 0, 0
+        for r in sorted(_members(uncovered), key=lambda r: len(options[r])):
+            controls = sum(1 << c for c in options[r])
+            if not controls & used:
+                bound += 1
+                used |= controls
+        widest = max(_count(risks & uncovered) for risks in covering.values())
+        return max(bound, -(-_count(uncovered) // widest))
+
+    def search(uncovered, chosen):
+        nonlocal best, nodes
+        nodes += 1
+        if nodes > max_nodes:
+            raise _SearchExhausted()
+        if not uncovered:
+            best = list(chosen)
+            return
+        if len(chosen) + lower_bound(uncovered) >= len(best):
+            return
+        # Branch on the uncovered risk with the fewest controls, trying the widest controls first
+        risk = min(_members(uncovered), key=lambda r: len(options[r]))
+        for c in sorted(options[risk], key=lambda c: (-_count(covering[c] & uncovered), c)):
+            chosen.append(c)
+            search(uncovered & ~covering[c], chosen)
+            chosen.pop()
+
+    search(universe, [])
+    return best
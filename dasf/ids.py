@@ -0,0 +1,142 @@
+"""Canonical DASF risk and mitigation control identifiers.
+
+The two compendium sheets spell the same ids differently: "Raw data 1.1" and
+"Raw Data 1.1", em-dashes and hyphens ("Model Serving - Inference requests 9.1"),
+stray spaces and trailing titles ("Platform 12.7: Initial Access"). The parsers here
+reduce both spellings to the ids used by the risks sheet, so the mapping built from
+both sheets joins exactly in either direction.
+"""
+import re
+from collections import namedtuple
+
+Mapping = namedtuple("Mapping", ["risk_id", "mitigation_control_id"])
+
+# Any dash with its surrounding spaces, written back as the risks sheet's " — "
+_DASH = re.compile(" *[-–—] *")
+_SPACES = re.compile(" +")
+_RISK_ID = re.compile(r"^(?P<component>.*?) *(?P<number>\d+)\.(?P<sub_number>\d+)")
+_CONTROL_ID = re.compile(r"^DASF *(?P<number>\d+)$", re.IGNORECASE)
+
+_COMPONENT_QUERY = re.compile(r"^(?P<component>.*?) *(?P<number>\d+)?(?:\.(?P<sub_number>\d+))?$")
+
+RiskIdParts = namedtuple("RiskIdParts", ["component_name", "component_number", "component_sub_number"])
+
+# Spark SQL equivalents of normalize_risk_id and parse_risk_id, applied to the risks sheet's own ids on ingest
+RISK_ID_EXPRESSION = "regexp_replace(regexp_replace(trim(`Risk ID`), ' *[-–—] *', ' — '), ' +', ' ')"
+_RISK_ID_SQL_PATTERN = "'^(.*?) *([0-9]+)[.]([0-9]+)'"
+COMPONENT_NAME_EXPRESSION = f"nullif(regexp_extract({RISK_ID_EXPRESSION}, {_RISK_ID_SQL_PATTERN}, 1), '')"
+COMPONENT_NUMBER_EXPRESSION = f"try_cast(nullif(regexp_extract({RISK_ID_EXPRESSION}, {_RISK_ID_SQL_PATTERN}, 2), '') AS INT)"
+COMPONENT_SUB_NUMBER_EXPRESSION = f"try_cast(nullif(regexp_extract({RISK_ID_EXPRESSION}, {_RISK_ID_SQL_PATTERN}, 3), '') AS INT)"
+_COMPONENT_QUERY_SQL_PATTERN = "'^(.*?) *([0-9]+)?(?:[.]([0-9]+))?$'"
+
+
+def component_key_sql(param):
+    """Spark SQL expression normalizing and lower-casing a component lookup parameter."""
+    return f"lower(regexp_replace(regexp_replace(trim({param}), ' *[-–—] *', ' — '), ' +', ' '))"
+
+
+def component_query_sql(param):
+    """Spark SQL query returning parse_component_query of a function parameter as one row."""
+    return (
+        f"SELECT regexp_extract(lookup_key, {_COMPONENT_QUERY_SQL_PATTERN}, 1) AS component_name,\n"
+        f"  try_cast(nullif(regexp_extract(lookup_key, {_COMPONENT_QUERY_SQL_PATTERN}, 2), '') AS INT) AS component_number,\n"
+        f"  try_cast(nullif(regexp_extract(lookup_key, {_COMPONENT_QUERY_SQL_PATTERN}, 3), '') AS INT) AS component_sub_number\n"
+        f"FROM (SELECT {component_key_sql(param)} AS lookup_key) AS normalized"
+    )
+
+
+def normalize_risk_id(text):
+    """Trim a risk id, collapse its spaces and write every dash as ' — '."""
+    if text is None:
+        return None
+    return _SPACES.sub(" ", _DASH.sub(" — ", text.strip(" ")))
+
+
+def risk_id_key(text):
+    """Case-insensitive lookup key of a risk id."""
+    return normalize_risk_id(text).lower()
+
+
+def canonical_risk_id(text, known=None):
+    """Canonical risk id of a reference such as ' Raw data 1.1' or 'Platform 12.7: Initial Access'.
+
+    ``known`` maps :func:`risk_id_key` keys to the risks sheet's spelling; references found
+    there take that spelling. Returns None for text that does not contain a risk id.
+    """
+    match = _RISK_ID.match(normalize_risk_id(text or ""))
+    if match is None:
+        return None
+    risk_id = f"{match['component']} {match['number']}.{match['sub_number']}".strip()
+    if known is not None:
+        return known.get(risk_id.lower(), risk_id)
+    return risk_id
+
+
+def parse_risk_id(risk_id):
+    """Split a risk id such as 'Raw Data 1.10' into ('Raw Data', 1, 10), or None if it has no number."""
+    match = _RISK_ID.match(normalize_risk_id(risk_id or ""))
+    if match is None or not match["component"]:
+        return None
+    return RiskIdParts(match["component"], int(match["number"]), int(match["sub_number"]))
+
+
+def parse_component_query(text):
+    """Split a component lookup into a lower-cased component name and optional numbers.
+
+    'Raw Data 1.10' gives ('raw data', 1, 10), 'Data Prep 2' gives ('data prep', 2, None)
+    and 'Model Serving' gives ('model serving', None, None).
+    """
+    match = _COMPONENT_QUERY.match(normalize_risk_id(text or "").lower())
+    number, sub_number = match["number"], match["sub_number"]
+    return RiskIdParts(
+        match["component"],
+        int(number) if number is not None else None,
+        int(sub_number) if sub_number is not None else None,
+    )
+
+
+def canonical_control_id(text):
+    """Canonical mitigation control id ('DASF 1') of a reference such as ' dasf1 ', or None."""
+    match = _CONTROL_ID.match((text or "").strip())
+    return f"DASF {int(match['number'])}" if match else None
+
+
+def risk_id_sort_key(risk_id):
+    """Natural sort key of a risk id, so 'Raw Data 1.2' sorts before 'Raw Data 1.10'."""
+    match = _RISK_ID.match(risk_id)
+    if match is None:
+        return (risk_id.lower(), 0, 0)
+    return (match["component"].lower(), int(match["number"]), int(match["sub_number"]))
+
+
+def control_id_sort_key(control_id):
+    """Natural sort key of a mitigation control id, so 'DASF 2' sorts before 'DASF 10'."""
+    match = _CONTROL_ID.match(control_id)
+    return (int(match["number"]) if match else 0, control_id)
+
+
+def split_ids(cell):
+    """Split a comma separated id cell into its non-empty parts."""
+    return [part for part in (cell or "").split(",") if part.strip()]
+
+
+def build_edges(risks, controls):
+    """Reconcile both sheets into one sorted, deduplicated list of risk to control edges.
+
+    Edges come from the risks sheet's ``mitigation_control_ids`` and the controls sheet's
+    ``risk_id`` references. Both ends are canonicalized, and edges whose risk or control
+    does not exist in its sheet are dropped. ``risks`` and ``controls`` are rows with
+    ``risk_id``/``mitigation_control_ids`` and ``mitigation_control_id``/``risk_id`` fields.
+    """
+    known_risks = {risk_id_key(r.risk_id): r.risk_id for r in risks if r.risk_id is not None}
+    risk_ids = set(known_risks.values())
+    control_ids = {c.mitigation_control_id for c in controls}
+    edges = set()
+    for risk in risks:
+        for reference in split_ids(risk.mitigation_control_ids):
+            edges.add((risk.risk_id, canonical_control_id(reference)))
+    for control in controls:
+        for reference in split_ids(control.risk_id):
+            edges.add((canonical_risk_id(reference, known_risks), control.mitigation_control_id))
+    edges = [Mapping(*e) for e in edges if e[0] in risk_ids and e[1] in control_ids]
+    return sorted(edges, key=lambda e: (risk_id_sort_key(e.risk_id), control_id_sort_key(e.mitigation_control_id)))
@@ -0,0 +1,125 @@
+"""Content-hash driven incremental ingestion.
+
+Each table stores the SHA-256 fingerprint of the source file(s) it was built from, its
+column spec and the code deriving it as a table property. When the fingerprint of the
+shipped TSV matches, setup skips the copy, the parse and the write for that table. When it differs, only the changed rows are
+applied with a MERGE keyed on the sheet's key columns.
+"""
+import functools
+import hashlib
+import os
+
+from .schema import column_names, quote, returns_clause
+
+FINGERPRINT_PROPERTY = "dasf.source_sha256"
+
+# Bump when the ingestion logic changes in a way neither the column specs nor the
+# DERIVATION_MODULES capture, so tables built by the previous logic are rebuilt even
+# though the TSVs are unchanged
+INGEST_VERSION = "1"
+
+# Modules of the dasf package whose code parses the sheets and derives the table rows;
+# their source is part of every table fingerprint, so a change to them rebuilds the tables
+DERIVATION_MODULES = ("sheets", "ids", "crosswalk", "deployment", "graph", "resolve", "retrieval", "summary", "ingest")
+
+
+def file_fingerprint(path, chunk_size=1 << 16):
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def combined_fingerprint(*fingerprints):
+    """Fingerprint of a table derived from several source files."""
+    if len(fingerprints) == 1:
+        return fingerprints[0]
+    return hashlib.sha256(",".join(fingerprints).encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint(modules=DERIVATION_MODULES):
+    """Fingerprint of the source files of the dasf ``modules``."""
+    package = os.path.dirname(os.path.abspath(__file__))
+    return combined_fingerprint(*(file_fingerprint(os.path.join(package, f"{module}.py")) for module in modules))
+
+
+def table_source_fingerprint(sheet, *file_fingerprints):
+    """Fingerprint stored on a table: its source files, its column spec, the derivation code and the ingestion logic version."""
+    spec = hashlib.sha256(repr(sheet).encode("utf-8")).hexdigest()
+    return combined_fingerprint(INGEST_VERSION, code_fingerprint(), spec, *file_fingerprints)
+
+
+def create_table_statement(sheet, table=None, replace=False, properties=None):
+    """CREATE TABLE statement with the sheet's declared columns, comments and description."""
+    verb = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+    statement = f"{verb} {table or sheet.table} (\n  {returns_clause(sheet, column_names(sheet))}\n)"
+    if sheet.cluster_by:
+        statement += f"\nCLUSTER BY ({', '.join(sheet.cluster_by)})"
+    statement += f"\nCOMMENT '{quote(sheet.description)}'"
+    if properties:
+        statement += "\nTBLPROPERTIES (" + ", ".join(f"'{k}' = '{quote(v)}'" for k, v in properties.items()) + ")"
+    return statement
+
+
+def merge_statement(sheet, source, table=None, scope=None):
+    """MERGE applying only inserted, changed and deleted rows of ``source`` to the table, keyed on ``sheet.keys``.
+
+    ``scope`` is a condition on the ``target`` rows limiting the deletes to the rows ``source`` replaces.
+    """
+    values = [name for name in column_names(sheet) if name not in sheet.keys]
+    statement = (
+        f"MERGE INTO {table or sheet.table} AS target\n"
+        f"USING {source} AS source\n"
+        f"ON " + " AND ".join(f"target.{k} <=> source.{k}" for k in sheet.keys)
+    )
+    if values:
+        changed = " AND ".join(f"target.{v} <=> source.{v}" for v in values)
+        statement += f"\nWHEN MATCHED AND NOT ({changed}) THEN UPDATE SET *"
+    statement += "\nWHEN NOT MATCHED THEN INSERT *\nWHEN NOT MATCHED BY SOURCE" + (f" AND {scope}" if scope else "") + " THEN DELETE"
+    return statement
+
+
+def table_fingerprint(spark, table):
+    """Fingerprint stored on ``table``, or None if the table or the property does not exist."""
+    if not spark.catalog.tableExists(table):
+        return None
+    properties = {row.key: row.value for row in spark.sql(f"SHOW TBLPROPERTIES {table}").collect()}
+    return properties.get(FINGERPRINT_PROPERTY)
+
+
+def merge_into_table(spark, df, sheet, table, fingerprint, properties=None, scope=None):
+    """Apply ``df`` to ``table`` with a keyed MERGE and record the source fingerprint.
+
+    The table is created from the declared columns on first use, and replaced when its
+    columns no longer match the spec. Clustered tables are re-clustered after the MERGE.
+    Returns the MERGE's operation metrics from the table history (numTargetRowsInserted,
+    numTargetBytesAdded, ...) as strings. ``scope`` limits the deletes as in :func:`merge_statement`.
+    """
+    exists = spark.catalog.tableExists(table)
+    if not exists or spark.table(table).columns != column_names(sheet):
+        spark.sql(create_table_statement(sheet, table, replace=exists, properties=properties))
+    elif sheet.cluster_by:
+        spark.sql(f"ALTER TABLE {table} CLUSTER BY ({', '.join(sheet.cluster_by)})")
+    source = f"dasf_source_{sheet.table}"
+    df.select(column_names(sheet)).createOrReplaceTempView(source)
+    spark.sql(merge_statement(sheet, source, table, scope))
+    operation_metrics = last_operation_metrics(spark, table)
+    if sheet.cluster_by:
+        spark.sql(f"OPTIMIZE {table}")
+    spark.sql(f"ALTER TABLE {table} SET TBLPROPERTIES ('{FINGERPRINT_PROPERTY}' = '{fingerprint}')")
+    return operation_metrics
+
+
+def last_operation_metrics(spark, table):
+    """Operation metrics of the latest commit to ``table``."""
+    history = spark.sql(f"DESCRIBE HISTORY {table} LIMIT 1").first()
+    return dict(history.operationMetrics or {}) if history is not None else {}
+
+
+def merge_row_count(operation_metrics):
+    """Rows inserted, updated or deleted by a MERGE, from its operation metrics."""
+    keys = ("numTargetRowsInserted", "numTargetRowsUpdated", "numTargetRowsDeleted")
+    return sum(int(operation_metrics.get(key, 0)) for key in keys)
@@ -0,0 +1,502 @@
+"""Ingestion of the compendium TSVs into the DASF tables, with two backends.
+
+:class:`SparkBackend` is the Unity Catalog path used by ``notebooks/setup.py``: the
+sheets are read by Spark with the declared schema and applied to Delta tables with a
+keyed MERGE. :class:`LocalBackend` needs no JVM: the sheets are parsed by
+:mod:`dasf.sheets` and every table is written as Parquet (with pyarrow installed) or
+JSON Lines. Both derive the mapping, crosswalk, deployment model, co-mitigation,
+control cover, entity index, text retrieval and summary tables from the parsed sheet rows with
+the same functions, so their outputs are identical. The local backend also persists the
+text retrieval index as memory-mappable arrays (see :mod:`dasf.retrieval`) and the risks,
+controls and mapping as a dictionary-encoded snapshot (see :mod:`dasf.snapshot`). Both file the
+compendium under its revision in the revision history tables, next to the revisions
+ingested before, and record its changes (see :mod:`dasf.revisions`). Both append the rows
+each load inserted, updated or deleted to the change log (see :mod:`dasf.changes`). Both
+validate the TSVs first and write nothing when they fail (see :mod:`dasf.validate`).
+"""
+import json
+import os
+import shutil
+from collections import namedtuple
+
+from .changes import append_jsonl, change_events, next_version
+from .crosswalk import CONTROL, CONTROL_FRAMEWORK_COLUMNS, RISK, RISK_FRAMEWORK_COLUMNS, build_crosswalk
+from .deployment import deployment_model_risk_sets
+from .graph import RiskControlGraph
+from .ids import build_edges
+from .incremental import create_table_statement, file_fingerprint, merge_into_table, merge_row_count, table_fingerprint, table_source_fingerprint
+from .metrics import StageMetrics
+from .resolve import entity_terms
+from .retrieval import RETRIEVAL_INDEX, RetrievalIndex, text_chunks, text_postings
+from .revisions import REVISION_TABLES, RevisionHistory, SqlRevisionStore, compendium_revision, compendium_rows, content_hash, plan_revision, update_scopes, update_tables
+from .schema import (
+    CHANGE_LOG,
+    CONTROL_COVER,
+    CONTROL_REVISIONS,
+    CONTROLS,
+    CROSSWALK,
+    DEPLOYMENT_MODEL_RISKS,
+    ENTITY_INDEX,
+    MAPPING,
+    REVISION_DIFFS,
+    REVISIONS,
+    RISK_COMITIGATION,
+    RISK_REVISIONS,
+    RISKS,
+    SUMMARY,
+    TEXT_CHUNKS,
+    TEXT_POSTINGS,
+    column_names,
+    reader_schema,
+    select_columns,
+    target_columns,
+)
+from .sheets import RESOURCES_DIR, load_controls, load_risks
+from .snapshot import SNAPSHOT_FILE, SNAPSHOT_TABLES, write_snapshot
+from .summary import summary_rows
+from .validate import validate_resources
+
+# Tables in ingestion order
+TABLES = (RISKS, CONTROLS, MAPPING, CROSSWALK, DEPLOYMENT_MODEL_RISKS, RISK_COMITIGATION, CONTROL_COVER, ENTITY_INDEX, TEXT_CHUNKS, TEXT_POSTINGS, SUMMARY)
+
+TABLE_TAGS = {
+    RISKS.table: "AI, Risks, System Components",
+    CONTROLS.table: "AI, Security, Controls",
+    MAPPING.table: "AI, Risks, Mitigation Components",
+    CROSSWALK.table: "AI, Risks, Controls, Standards",
+    DEPLOYMENT_MODEL_RISKS.table: "AI, Risks, Deployment Models",
+    RISK_COMITIGATION.table: "AI, Risks, Mitigation Components",
+    CONTROL_COVER.table: "AI, Risks, Controls, Deployment Models",
+    ENTITY_INDEX.table: "AI, Risks, Controls, Search",
+    TEXT_CHUNKS.table: "AI, Risks, Controls, Search",
+    TEXT_POSTINGS.table: "AI, Risks, Controls, Search",
+    SUMMARY.table: "AI, Risks, Controls, Statistics",
+    RISK_REVISIONS.table: "AI, Risks, Revisions",
+    CONTROL_REVISIONS.table: "AI, Security, Controls, Revisions",
+    REVISIONS.table: "AI, Revisions",
+    REVISION_DIFFS.table: "AI, Risks, Controls, Revisions",
+    CHANGE_LOG.table: "AI, Risks, Controls, Changes",
+}
+
+# Source files of every table, for its fingerprint
+TABLE_SOURCES = {
+    RISKS.table: (RISKS.file,),
+    CONTROLS.table: (CONTROLS.file,),
+    MAPPING.table: (RISKS.file, CONTROLS.file),
+    CROSSWALK.table: (RISKS.file, CONTROLS.file),
+    DEPLOYMENT_MODEL_RISKS.table: (RISKS.file,),
+    RISK_COMITIGATION.table: (RISKS.file, CONTROLS.file),
+    CONTROL_COVER.table: (RISKS.file, CONTROLS.file),
+    ENTITY_INDEX.table: (RISKS.file, CONTROLS.file),
+    TEXT_CHUNKS.table: (RISKS.file, CONTROLS.file),
+    TEXT_POSTINGS.table: (RISKS.file, CONTROLS.file),
+    SUMMARY.table: (RISKS.file, CONTROLS.file),
+}
+
+
+def derived_tables(risks, controls):
+    """Rows of the tables derived from the parsed sheets, keyed by table name.
+
+    ``risks`` and ``controls`` are table rows (namedtuples or Spark Rows) of the two sheets.
+    """
+    edges = build_edges(risks, controls)
+    graph = RiskControlGraph(risks, edges)
+    chunks = text_chunks(risks, controls)
+    return {
+        MAPPING.table: edges,
+        CROSSWALK.table: build_crosswalk(risks, controls),
+        DEPLOYMENT_MODEL_RISKS.table: deployment_model_risk_sets(risks),
+        RISK_COMITIGATION.table: graph.comitigation_rows(),
+        CONTROL_COVER.table: graph.control_cover_rows(risks),
+        ENTITY_INDEX.table: entity_terms(risks, controls),
+        TEXT_CHUNKS.table: chunks,
+        TEXT_POSTINGS.table: text_postings(chunks),
+        SUMMARY.table: summary_rows(risks, controls, edges),
+    }
+
+
+def table_fingerprints(resources_dir):
+    """Fingerprint of every table, from the source files in ``resources_dir``."""
+    files = {sheet.file: file_fingerprint(os.path.join(resources_dir, sheet.file)) for sheet in (RISKS, CONTROLS)}
+    return {sheet.table: table_source_fingerprint(sheet, *(files[f] for f in TABLE_SOURCES[sheet.table])) for sheet in TABLES}
+
+
+def spark_schema(sheet):
+    """DDL schema string of a table, for creating a DataFrame from its rows."""
+    return ", ".join(f"{c.name} {c.type}" for c in target_columns(sheet))
+
+
+def spark_read_sheet(spark, path, sheet):
+    """Read a sheet's TSV with the declared schema in a single pass.
+
+    enforceSchema is disabled so a renamed header fails the read instead of silently shifting columns.
+    """
+    return (
+        spark.read.format("csv")
+        .option("header", True)
+        .option("enforceSchema", False)
+        .option("delimiter", "\t")
+        .schema(reader_schema(sheet))
+        .load(path)
+    )
+
+
+def spark_sheet_table(spark, path, sheet):
+    """Table DataFrame of a sheet: its TSV read, renamed and derived as declared in dasf.schema."""
+    return spark_read_sheet(spark, path, sheet).select(select_columns(sheet))
+
+
+def local_tables(resources_dir=RESOURCES_DIR):
+    """Rows of every table parsed without Spark, keyed by table name."""
+    risks, controls = load_risks(resources_dir), load_controls(resources_dir)
+    return {RISKS.table: risks, CONTROLS.table: controls, **derived_tables(risks, controls)}
+
+
+def spark_tables(spark, resources_dir=RESOURCES_DIR):
+    """Rows of every table parsed by Spark, keyed by table name."""
+    risks = spark_sheet_table(spark, os.path.join(resources_dir, RISKS.file), RISKS).collect()
+    controls = spark_sheet_table(spark, os.path.join(resources_dir, CONTROLS.file), CONTROLS).collect()
+    return {RISKS.table: risks, CONTROLS.table: controls, **derived_tables(risks, controls)}
+
+
+class LocalBackend:
+    """Writes every table to ``output_dir`` as ``<table>.parquet``, or ``<table>.jsonl`` without pyarrow."""
+
+    def __init__(self, output_dir, format=None):
+        if format is None:
+            try:
+                import pyarrow  # noqa: F401
+
+                format = "parquet"
+            except ImportError:
+                format = "jsonl"
+        if format not in ("parquet", "jsonl"):
+            raise ValueError(f"Unsupported output format {format!r}, expected 'parquet' or 'jsonl'")
+        self.output_dir = output_dir
+        self.format = format
+
+    def write(self, sheet, rows):
+        """Write a table's rows and return the path of the written file."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{sheet.table}.{self.format}")
+        names = column_names(sheet)
+        records = [dict(zip(names, (getattr(row, name) for name in names))) for row in rows]
+        if self.format == "parquet":
+            _write_parquet(path, sheet, records)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return path
+
+    def read(self, sheet):
+        """Rows of a table written to ``output_dir`` before, or an empty list if it was not."""
+        path = os.path.join(self.output_dir, f"{sheet.table}.{self.format}")
+        if not os.path.exists(path):
+            return []
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            records = pq.read_table(path).to_pylist()
+        else:
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        row_type = namedtuple("Row", column_names(sheet))
+        return [row_type(**record) for record in records]
+
+    def ingest(self, resources_dir=RESOURCES_DIR, metrics=None, revision=None, change_stream=None):
+        """Parse the TSVs in ``resources_dir``, write every table, the retrieval index and the snapshot.
+
+        The compendium is added to the revision history already in ``output_dir`` under
+        ``revision`` (its latest DASF revision by default), and the revision tables are
+        rewritten when that changes them. The risks and controls inserted, updated or deleted
+        since the tables in ``output_dir`` were written are appended to the change log, and
+        to the JSON Lines file ``change_stream`` if given. Returns the written paths by table
+        name, the index directory under ``dasf_retrieval_index`` and the snapshot under
+        ``dasf_snapshot.bin``.
+
+        Each parse, derivation and write is recorded in ``metrics``, a :class:`dasf.metrics.StageMetrics`, if given.
+        Raises :class:`dasf.validate.ValidationError` before writing anything when the TSVs fail validation.
+        """
+        metrics = metrics if metrics is not None else StageMetrics()
+        with metrics.stage("validate", resources_dir) as stage:
+            report = validate_resources(resources_dir)
+            stage.rows_in = stage.rows_out = report.row_count
+            stage.detail = report.summary()
+        report.raise_for_errors()
+        # The rows read are those the validation counted, so no stage reads a sheet twice to count it
+        with metrics.stage("parse", RISKS.file, rows_in=report.rows.get(RISKS.file)) as stage:
+            risks = load_risks(resources_dir)
+            stage.rows_out = len(risks)
+        with metrics.stage("parse", CONTROLS.file, rows_in=report.rows.get(CONTROLS.file)) as stage:
+            controls = load_controls(resources_dir)
+            stage.rows_out = len(controls)
+        with metrics.stage("derive", ", ".join(sheet.table for sheet in TABLES[2:]), rows_in=len(risks) + len(controls)) as stage:
+            tables = {RISKS.table: risks, CONTROLS.table: controls, **derived_tables(risks, controls)}
+            stage.rows_out = sum(len(tables[sheet.table]) for sheet in TABLES[2:])
+        previous = {RISK: self.read(RISKS), CONTROL: self.read(CONTROLS)}
+        paths = {}
+        for sheet in TABLES:
+            with metrics.stage("write", sheet.table, rows_in=len(tables[sheet.table])) as stage:
+                paths[sheet.table] = self.write(sheet, tables[sheet.table])
+                stage.rows_out = len(tables[sheet.table])
+                stage.bytes_written = os.path.getsize(paths[sheet.table])
+        with metrics.stage("index", RETRIEVAL_INDEX, rows_in=len(tables[TEXT_POSTINGS.table])) as stage:
+            index = RetrievalIndex(tables[TEXT_CHUNKS.table], tables[TEXT_POSTINGS.table])
+            if _has_numpy():
+                index.embeddings = index.embed_chunks()
+            paths[RETRIEVAL_INDEX] = index.save(os.path.join(self.output_dir, RETRIEVAL_INDEX))
+            stage.rows_out = len(index.chunks)
+            stage.bytes_written = sum(entry.stat().st_size for entry in os.scandir(paths[RETRIEVAL_INDEX]))
+        with metrics.stage("snapshot", SNAPSHOT_FILE, rows_in=sum(len(tables[sheet.table]) for sheet in SNAPSHOT_TABLES)) as stage:
+            paths[SNAPSHOT_FILE] = write_snapshot(os.path.join(self.output_dir, SNAPSHOT_FILE), tables)
+            stage.rows_out = stage.rows_in
+            stage.bytes_written = os.path.getsize(paths[SNAPSHOT_FILE])
+        history = RevisionHistory.from_tables({sheet.table: self.read(sheet) for sheet in REVISION_TABLES})
+        with metrics.stage("revisions", ", ".join(sheet.table for sheet in REVISION_TABLES), rows_in=len(risks) + len(controls)) as stage:
+            update = history.ingest(risks, controls, revision)
+            stage.rows_out = len(update.diffs) if update is not None else 0
+            stage.skipped = update is None
+        if update is not None:
+            revision_tables = history.tables()
+            for sheet in REVISION_TABLES:
+                with metrics.stage("write", sheet.table, rows_in=len(revision_tables[sheet.table])) as stage:
+                    paths[sheet.table] = self.write(sheet, revision_tables[sheet.table])
+                    stage.rows_out = len(revision_tables[sheet.table])
+                    stage.bytes_written = os.path.getsize(paths[sheet.table])
+        log = self.read(CHANGE_LOG)
+        with metrics.stage("changes", CHANGE_LOG.table, rows_in=len(risks) + len(controls)) as stage:
+            events = change_events(
+                previous,
+                {RISK: risks, CONTROL: controls},
+                next_version(event.version for event in log),
+                metrics.run_started_at,
+                revision or compendium_revision(risks, controls),
+            )
+            stage.rows_out = len(events)
+            stage.skipped = not events
+        if events:
+            with metrics.stage("write", CHANGE_LOG.table, rows_in=len(events)) as stage:
+                paths[CHANGE_LOG.table] = self.write(CHANGE_LOG, log + events)
+                stage.rows_out = len(events)
+                stage.bytes_written = os.path.getsize(paths[CHANGE_LOG.table])
+            if change_stream:
+                append_jsonl(change_stream, events)
+        return paths
+
+
+def _has_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_ARROW_TYPES = {"STRING": "string", "INT": "int32", "DOUBLE": "float64", "BOOLEAN": "bool", "ARRAY<STRING>": "list<string>"}
+
+
+def _write_parquet(path, sheet, records):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"string": pa.string(), "int32": pa.int32(), "float64": pa.float64(), "bool": pa.bool_(), "list<string>": pa.list_(pa.string())}
+    schema = pa.schema(
+        [pa.field(c.name, types[_ARROW_TYPES[c.type]], metadata={"comment": c.comment}) for c in target_columns(sheet)],
+        metadata={"comment": sheet.description},
+    )
+    pq.write_table(pa.Table.from_pylist(records, schema=schema), path)
+
+
+class SparkBackend:
+    """Applies every changed table to ``catalog.schema`` in Unity Catalog with a keyed MERGE.
+
+    Tables whose stored fingerprint matches their source files are skipped.
+    """
+
+    def __init__(self, spark, catalog, schema):
+        self.spark = spark
+        self.catalog = catalog
+        self.schema = schema
+
+    def table_name(self, sheet):
+        return f"{self.catalog}.{self.schema}.{sheet.table}"
+
+    def changed_tables(self, fingerprints):
+        """Names of the tables whose stored fingerprint differs from ``fingerprints``."""
+        return {
+            sheet.table
+            for sheet in TABLES
+            if table_fingerprint(self.spark, self.table_name(sheet)) != fingerprints[sheet.table]
+        }
+
+    def write(self, sheet, df, fingerprint, metrics=None, scope=None):
+        """MERGE a table DataFrame (or a list of rows) into its table and store its fingerprint.
+
+        The write is recorded in ``metrics`` with the rows the MERGE changed and the bytes it
+        added. ``scope`` limits the rows the MERGE may delete, for the tables holding several
+        revisions or load versions. Returns the MERGE's operation metrics.
+        """
+        metrics = metrics if metrics is not None else StageMetrics()
+        rows_in = None
+        if isinstance(df, list):
+            rows_in = len(df)
+            df = self.spark.createDataFrame(df, spark_schema(sheet))
+        with metrics.stage("write", sheet.table, rows_in=rows_in) as stage:
+            operation_metrics = merge_into_table(
+                self.spark, df, sheet, self.table_name(sheet), fingerprint, properties={"tags": TABLE_TAGS[sheet.table]}, scope=scope
+            )
+            stage.rows_out = merge_row_count(operation_metrics)
+            stage.bytes_written = int(operation_metrics.get("numTargetBytesAdded", 0))
+        return operation_metrics
+
+    def update_revisions(self, risks, controls, revision=None, metrics=None):
+        """File the compendium's rows under ``revision`` (its latest DASF revision by default) and MERGE the revision tables.
+
+        Only the stored rows of that revision and the diffs it affects are replaced. Returns
+        the applied :class:`dasf.revisions.RevisionUpdate`, or None when the revision is unchanged.
+        """
+        metrics = metrics if metrics is not None else StageMetrics()
+        for sheet in REVISION_TABLES:
+            self.spark.sql(create_table_statement(sheet, self.table_name(sheet), properties={"tags": TABLE_TAGS[sheet.table]}))
+        store = SqlRevisionStore(lambda sql: self.spark.sql(sql).collect(), self.catalog, self.schema)
+        with metrics.stage("revisions", ", ".join(sheet.table for sheet in REVISION_TABLES), rows_in=len(risks) + len(controls)) as stage:
+            update = plan_revision(store, *compendium_rows(risks, controls, revision))
+            stage.rows_out = len(update.diffs) if update is not None else 0
+            stage.skipped = update is None
+        if update is None:
+            return None
+        tables, scopes = update_tables(update), update_scopes(update)
+        fingerprint = content_hash(update.rows)
+        for sheet in REVISION_TABLES:
+            self.write(sheet, tables[sheet.table], table_source_fingerprint(sheet, fingerprint), metrics, scopes[sheet.table])
+        return update
+
+    def previous_rows(self, sheet):
+        """Rows of a table as loaded before, or an empty list if it does not exist."""
+        table = self.table_name(sheet)
+        return self.spark.table(table).collect() if self.spark.catalog.tableExists(table) else []
+
+    def record_changes(self, previous, risks, controls, revision=None, change_stream=None, metrics=None):
+        """Append the risks and controls changed since ``previous`` (rows by entity type, read before the MERGEs) to the change log.
+
+        The events are also appended to the JSON Lines file ``change_stream`` if given.
+        Returns the recorded :class:`dasf.changes.ChangeEvent` rows, empty when nothing changed.
+        """
+        metrics = metrics if metrics is not None else StageMetrics()
+        table = self.table_name(CHANGE_LOG)
+        with metrics.stage("changes", CHANGE_LOG.table, rows_in=len(risks) + len(controls)) as stage:
+            latest = self.spark.sql(f"SELECT max(version) FROM {table}").first()[0] if self.spark.catalog.tableExists(table) else None
+            events = change_events(
+                previous, {RISK: risks, CONTROL: controls}, next_version([latest]), metrics.run_started_at, revision or compendium_revision(risks, controls)
+            )
+            stage.rows_out = len(events)
+            stage.skipped = not events
+        if events:
+            version = events[0].version
+            self.write(CHANGE_LOG, events, table_source_fingerprint(CHANGE_LOG, str(version)), metrics, f"target.version = {version}")
+            if change_stream:
+                append_jsonl(change_stream, events)
+        return events
+
+    def ingest(self, resources_dir=RESOURCES_DIR, metrics=None, revision=None, change_stream=None, staging_dir=None, report=None):
+        """Read the TSVs in ``resources_dir`` with Spark and MERGE every changed table. Returns the changed table names.
+
+        A changed risks or controls sheet is also filed in the revision history under
+        ``revision`` (its latest DASF revision by default), as is the compendium of a schema
+        without one, and its changed rows are appended to the change log (and to the JSON
+        Lines file ``change_stream`` if given).
+
+        With ``staging_dir``, e.g. a Unity Catalog volume path, the sheets that differ from
+        their copy there are copied to it first and Spark reads them from it. Each stage is
+        recorded in ``metrics``, a :class:`dasf.metrics.StageMetrics`, if given; unchanged
+        tables are recorded as skipped writes. ``report`` is the validation report of
+        ``resources_dir`` when the caller validated it already. Raises
+        :class:`dasf.validate.ValidationError` before copying or reading the TSVs with Spark when they fail validation.
+        """
+        metrics = metrics if metrics is not None else StageMetrics()
+        fingerprints = table_fingerprints(resources_dir)
+        changed = self.changed_tables(fingerprints)
+        history_missing = not all(self.spark.catalog.tableExists(self.table_name(sheet)) for sheet in REVISION_TABLES)
+        if not changed and not history_missing:
+            for sheet in TABLES:
+                metrics.skip("write", sheet.table, "unchanged")
+            return set()
+        if report is None:
+            with metrics.stage("validate", resources_dir) as stage:
+                report = validate_resources(resources_dir)
+                stage.rows_in = stage.rows_out = report.row_count
+                stage.detail = report.summary()
+        report.raise_for_errors()
+        source_dir = resources_dir
+        if staging_dir is not None:
+            with metrics.stage("copy", staging_dir) as stage:
+                copied = stage_files(resources_dir, staging_dir, (RISKS.file, CONTROLS.file))
+                stage.bytes_written = sum(os.path.getsize(os.path.join(staging_dir, file)) for file in copied)
+                stage.skipped = not copied
+                stage.detail = f"{len(copied)} changed files copied"
+            source_dir = staging_dir
+
+        # Each sheet is read and collected once; its table is written from the collected rows, so Spark runs one job per sheet.
+        # The rows read are those the validation counted and the rows parsed those collected, so no Spark job counts a DataFrame
+        tables = {}
+        for sheet in (RISKS, CONTROLS):
+            with metrics.stage("parse", sheet.file, rows_in=report.rows.get(sheet.file)) as stage:
+                df = spark_sheet_table(self.spark, os.path.join(source_dir, sheet.file), sheet)
+                tables[sheet.table] = df.collect()
+                stage.rows_out = len(tables[sheet.table])
+        risk_rows, control_rows = tables[RISKS.table], tables[CONTROLS.table]
+        derived = [sheet.table for sheet in TABLES[2:] if sheet.table in changed]
+        if derived:
+            with metrics.stage("derive", ", ".join(derived), rows_in=len(risk_rows) + len(control_rows)) as stage:
+                tables.update(derived_tables(risk_rows, control_rows))
+                stage.rows_out = sum(len(tables[table]) for table in derived)
+        sheets_changed = bool({RISKS.table, CONTROLS.table} & changed)
+        previous = {RISK: self.previous_rows(RISKS), CONTROL: self.previous_rows(CONTROLS)} if sheets_changed else None
+        for sheet in TABLES:
+            if sheet.table in changed:
+                self.write(sheet, list(tables[sheet.table]), fingerprints[sheet.table], metrics)
+            else:
+                metrics.skip("write", sheet.table, "unchanged")
+        if (sheets_changed or history_missing) and self.update_revisions(risk_rows, control_rows, revision, metrics) is not None:
+            changed |= {sheet.table for sheet in REVISION_TABLES}
+        if sheets_changed and self.record_changes(previous, risk_rows, control_rows, revision, change_stream, metrics):
+            changed.add(CHANGE_LOG.table)
+        return changed
+
+
+def stage_files(resources_dir, staging_dir, files):
+    """Copy the ``files`` of ``resources_dir`` missing from ``staging_dir`` or differing from their copy there.
+
+    Returns the names of the copied files.
+    """
+    os.makedirs(staging_dir, exist_ok=True)
+    copied = []
+    for file in files:
+        source, destination = os.path.join(resources_dir, file), os.path.join(staging_dir, file)
+        if not os.path.isfile(destination) or file_fingerprint(destination) != file_fingerprint(source):
+            shutil.copyfile(source, destination)
+            copied.append(file)
+    return copied
+
+
+def _comparable(rows, sheet):
+    names = column_names(sheet)
+    values = [tuple(tuple(v) if isinstance(v, list) else v for v in (getattr(row, name) for name in names)) for row in rows]
+    return sorted(values, key=repr)
+
+
+def parity(spark, resources_dir=RESOURCES_DIR):
+    """Compare the tables produced by Spark and by the pure-Python parser.
+
+    Returns a dict of table name to ``(rows only in Spark, rows only in Python)``, empty when both agree.
+    """
+    local, remote = local_tables(resources_dir), spark_tables(spark, resources_dir)
+    differences = {}
+    for sheet in TABLES:
+        spark_rows, local_rows = _comparable(remote[sheet.table], sheet), _comparable(local[sheet.table], sheet)
+        if spark_rows != local_rows:
+            only_spark = [r for r in spark_rows if r not in local_rows]
+            only_local = [r for r in local_rows if r not in spark_rows]
+            differences[sheet.table] = (only_spark, only_local)
+    return differences
@@ -0,0 +1,31 @@
+"""Batched smoke checks for headless (job mode) runs of ``notebooks/setup.py``.
+
+Interactive runs display the result of a sample query after each function is created.
+Job mode collects those queries instead and checks them all with one query at the end,
+each sample being expected to return at least one row.
+"""
+from collections import namedtuple
+
+SmokeCheck = namedtuple("SmokeCheck", ["check_index", "query", "row_count"])
+
+
+def smoke_check_query(queries):
+    """One query counting the rows of every sample query, as (check_index, row_count) rows."""
+    return "\nUNION ALL\n".join(
+        f"SELECT {i} AS check_index, count(*) AS row_count FROM (\n{query.strip()}\n) AS check_{i}" for i, query in enumerate(queries)
+    )
+
+
+def failed_smoke_checks(queries, rows):
+    """Sample queries that returned no rows, given the rows of :func:`smoke_check_query`."""
+    counts = {row.check_index: row.row_count for row in rows}
+    return [SmokeCheck(i, query, counts.get(i, 0)) for i, query in enumerate(queries) if not counts.get(i)]
+
+
+def run_smoke_checks(spark, queries):
+    """Run every sample query in one Spark job, raising AssertionError listing those that returned no rows."""
+    if not queries:
+        return
+    failed = failed_smoke_checks(queries, spark.sql(smoke_check_query(queries)).collect())
+    if failed:
+        raise AssertionError("Smoke checks returned no rows:\n" + "\n".join(check.query.strip() for check in failed))
@@ -0,0 +1,267 @@
+"""Local mock of the Databricks SQL Statement Execution, Files and Genie Conversation APIs.
+
+:class:`MockWorkspace` serves ``POST /api/2.0/sql/statements``, ``GET
+/api/2.0/sql/statements/<id>`` and ``PUT /api/2.0/fs/files/<path>`` on a local port and
+keeps just enough state to answer the queries the rollout driver makes: the columns of
+the created tables, their TBLPROPERTIES and the comments of the created functions. It
+can delay statements (PENDING until polled) and fail requests with 503, so retries,
+polling and the hash-skipped redeploys can be exercised without a workspace.
+
+Given a ``genie`` answerer, it also stands in for a Genie space: ``POST
+/api/2.0/genie/spaces/<space>/start-conversation`` files a question, its message is
+polled at ``GET .../conversations/<conversation>/messages/<message>`` and the rows of
+its query attachment are read at ``GET .../attachments/<attachment>/query-result``.
+The answerer maps a question to the SQL, columns and rows Genie would answer with (see
+:func:`dasf.replay.engine_answerer`), so the question replay runs without a workspace.
+"""
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+_CREATE_TABLE = re.compile(r"^CREATE (?:OR REPLACE )?TABLE (?:IF NOT EXISTS )?(\S+) \(\n(.*?)\n\)", re.S)
+_COLUMN = re.compile(r"^  (\w+) ", re.M)
+_SET_PROPERTIES = re.compile(r"^ALTER TABLE (\S+) SET TBLPROPERTIES \((.*)\)$", re.S)
+_PROPERTY = re.compile(r"'((?:[^'\\]|\\.)*)' = '((?:[^'\\]|\\.)*)'")
+_SHOW_PROPERTIES = re.compile(r"^SHOW TBLPROPERTIES (\S+)$")
+_CREATE_FUNCTION = re.compile(r"^CREATE OR REPLACE FUNCTION (\w+)\(.*?\nCOMMENT '((?:[^'\\]|\\.)*)'\nRETURN", re.S)
+_COLUMNS_QUERY = re.compile(r"FROM (\w+)\.information_schema\.columns WHERE table_schema = '(\w+)'")
+_ROUTINES_QUERY = re.compile(r"FROM (\w+)\.information_schema\.routines WHERE routine_schema = '(\w+)'")
+_GENIE_START = re.compile(r"^/api/2\.0/genie/spaces/([^/]+)/start-conversation$")
+_GENIE_MESSAGE = re.compile(r"^/api/2\.0/genie/spaces/([^/]+)/conversations/([^/]+)/messages/([^/]+)$")
+_GENIE_RESULT = re.compile(r"^/api/2\.0/genie/spaces/([^/]+)/conversations/([^/]+)/messages/([^/]+)/attachments/([^/]+)/query-result$")
+
+
+def _unescape(text):
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+class MockWorkspace:
+    """A mock workspace served on ``127.0.0.1``; use as a context manager or call :meth:`start` and :meth:`stop`.
+
+    ``fail_requests``: the first requests answered with HTTP 503. ``pending_polls``: GET polls
+    a statement or a Genie message stays RUNNING (EXECUTING_QUERY) for before it completes.
+    ``genie``: callable answering a question with ``(sql, columns, rows)``, or None for a
+    text reply; the Genie routes answer 404 without it.
+    """
+
+    def __init__(self, fail_requests=0, pending_polls=0, port=0, genie=None):
+        self.fail_requests = fail_requests
+        self.pending_polls = pending_polls
+        self.genie = genie
+        self.messages = {}
+        self.statements = []
+        self.files = {}
+        self.requests = 0
+        self.connections = set()
+        self._tables = {}
+        self._properties = {}
+        self._functions = {}
+        self._results = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                return True
+        return False
+
+    def submit(self, request):
+        """Run a statement request and return its response body."""
+        statement_id = f"mock-{next(self._ids)}"
+        statement = request["statement"].strip()
+        with self._lock:
+            self.statements.append((request.get("catalog"), request.get("schema"), statement))
+            try:
+                columns, rows = self._execute(statement, request.get("catalog"), request.get("schema"))
+                response = {
+                    "statement_id": statement_id,
+                    "status": {"state": "SUCCEEDED"},
+                    "manifest": {"schema": {"columns": [{"name": c} for c in columns]}, "total_row_count": len(rows)},
+                    "result": {"data_array": rows},
+                }
+            except ValueError as e:
+                response = {"statement_id": statement_id, "status": {"state": "FAILED", "error": {"error_code": "BAD_REQUEST", "message": str(e)}}}
+            self._results[statement_id] = [self.pending_polls, response]
+        if self.pending_polls:
+            return {"statement_id": statement_id, "status": {"state": "PENDING"}}
+        return response
+
+    def poll(self, statement_id):
+        with self._lock:
+            if statement_id not in self._results:
+                return None
+            entry = self._results[statement_id]
+            if entry[0] > 0:
+                entry[0] -= 1
+                return {"statement_id": statement_id, "status": {"state": "RUNNING"}}
+            return entry[1]
+
+    def start_conversation(self, space_id, request):
+        """File a question in a new conversation and return the conversation and message."""
+        conversation_id, message_id = f"conversation-{next(self._ids)}", f"message-{next(self._ids)}"
+        question = request.get("content", "")
+        answer = self.genie(question)
+        message = {"id": message_id, "space_id": space_id, "conversation_id": conversation_id, "content": question}
+        if answer is None:
+            attachments = [{"attachment_id": f"{message_id}-text", "text": {"content": "I can only answer questions about the DASF tables."}}]
+            result = None
+        else:
+            sql, columns, rows = answer
+            attachments = [{"attachment_id": f"{message_id}-query", "query": {"query": sql, "description": "Answered from the DASF tables"}}]
+            result = {
+                "statement_id": f"mock-{next(self._ids)}",
+                "status": {"state": "SUCCEEDED"},
+                "manifest": {"schema": {"columns": [{"name": c} for c in columns]}, "total_row_count": len(rows)},
+                "result": {"data_array": rows},
+            }
+        with self._lock:
+            self.messages[message_id] = [self.pending_polls, dict(message, status="COMPLETED", attachments=attachments), result]
+        return {"conversation_id": conversation_id, "message_id": message_id, "message": dict(message, status="SUBMITTED")}
+
+    def message(self, message_id):
+        with self._lock:
+            if message_id not in self.messages:
+                return None
+            entry = self.messages[message_id]
+            if entry[0] > 0:
+                entry[0] -= 1
+                return dict(entry[1], status="EXECUTING_QUERY", attachments=[])
+            return entry[1]
+
+    def query_result(self, message_id):
+        with self._lock:
+            entry = self.messages.get(message_id)
+            return {"statement_response": entry[2]} if entry is not None and entry[2] is not None else None
+
+    def _qualified(self, name, catalog, schema):
+        parts = name.split(".")
+        return ".".join([catalog, schema][: 3 - len(parts)] + parts)
+
+    def _execute(self, statement, catalog, schema):
+        if statement.startswith("BEGIN\n") and statement.endswith("\nEND"):
+            for part in statement[len("BEGIN\n"): -len("\nEND")].split(";\n"):
+                self._execute(part.rstrip(";"), catalog, schema)
+            return [], []
+        match = _CREATE_TABLE.match(statement)
+        if match:
+            name = self._qualified(match.group(1), catalog, schema)
+            if statement.startswith("CREATE OR REPLACE") or name not in self._tables:
+                self._tables[name] = _COLUMN.findall(match.group(2))
+                properties = _PROPERTY.findall(statement.split("TBLPROPERTIES", 1)[1]) if "TBLPROPERTIES" in statement else []
+                self._properties[name] = {k: _unescape(v) for k, v in properties}
+            return [], []
+        match = _SET_PROPERTIES.match(statement)
+        if match:
+            name = self._qualified(match.group(1), catalog, schema)
+            if name not in self._tables:
+                raise ValueError(f"[TABLE_OR_VIEW_NOT_FOUND] {name}")
+            self._properties[name].update((k, _unescape(v)) for k, v in _PROPERTY.findall(match.group(2)))
+            return [], []
+        match = _SHOW_PROPERTIES.match(statement)
+        if match:
+            name = self._qualified(match.group(1), catalog, schema)
+            if name not in self._tables:
+                raise ValueError(f"[TABLE_OR_VIEW_NOT_FOUND] {name}")
+            return ["key", "value"], [[k, v] for k, v in self._properties[name].items()]
+        match = _CREATE_FUNCTION.match(statement)
+        if match:
+            self._functions[f"{catalog}.{schema}.{match.group(1)}"] = _unescape(match.group(2))
+            return [], []
+        match = _COLUMNS_QUERY.search(statement)
+        if match:
+            prefix = f"{match.group(1)}.{match.group(2)}."
+            rows = [[name[len(prefix):], column] for name, columns in self._tables.items() if name.startswith(prefix) for column in columns]
+            return ["table_name", "column_name"], rows
+        match = _ROUTINES_QUERY.search(statement)
+        if match:
+            prefix = f"{match.group(1)}.{match.group(2)}."
+            rows = [[name[len(prefix):], comment] for name, comment in self._functions.items() if name.startswith(prefix)]
+            return ["routine_name", "comment"], rows
+        # CREATE SCHEMA / VOLUME, MERGE, OPTIMIZE, ALTER TABLE ... CLUSTER BY and other statements succeed without rows
+        return [], []
+
+
+def _handler(workspace):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without TCP_NODELAY each keep-alive response waits for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body=None):
+            data = json.dumps(body).encode("utf-8") if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _handle(self, method):
+            body = self._body()
+            workspace.connections.add(self.client_address)
+            if workspace._fail():
+                return self._reply(503, {"error_code": "TEMPORARILY_UNAVAILABLE", "message": "mock failure"})
+            path = self.path.split("?", 1)[0]
+            if method == "POST" and path == "/api/2.0/sql/statements":
+                return self._reply(200, workspace.submit(json.loads(body)))
+            if method == "GET" and path.startswith("/api/2.0/sql/statements/"):
+                response = workspace.poll(path.rsplit("/", 1)[1])
+                return self._reply(200 if response else 404, response or {"error_code": "NOT_FOUND"})
+            if workspace.genie is not None:
+                match = _GENIE_START.match(path)
+                if method == "POST" and match:
+                    return self._reply(200, workspace.start_conversation(match.group(1), json.loads(body)))
+                match = _GENIE_MESSAGE.match(path) or _GENIE_RESULT.match(path)
+                if method == "GET" and match:
+                    response = (workspace.message if match.re is _GENIE_MESSAGE else workspace.query_result)(match.group(3))
+                    return self._reply(200 if response else 404, response or {"error_code": "NOT_FOUND"})
+            if method == "PUT" and path.startswith("/api/2.0/fs/files/"):
+                with workspace._lock:
+                    workspace.files[unquote(path[len("/api/2.0/fs/files"):])] = body
+                return self._reply(204)
+            return self._reply(404, {"error_code": "NOT_FOUND", "message": path})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+    return Handler
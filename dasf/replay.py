@@ -0,0 +1,327 @@
+"""Concurrent replay of the assistant's question set against a Genie space.
+
+Each question is asked in a new conversation of the Genie Conversation API: the question
+is filed with ``start-conversation``, its message is polled with a growing interval until
+Genie completes it, and the rows of its query attachment are fetched. :class:`GenieClient`
+runs the questions on one asyncio event loop, at most ``concurrency`` at a time, over a
+pool of keep-alive connections (:class:`ConnectionPool`), retrying transient failures
+with exponential backoff. Every question's latency, polls, retries and rows are kept in a
+:class:`QuestionResult`, and the function Genie called is compared with the one behind the
+question in :data:`dasf.benchmark.QUESTION_CALLS`, so a run is a regression check as well
+as a throughput measurement.
+
+The question set is resources/questions.txt and :data:`dasf.benchmark.BENCHMARK_QUESTIONS`,
+optionally expanded with templated questions over every risk id and mitigation control id. :func:`engine_answerer` answers the same
+questions from the ingested tables for :class:`dasf.mock_server.MockWorkspace`, so
+``python -m dasf replay --mock`` runs without network access.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import ssl
+import time
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit
+
+from .benchmark import QUESTION_CALLS, percentile, read_questions
+from .rollout import TRANSIENT_STATUSES, StatementError, sql_literal
+
+# function, args: the call behind the question, function None for a question answered without one
+Question = namedtuple("Question", ["text", "function", "args"])
+# status: Genie's final message status, TIMEOUT or ERROR; function: the function the answer's SQL called
+# answer_ms: until the message completed; elapsed_ms: until its rows were read
+QuestionResult = namedtuple(
+    "QuestionResult",
+    ["question", "expected_function", "function", "status", "rows", "polls", "retries", "answer_ms", "elapsed_ms", "error"],
+)
+
+# Templated questions asked about every risk id and every mitigation control id
+RISK_QUESTIONS = (
+    ("List mitigation controls and AWS documentation links for the risk id {}", "databricks_ai_mitigation_controls_by_risk_id"),
+    ("Get details of the risk id {}", "risks_in_ai_system_component_by_risk_id"),
+)
+CONTROL_QUESTIONS = (
+    ("What other risks are covered by the mitigation control {}?", "risks_in_ai_system_by_mitigation_controls_id"),
+    ("Get details of the mitigation control {}", "databricks_ai_mitigation_control_by_mitigation_control_id"),
+)
+
+# Final statuses of a Genie message
+COMPLETED = "COMPLETED"
+_FINAL_STATES = (COMPLETED, "FAILED", "CANCELLED", "QUERY_RESULT_EXPIRED")
+_CALLED_FUNCTION = re.compile(r"\bFROM\s+(?:`?\w+`?\.)*`?(\w+)`?\s*\(", re.IGNORECASE)
+
+
+def question_set(questions, risk_ids=(), control_ids=()):
+    """Questions of ``questions`` with their calls, then the templated questions over ``risk_ids`` and ``control_ids``."""
+    calls = [Question(q, *(QUESTION_CALLS.get(q) or ((None, ()),))[0]) for q in questions]
+    calls += [Question(t.format(i), f, (i,)) for i in risk_ids for t, f in RISK_QUESTIONS]
+    calls += [Question(t.format(i), f, (i,)) for i in control_ids for t, f in CONTROL_QUESTIONS]
+    return list({q.text: q for q in calls}.values())
+
+
+def called_function(sql):
+    """Name of the first table function called by ``sql``, or None."""
+    match = _CALLED_FUNCTION.search(sql or "")
+    return match.group(1) if match else None
+
+
+def _cell(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return json.dumps(list(value))
+    return str(value)
+
+
+def engine_answerer(engine, questions):
+    """Answerer of :class:`dasf.mock_server.MockWorkspace` calling the function behind each of ``questions`` on ``engine``.
+
+    Returns the SQL, columns and rows (as strings) of a question's call, or None for an
+    unknown question or one answered without a function.
+    """
+    calls = {q.text: q for q in questions}
+
+    def answer(text):
+        question = calls.get(text.strip())
+        if question is None or question.function is None:
+            return None
+        rows = getattr(engine, question.function)(*question.args)
+        columns = list(rows[0]._fields) if rows and hasattr(rows[0], "_fields") else []
+        sql = f"SELECT * FROM {question.function}({', '.join(sql_literal(a) for a in question.args)})"
+        return sql, columns, [[_cell(v) for v in (row if isinstance(row, tuple) else (row,))] for row in rows]
+
+    return answer
+
+
+def ingested_engine(tables_dir):
+    """Engine over the tables the local ingest backend wrote to ``tables_dir``."""
+    from .engine import DASFEngine
+    from .ingest import LocalBackend
+    from .revisions import REVISION_TABLES, RevisionHistory
+    from .schema import CONTROLS, CROSSWALK, MAPPING, RISKS
+
+    format = "parquet" if os.path.exists(os.path.join(tables_dir, f"{RISKS.table}.parquet")) else "jsonl"
+    backend = LocalBackend(tables_dir, format)
+    risks, controls = backend.read(RISKS), backend.read(CONTROLS)
+    if not risks or not controls:
+        raise ValueError(f"no ingested {RISKS.table} and {CONTROLS.table} tables in {tables_dir}")
+    history = RevisionHistory.from_tables({sheet.table: backend.read(sheet) for sheet in REVISION_TABLES})
+    return DASFEngine(risks, controls, backend.read(MAPPING), backend.read(CROSSWALK) or None, history if history.revisions() else None)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one host, at most ``size`` open at a time.
+
+    A released connection is reused by the next request unless the server closed it.
+    """
+
+    def __init__(self, url, size=8, timeout=60):
+        url = urlsplit(url if "://" in url else f"https://{url}")
+        self.host = url.hostname
+        self.netloc = url.netloc
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.timeout = timeout
+        self.opened = 0
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def _open(self):
+        self.opened += 1
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send a request and return its status, lower-cased headers and body."""
+        async with self._slots:
+            reader, writer = self._idle.pop() if self._idle else await self._open()
+            try:
+                status, response_headers, data = await asyncio.wait_for(self._exchange(reader, writer, method, path, body, headers or {}), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if response_headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return status, response_headers, data
+
+    async def _exchange(self, reader, writer, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.netloc}", f"Content-Length: {len(body or b'')}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(response_headers.get("content-length", 0)))
+        return status, response_headers, data
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class GenieClient:
+    """Asks questions to a Genie space through the Genie Conversation API.
+
+    Requests share a :class:`ConnectionPool` of ``concurrency`` connections. Connection
+    errors and :data:`dasf.rollout.TRANSIENT_STATUSES` are retried up to ``retries`` times,
+    waiting ``backoff * 2**attempt`` seconds (with jitter, or the server's Retry-After).
+    A message is polled every ``poll_interval`` seconds, doubled after each poll up to
+    ``max_poll_interval``, for at most ``timeout`` seconds.
+    """
+
+    def __init__(
+        self, workspace, space_id, token=None, concurrency=8, retries=5, backoff=0.5, poll_interval=0.5, max_poll_interval=5.0, timeout=600
+    ):
+        self.workspace = workspace
+        self.space_id = space_id
+        self.token = token if token is not None else os.environ.get("DATABRICKS_TOKEN")
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.pool = None
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt * (0.5 + random.random() / 2)
+
+    async def request(self, method, path, payload=None, counter=None):
+        """Send a request and return its decoded JSON response ({} when empty)."""
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                status, response_headers, data = await self.pool.request(method, path, body, headers)
+                if status < 400:
+                    return json.loads(data) if data else {}
+                if status not in TRANSIENT_STATUSES or attempt == self.retries:
+                    raise StatementError(f"{method} {path}: HTTP {status} {data[:500].decode('utf-8', 'replace')}")
+                retry_after = response_headers.get("retry-after")
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            if counter is not None:
+                counter["retries"] += 1
+            await asyncio.sleep(self._delay(attempt, retry_after))
+
+    async def ask(self, question):
+        """Ask ``question`` (a :class:`Question`) in a new conversation and return its :class:`QuestionResult`."""
+        counter = Counter()
+        start = time.perf_counter()
+        status, function, rows, answer_ms, error = "ERROR", None, 0, None, None
+        base = f"/api/2.0/genie/spaces/{self.space_id}"
+        try:
+            started = await self.request("POST", f"{base}/start-conversation", {"content": question.text}, counter)
+            path = f"{base}/conversations/{started['conversation_id']}/messages/{started['message_id']}"
+            message, interval = started.get("message") or {}, self.poll_interval
+            while message.get("status") not in _FINAL_STATES:
+                if time.perf_counter() - start > self.timeout:
+                    raise asyncio.TimeoutError(f"no answer after {self.timeout} s")
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+                counter["polls"] += 1
+                message = await self.request("GET", path, counter=counter)
+            status = message["status"]
+            answer_ms = round((time.perf_counter() - start) * 1000, 1)
+            for attachment in message.get("attachments") or ():
+                if attachment.get("query") and status == COMPLETED:
+                    function = called_function(attachment["query"].get("query"))
+                    result = await self.request("GET", f"{path}/attachments/{attachment['attachment_id']}/query-result", counter=counter)
+                    manifest = (result.get("statement_response") or {}).get("manifest") or {}
+                    rows = manifest.get("total_row_count", 0)
+                    break
+        except asyncio.TimeoutError as e:
+            status, error = "TIMEOUT", str(e) or "request timed out"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        return QuestionResult(question.text, question.function, function, status, rows, counter["polls"], counter["retries"], answer_ms, elapsed_ms, error)
+
+    async def ask_all(self, questions):
+        """Results of ``questions``, asked at most ``concurrency`` at a time, in the order of ``questions``."""
+        self.pool = ConnectionPool(self.workspace, self.concurrency)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def ask(question):
+            async with slots:
+                return await self.ask(question)
+
+        try:
+            return await asyncio.gather(*(ask(q) for q in questions))
+        finally:
+            self.pool.close()
+
+
+def replay(client, questions, repeat=1):
+    """Ask ``questions`` ``repeat`` times through ``client`` and return the results and the wall-clock seconds taken."""
+    start = time.perf_counter()
+    results = asyncio.run(client.ask_all(list(questions) * repeat))
+    return results, time.perf_counter() - start
+
+
+def _percentiles(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return {"p50_ms": percentile(values, 0.50), "p95_ms": percentile(values, 0.95), "p99_ms": percentile(values, 0.99), "max_ms": values[-1]}
+
+
+def report(results, elapsed, connections=None):
+    """JSON-serializable report of a replay: throughput, latency percentiles, failures and regressions."""
+    failed = [r for r in results if r.status != COMPLETED]
+    mismatched = [r for r in results if r.status == COMPLETED and r.function != r.expected_function]
+    return {
+        "questions": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "questions_per_s": round(len(results) / elapsed, 2) if elapsed else None,
+        "connections": connections,
+        "answer_latency": _percentiles(r.answer_ms for r in results),
+        "latency": _percentiles(r.elapsed_ms for r in results),
+        "statuses": dict(Counter(r.status for r in results)),
+        "polls": sum(r.polls for r in results),
+        "retries": sum(r.retries for r in results),
+        "failed": [r._asdict() for r in failed],
+        "mismatched": [r._asdict() for r in mismatched],
+        "results": [r._asdict() for r in results],
+    }
+
+
+def load_question_set(questions_path=None, expand=False, engine=None):
+    """Question set of ``questions_path`` (resources/questions.txt and the benchmark questions by default), expanded over every id of ``engine``."""
+    questions = read_questions(questions_path) if questions_path else read_questions()
+    if not expand:
+        return question_set(questions)
+    risk_ids = [r.risk_id for r in engine.risks if r.risk_id is not None]
+    control_ids = [c.mitigation_control_id for c in engine.controls if c.mitigation_control_id is not None]
+    return question_set(questions, risk_ids, control_ids)
@@ -0,0 +1,214 @@
+"""Fuzzy resolution of risk and mitigation control names and ids.
+
+The compendium's names carry stray spaces and inconsistent casing ("DASF 2: Sync users
+and groups "), and the assistant's phrasings rarely match them exactly. Every risk id,
+risk name, control id and control title is normalized (lower-cased, punctuation and
+dashes as spaces, letters split from digits) and indexed by its padded character
+trigrams and its tokens into the ``dasf_entity_index`` table during ingestion. A lookup
+normalizes its text the same way and scores each candidate as the mean of the Jaccard
+similarity of their trigram sets and of their token sets, so a normalized exact match
+scores 1. :class:`EntityResolver` answers from an in-memory inverted index;
+``dasf_resolve_entity`` computes the same scores in SQL from the table.
+"""
+import re
+from collections import defaultdict, namedtuple
+
+from .crosswalk import CONTROL, RISK
+
+# Rows of dasf_entity_index: one per distinct trigram or token of a normalized id or name
+EntityTerm = namedtuple("EntityTerm", ["kind", "term", "entity_type", "entity_id", "field", "entity_name", "term_count"])
+# Rows of dasf_resolve_entity: the best scoring field of each candidate, best candidates first
+EntityMatch = namedtuple("EntityMatch", ["rank", "score", "entity_type", "entity_id", "entity_name", "field"])
+
+TRIGRAM = "trigram"
+TOKEN = "token"
+ID_FIELD = "id"
+NAME_FIELD = "name"
+
+RESOLVE_FUNCTION = "dasf_resolve_entity"
+DEFAULT_CANDIDATES = 5
+# Score a by-name lookup's best candidate needs when no name matches exactly
+NAME_MATCH_THRESHOLD = 0.5
+
+_NON_ALNUM = re.compile(r"[^a-z0-9.]+")
+# Dots other than decimal points ('1.10' keeps its dot, 'poisoning.' loses it)
+_LOOSE_DOT = re.compile(r"(?<![0-9])\.|\.(?![0-9])")
+_LETTER_DIGIT = re.compile(r"([a-z])([0-9])")
+_SPACES = re.compile(" +")
+_CONTROL_TITLE = re.compile(r"^\s*DASF\s*[0-9]+\s*:\s*", re.IGNORECASE)
+
+
+def normalize_text(text):
+    """Lower-case ``text``, turn punctuation and dashes into spaces, split 'dasf1' into 'dasf 1' and collapse spaces."""
+    text = _NON_ALNUM.sub(" ", (text or "").lower())
+    text = _LETTER_DIGIT.sub(r"\1 \2", _LOOSE_DOT.sub(" ", text))
+    return _SPACES.sub(" ", text).strip()
+
+
+def normalize_text_sql(param):
+    """Spark SQL expression of :func:`normalize_text` over a parameter."""
+    text = f"regexp_replace(lower(coalesce({param}, '')), '[^a-z0-9.]+', ' ')"
+    text = f"regexp_replace(regexp_replace({text}, '(?<![0-9])[.]|[.](?![0-9])', ' '), '([a-z])([0-9])', '$1 $2')"
+    return f"trim(regexp_replace({text}, ' +', ' '))"
+
+
+def trigrams(normalized):
+    """Distinct character trigrams of a normalized text padded with one space on each side."""
+    if not normalized:
+        return set()
+    padded = f" {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def tokens(normalized):
+    """Distinct space separated tokens of a normalized text."""
+    return set(normalized.split(" ")) if normalized else set()
+
+
+def control_title(control):
+    """Title of a control without its id, 'Sync users and groups' for 'DASF 2: Sync users and groups '."""
+    return _CONTROL_TITLE.sub("", control or "").strip() or None
+
+
+def _entities(risks, controls):
+    for r in risks:
+        yield RISK, r.risk_id, r.risk_name
+    for c in controls:
+        yield CONTROL, c.mitigation_control_id, control_title(c.control)
+
+
+def entity_terms(risks, controls):
+    """Rows of dasf_entity_index for ``risks`` and ``controls`` (table rows of both sheets)."""
+    rows = []
+    for entity_type, entity_id, name in _entities(risks, controls):
+        if entity_id is None:
+            continue
+        for field, text in ((ID_FIELD, entity_id), (NAME_FIELD, name)):
+            normalized = normalize_text(text)
+            for kind, terms in ((TRIGRAM, trigrams(normalized)), (TOKEN, tokens(normalized))):
+                rows.extend(EntityTerm(kind, term, entity_type, entity_id, field, name, len(terms)) for term in sorted(terms))
+    return rows
+
+
+class EntityResolver:
+    """Inverted index of the dasf_entity_index rows, scoring candidates without scanning them."""
+
+    def __init__(self, terms):
+        self._fields = []
+        self._postings = defaultdict(list)
+        fields = {}
+        for row in terms:
+            key = (row.entity_type, row.entity_id, row.field)
+            if key not in fields:
+                fields[key] = len(self._fields)
+                self._fields.append((row.entity_type, row.entity_id, row.entity_name, row.field))
+            self._postings[(row.kind, row.term)].append((fields[key], row.term_count))
+        self._postings = dict(self._postings)
+
+    @classmethod
+    def from_tables(cls, risks, controls):
+        return cls(entity_terms(risks, controls))
+
+    def resolve(self, text, k=DEFAULT_CANDIDATES, entity_type=""):
+        """The ``k`` best candidates for ``text``, of ``entity_type`` ('risk' or 'control', '' for both)."""
+        normalized = normalize_text(text)
+        scores = defaultdict(float)
+        for kind, terms in ((TRIGRAM, trigrams(normalized)), (TOKEN, tokens(normalized))):
+            matched = defaultdict(int)
+            term_counts = {}
+            for term in terms:
+                for field, term_count in self._postings.get((kind, term), ()):
+                    matched[field] += 1
+                    term_counts[field] = term_count
+            for field, count in matched.items():
+                scores[field] += count / (len(terms) + term_counts[field] - count)
+        # Each entity is scored by its best field, the id on a tie
+        best = {}
+        for field, score in scores.items():
+            entity_type_, entity_id, name, field_name = self._fields[field]
+            if entity_type and entity_type_ != entity_type:
+                continue
+            candidate = (score / 2, field_name, name)
+            current = best.get((entity_type_, entity_id))
+            if current is None or (-candidate[0], candidate[1]) < (-current[0], current[1]):
+                best[(entity_type_, entity_id)] = candidate
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))[: max(k or 0, 0)]
+        return [
+            EntityMatch(rank, score, entity_type_, entity_id, name, field)
+            for rank, ((entity_type_, entity_id), (score, field, name)) in enumerate(ranked, 1)
+        ]
+
+    def resolve_id(self, text, entity_type):
+        """Id of the ``entity_type`` whose id matches ``text`` once both are normalized, or None."""
+        best = self.resolve(text, 1, entity_type)
+        if best and best[0].field == ID_FIELD and best[0].score == 1.0:
+            return best[0].entity_id
+        return None
+
+    def resolve_name(self, text, entity_type, threshold=NAME_MATCH_THRESHOLD):
+        """Id of the best ``entity_type`` candidate for ``text`` scoring at least ``threshold``, or None."""
+        best = self.resolve(text, 1, entity_type)
+        return best[0].entity_id if best and best[0].score >= threshold else None
+
+
+def query_terms_sql(param):
+    """Spark SQL query of the distinct trigrams and tokens of a normalized parameter, with their count per kind."""
+    normalized = f"(SELECT {normalize_text_sql(param)} AS text) AS normalized"
+    return (
+        "SELECT kind, term, count(*) OVER (PARTITION BY kind) AS query_count\nFROM (\n"
+        f"  SELECT '{TRIGRAM}' AS kind, explode(array_distinct(transform(sequence(1, length(text)), i -> substr(concat(' ', text, ' '), i, 3)))) AS term\n"
+        f"  FROM {normalized}\n  WHERE text <> ''\n"
+        "  UNION ALL\n"
+        f"  SELECT '{TOKEN}' AS kind, explode(array_distinct(split(text, ' '))) AS term\n"
+        f"  FROM {normalized}\n  WHERE text <> ''\n"
+        ") AS terms"
+    )
+
+
+def resolve_source_sql(index_table, query_table, entity_type_param):
+    """Spark SQL subquery ranking the entities of ``index_table`` against the terms of ``query_table``.
+
+    Returns the best field of each entity with its ``score`` and its ``rank`` among the
+    entities of ``entity_type_param`` ('' for every type), as :meth:`EntityResolver.resolve` does.
+    """
+    return (
+        "(\n"
+        "  SELECT *, row_number() OVER (ORDER BY score DESC, entity_type, entity_id) AS rank\n"
+        "  FROM (\n"
+        "    SELECT *, row_number() OVER (PARTITION BY entity_type, entity_id ORDER BY score DESC, field) AS field_rank\n"
+        "    FROM (\n"
+        "      SELECT entity_type, entity_id, field, first(entity_name) AS entity_name, sum(matched / (query_count + term_count - matched)) / 2 AS score\n"
+        "      FROM (\n"
+        "        SELECT entity.entity_type, entity.entity_id, entity.field, entity.kind, first(entity.entity_name) AS entity_name,\n"
+        "          count(*) AS matched, first(entity.term_count) AS term_count, first(requested.query_count) AS query_count\n"
+        f"        FROM {index_table} AS entity\n"
+        f"        JOIN {query_table} AS requested ON entity.kind = requested.kind AND entity.term = requested.term\n"
+        f"        WHERE {entity_type_param} = '' OR entity.entity_type = {entity_type_param}\n"
+        "        GROUP BY entity.entity_type, entity.entity_id, entity.field, entity.kind\n"
+        "      ) AS matches\n"
+        "      GROUP BY entity_type, entity_id, field\n"
+        "    ) AS scored\n"
+        "  ) AS fields\n"
+        "  WHERE field_rank = 1\n"
+        ") AS candidates"
+    )
+
+
+def resolved_lookup_sql(table, column, param, entity_type, id_column, by_id, alias=None):
+    """Spark SQL predicate of an exact lookup of ``column`` falling back to dasf_resolve_entity.
+
+    When no row of ``table`` matches ``param`` exactly, the row whose ``id_column`` is the
+    best ``entity_type`` candidate matches: with ``by_id``, only if its id equals ``param``
+    once both are normalized, otherwise if it scores at least :data:`NAME_MATCH_THRESHOLD`.
+    ``alias`` qualifies ``column`` and ``id_column`` of the outer query, for a body joining
+    ``table`` with another table.
+    """
+    condition = f"field = '{ID_FIELD}' AND score = 1.0" if by_id else f"score >= {NAME_MATCH_THRESHOLD}"
+    qualified = f"{alias}.{column}" if alias else column
+    if alias:
+        id_column = f"{alias}.{id_column}"
+    return (
+        f"{qualified} = {param}\n"
+        f"OR (NOT EXISTS (SELECT 1 FROM {table} WHERE {column} = {param})\n"
+        f"  AND {id_column} = (SELECT entity_id FROM {RESOLVE_FUNCTION}({param}, 1, '{entity_type}') WHERE {condition}))"
+    )
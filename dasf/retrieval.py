@@ -0,0 +1,303 @@
+"""Offline BM25 retrieval over the risk and control descriptions.
+
+The free-text columns (the risk descriptions, their NIST 800-53 mapping rationales and
+the control descriptions) are split into chunks of whole sentences and analyzed into
+terms, normalized like :mod:`dasf.resolve` without stopwords and one-character tokens.
+Ingestion writes the chunks to ``dasf_text_chunks`` and the BM25 inverted index to
+``dasf_text_postings``. Each posting already carries its BM25 weight (the term's idf
+times its saturated, length-normalized frequency in the chunk), so a query's score for
+a chunk is the sum of the weights of its terms. ``dasf_search_text`` computes it with
+one join in SQL, and :class:`RetrievalIndex` computes it in memory.
+
+:meth:`RetrievalIndex.save` persists the index as flat arrays that
+:meth:`RetrievalIndex.load` memory-maps, with no parse on load. With NumPy installed it
+also stores hashed TF-IDF embeddings of the chunks, searched by cosine similarity on
+their own or blended with BM25. No external embedding service is involved.
+"""
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import zlib
+from array import array
+from collections import Counter, namedtuple
+
+from .crosswalk import CONTROL, RISK
+from .resolve import normalize_text, normalize_text_sql
+
+# Rows of dasf_text_chunks and dasf_text_postings
+TextChunk = namedtuple("TextChunk", ["chunk_id", "entity_type", "entity_id", "field", "chunk_number", "text", "token_count"])
+Posting = namedtuple("Posting", ["term", "chunk_id", "term_frequency", "weight"])
+# Rows of dasf_search_text: the best chunk of each entity, best entities first
+SearchResult = namedtuple("SearchResult", ["rank", "score", "entity_type", "entity_id", "field", "text"])
+
+# Free-text columns indexed for each entity type
+TEXT_FIELDS = {
+    RISK: ("risk_description", "nist_800_53_controls_mapping_rationale"),
+    CONTROL: ("description",),
+}
+CHUNK_WORDS = 60
+K1 = 1.2
+B = 0.75
+# Scores are rounded so every engine ranks equal sums of the same weights equally
+SCORE_DIGITS = 6
+SEARCH_FUNCTION = "dasf_search_text"
+DEFAULT_RESULTS = 5
+EMBEDDING_DIMS = 1024
+METHODS = ("bm25", "embedding", "hybrid")
+
+# Directory of the persisted index in the local backend's output
+RETRIEVAL_INDEX = "dasf_retrieval_index"
+FORMAT_VERSION = 1
+
+STOPWORDS = frozenset(
+    "about above after all also an and any are as at be been being but by can could do does for from has have how if in "
+    "into is it its may more most must no not of on or other our out over should so such than that the their them then "
+    "there these they this those through to under up use used using was we were what when where which while who will "
+    "with within would you your".split()
+)
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def analyze(text):
+    """Terms of ``text``: its normalized tokens without stopwords and one-character tokens, in order."""
+    return [t for t in normalize_text(text).split(" ") if len(t) > 1 and t not in STOPWORDS]
+
+
+def analyzed_terms_sql(param):
+    """Spark SQL array of the distinct terms :func:`analyze` finds in a parameter."""
+    stopwords = ", ".join(f"'{word}'" for word in sorted(STOPWORDS))
+    return (
+        f"array_distinct(filter(split({normalize_text_sql(param)}, ' '),\n"
+        f"  term -> length(term) > 1 AND NOT array_contains(array({stopwords}), term)))"
+    )
+
+
+def chunk_text(text, max_words=CHUNK_WORDS):
+    """Split ``text`` into chunks of whole sentences of at most ``max_words`` words (longer sentences are split)."""
+    chunks, current = [], []
+    for sentence in _SENTENCE.split((text or "").strip()):
+        words = sentence.split()
+        if current and len(current) + len(words) > max_words:
+            chunks.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def text_chunks(risks, controls, max_words=CHUNK_WORDS):
+    """Rows of dasf_text_chunks for ``risks`` and ``controls`` (table rows of both sheets); chunks without terms are dropped."""
+    rows = []
+    entities = [(RISK, r.risk_id, r) for r in risks] + [(CONTROL, c.mitigation_control_id, c) for c in controls]
+    for entity_type, entity_id, row in entities:
+        if entity_id is None:
+            continue
+        for field in TEXT_FIELDS[entity_type]:
+            for number, text in enumerate(chunk_text(getattr(row, field), max_words), 1):
+                terms = analyze(text)
+                if terms:
+                    rows.append(TextChunk(len(rows), entity_type, entity_id, field, number, text, len(terms)))
+    return rows
+
+
+def idf(document_frequency, documents):
+    """BM25 idf of a term found in ``document_frequency`` of ``documents`` chunks, never negative."""
+    return math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def text_postings(chunks, k1=K1, b=B):
+    """Rows of dasf_text_postings: every term of every chunk with its BM25 weight, sorted by term and chunk."""
+    frequencies = [Counter(analyze(chunk.text)) for chunk in chunks]
+    document_frequency = Counter(term for counts in frequencies for term in counts)
+    average_length = sum(chunk.token_count for chunk in chunks) / len(chunks) if chunks else 0
+    rows = []
+    for chunk, counts in zip(chunks, frequencies):
+        norm = k1 * (1 - b + b * chunk.token_count / average_length)
+        for term, tf in counts.items():
+            weight = idf(document_frequency[term], len(chunks)) * tf * (k1 + 1) / (tf + norm)
+            rows.append(Posting(term, chunk.chunk_id, tf, weight))
+    return sorted(rows, key=lambda p: (p.term, p.chunk_id))
+
+
+def _hashed(term, dims):
+    h = zlib.crc32(term.encode("utf-8"))
+    return h % dims, -1.0 if h >> 31 else 1.0
+
+
+def _read_array(path, typecode):
+    # Memory-map a flat array file; an empty file cannot be mapped
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return array(typecode)
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+
+
+class RetrievalIndex:
+    """BM25 inverted index of the text chunks, with optional hashed TF-IDF embeddings.
+
+    ``postings`` are dasf_text_postings rows sorted by term and chunk id. Each term maps to
+    a contiguous run of the flat chunk id and weight arrays.
+    """
+
+    def __init__(self, chunks, postings, embeddings=None):
+        self.chunks = list(chunks)
+        self.terms = {}
+        self.chunk_ids = array("I")
+        self.weights = array("d")
+        for i, posting in enumerate(postings):
+            offset, count = self.terms.get(posting.term, (i, 0))
+            self.terms[posting.term] = (offset, count + 1)
+            self.chunk_ids.append(posting.chunk_id)
+            self.weights.append(posting.weight)
+        self.embeddings = embeddings
+
+    @classmethod
+    def from_tables(cls, risks, controls, embeddings=False, dims=EMBEDDING_DIMS):
+        """Index of the text chunks of ``risks`` and ``controls``; with ``embeddings``, also their hashed TF-IDF vectors (needs NumPy)."""
+        chunks = text_chunks(risks, controls)
+        index = cls(chunks, text_postings(chunks))
+        if embeddings:
+            index.embeddings = index.embed_chunks(dims)
+        return index
+
+    def _postings(self, term):
+        offset, count = self.terms.get(term, (0, 0))
+        return zip(self.chunk_ids[offset : offset + count], self.weights[offset : offset + count])
+
+    def _vector(self, terms, dims):
+        import numpy as np
+
+        vector = np.zeros(dims, dtype=np.float32)
+        for term, tf in Counter(terms).items():
+            if term in self.terms:
+                position, sign = _hashed(term, dims)
+                vector[position] += sign * (1 + math.log(tf)) * idf(self.terms[term][1], len(self.chunks))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_chunks(self, dims=EMBEDDING_DIMS):
+        """Hashed TF-IDF vector of every chunk, L2-normalized, as a (chunks, dims) float32 matrix."""
+        import numpy as np
+
+        return np.vstack([self._vector(analyze(chunk.text), dims) for chunk in self.chunks]) if self.chunks else np.zeros((0, dims), np.float32)
+
+    def chunk_scores(self, query, method="bm25"):
+        """Score of every matching chunk for ``query``, by chunk id."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(METHODS)}")
+        terms = sorted(set(analyze(query)))
+        bm25 = {}
+        for term in terms:
+            for chunk_id, weight in self._postings(term):
+                bm25[chunk_id] = bm25.get(chunk_id, 0.0) + weight
+        if method == "bm25":
+            return bm25
+        if self.embeddings is None:
+            raise ValueError("This index has no embeddings; build it with NumPy installed")
+        similarities = self.embeddings @ self._vector(analyze(query), self.embeddings.shape[1])
+        cosine = {int(i): float(similarities[i]) for i in similarities.nonzero()[0] if similarities[i] > 0}
+        if method == "embedding":
+            return cosine
+        top = max(bm25.values(), default=0.0) or 1.0
+        return {i: 0.5 * bm25.get(i, 0.0) / top + 0.5 * cosine.get(i, 0.0) for i in set(bm25) | set(cosine)}
+
+    def search(self, query, k=DEFAULT_RESULTS, entity_type="", method="bm25"):
+        """The ``k`` best risks and controls for ``query``, each with its best chunk, of ``entity_type`` ('' for both)."""
+        best = {}
+        for chunk_id, score in self.chunk_scores(query, method).items():
+            chunk = self.chunks[chunk_id]
+            if entity_type and chunk.entity_type != entity_type:
+                continue
+            score = round(score, SCORE_DIGITS)
+            key = (chunk.entity_type, chunk.entity_id)
+            if key not in best or (-score, chunk_id) < (-best[key][0], best[key][1].chunk_id):
+                best[key] = (score, chunk)
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))[: max(k or 0, 0)]
+        return [
+            SearchResult(rank, score, chunk.entity_type, chunk.entity_id, chunk.field, chunk.text)
+            for rank, (_, (score, chunk)) in enumerate(ranked, 1)
+        ]
+
+    def save(self, directory):
+        """Write the index to ``directory`` as flat arrays that :meth:`load` memory-maps."""
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            "format": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "chunks": len(self.chunks),
+            "terms": len(self.terms),
+            "postings": len(self.chunk_ids),
+            "k1": K1,
+            "b": B,
+            "embedding_dims": int(self.embeddings.shape[1]) if self.embeddings is not None else None,
+        }
+        with open(os.path.join(directory, "chunks.jsonl"), "w", encoding="utf-8") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk._asdict(), ensure_ascii=False) + "\n")
+        with open(os.path.join(directory, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(self.terms, f, ensure_ascii=False, sort_keys=True)
+        with open(os.path.join(directory, "chunk_ids.u32"), "wb") as f:
+            array("I", self.chunk_ids).tofile(f)
+        with open(os.path.join(directory, "weights.f64"), "wb") as f:
+            array("d", self.weights).tofile(f)
+        if self.embeddings is not None:
+            import numpy as np
+
+            np.save(os.path.join(directory, "embeddings.npy"), self.embeddings)
+        with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-map an index written by :meth:`save`; its embeddings are mapped too when NumPy is installed."""
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["format"] != FORMAT_VERSION or manifest["byteorder"] != sys.byteorder:
+            raise ValueError(f"{directory} holds an index of format {manifest['format']} ({manifest['byteorder']} endian), expected {FORMAT_VERSION} ({sys.byteorder} endian)")
+        index = cls.__new__(cls)
+        with open(os.path.join(directory, "chunks.jsonl"), encoding="utf-8") as f:
+            index.chunks = [TextChunk(**json.loads(line)) for line in f]
+        with open(os.path.join(directory, "terms.json"), encoding="utf-8") as f:
+            index.terms = {term: tuple(span) for term, span in json.load(f).items()}
+        index.chunk_ids = _read_array(os.path.join(directory, "chunk_ids.u32"), "I")
+        index.weights = _read_array(os.path.join(directory, "weights.f64"), "d")
+        index.embeddings = None
+        if manifest["embedding_dims"] is not None:
+            try:
+                import numpy as np
+
+                index.embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+            except ImportError:
+                pass
+        return index
+
+
+def search_source_sql(chunks_table, postings_table, terms_table, entity_type_param):
+    """Spark SQL subquery ranking the best chunk of every entity by the BM25 weights of the terms in ``terms_table``."""
+    return (
+        "(\n"
+        "  SELECT *, row_number() OVER (ORDER BY score DESC, entity_type, entity_id) AS rank\n"
+        "  FROM (\n"
+        "    SELECT chunks.entity_type, chunks.entity_id, chunks.field, chunks.text, scored.score,\n"
+        "      row_number() OVER (PARTITION BY chunks.entity_type, chunks.entity_id ORDER BY scored.score DESC, chunks.chunk_id) AS chunk_rank\n"
+        "    FROM (\n"
+        f"      SELECT postings.chunk_id, round(sum(postings.weight), {SCORE_DIGITS}) AS score\n"
+        f"      FROM {postings_table} AS postings\n"
+        f"      JOIN {terms_table} AS requested ON postings.term = requested.term\n"
+        "      GROUP BY postings.chunk_id\n"
+        "    ) AS scored\n"
+        f"    JOIN {chunks_table} AS chunks ON chunks.chunk_id = scored.chunk_id\n"
+        f"    WHERE {entity_type_param} = '' OR chunks.entity_type = {entity_type_param}\n"
+        "  ) AS best_chunks\n"
+        "  WHERE chunk_rank = 1\n"
+        ") AS results"
+    )
@@ -0,0 +1,332 @@
+"""Side by side storage of the compendium revisions and their precomputed diffs.
+
+The compendium carries no revision of its own, only the revision each risk and control
+was introduced in, so a compendium is filed under the latest of those (``DASF v 2.0``
+today). Every ingest keeps its rows in ``risks_in_ai_system_components_history`` and
+``databricks_ai_mitigation_controls_history``, keyed by (compendium_revision, risk_id)
+and (compendium_revision, mitigation_control_id), each with a SHA-256 of its values.
+
+When a revision lands, :func:`plan_revision` compares the row hashes of the revision and
+of the one before it. Only the rows whose hash differs are read back and compared field
+by field into ``dasf_revision_diffs``, so a diff costs time in the number of changed rows
+rather than in the size of two full snapshots. A re-ingested revision whose hashes match
+what is stored writes nothing, and one whose content changed is filed as an amendment of
+the revision, e.g. ``DASF v 2.0 (amendment 1)``, diffed against the stored content. The revisions are read through a store:
+:class:`RevisionHistory` in memory (the local backend and the engine), or
+:class:`SqlRevisionStore` over Spark or the SQL Statement Execution API.
+"""
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+from .crosswalk import CONTROL, RISK
+from .schema import CONTROL_REVISIONS, CONTROLS, REVISION_DIFFS, REVISIONS, RISK_REVISIONS, RISKS, column_names, quote
+
+# Rows of dasf_revisions, dasf_revision_diffs and the two history tables
+RevisionEntry = namedtuple("RevisionEntry", column_names(REVISIONS))
+RevisionDiff = namedtuple("RevisionDiff", column_names(REVISION_DIFFS))
+RiskRevision = namedtuple("RiskRevision", column_names(RISK_REVISIONS))
+ControlRevision = namedtuple("ControlRevision", column_names(CONTROL_REVISIONS))
+# rows: history rows of the revision by entity type; revisions: every dasf_revisions row;
+# diffs: dasf_revision_diffs rows of the revisions in diff_revisions, whose diffs are replaced
+RevisionUpdate = namedtuple("RevisionUpdate", ["revision", "rows", "revisions", "diffs", "diff_revisions"])
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+# History table, current table, id column and history row type of each entity type
+HISTORIES = {
+    RISK: (RISK_REVISIONS, RISKS, "risk_id", RiskRevision),
+    CONTROL: (CONTROL_REVISIONS, CONTROLS, "mitigation_control_id", ControlRevision),
+}
+REVISION_TABLES = (RISK_REVISIONS, CONTROL_REVISIONS, REVISIONS, REVISION_DIFFS)
+
+_NUMBER = re.compile(r"[0-9]+")
+_AMENDMENT = re.compile(r"^(.*) \(amendment [0-9]+\)$")
+
+
+def revision_key(revision):
+    """Sort key of a revision label: its version numbers, so 'DASF v 1.10' follows 'DASF v 1.9'."""
+    return tuple(int(n) for n in _NUMBER.findall(revision or "")), revision or ""
+
+
+def compendium_revision(risks, controls):
+    """Revision of a compendium: the latest revision any of its risks or controls was introduced in."""
+    labels = {(r.revision or "").strip() for r in risks} | {(c.dasf_revision or "").strip() for c in controls}
+    labels.discard("")
+    if not labels:
+        raise ValueError("No risk or control carries a DASF revision")
+    return max(labels, key=revision_key)
+
+
+def field_text(value):
+    """Text of a table value as stored in the diffs: lists as compact JSON, booleans as true or false."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return json.dumps(list(value), ensure_ascii=False, separators=(",", ":"))
+    return str(value)
+
+
+def row_hash(values):
+    """SHA-256 of a row's values by their text, equal for rows read back from any backend."""
+    return hashlib.sha256(json.dumps([field_text(v) for v in values], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def revision_rows(entity_type, rows, revision):
+    """History rows of a compendium's ``rows`` of ``entity_type`` filed under ``revision``."""
+    _, sheet, id_column, row_type = HISTORIES[entity_type]
+    names = column_names(sheet)
+    history = []
+    for row in rows:
+        if getattr(row, id_column) is None:
+            continue
+        values = [getattr(row, name) for name in names]
+        history.append(row_type(revision, row_hash(values), *values))
+    return history
+
+
+def compendium_rows(risks, controls, revision=None):
+    """Revision of a compendium (:func:`compendium_revision` unless given) and its history rows by entity type."""
+    revision = revision or compendium_revision(risks, controls)
+    return revision, {RISK: revision_rows(RISK, risks, revision), CONTROL: revision_rows(CONTROL, controls, revision)}
+
+
+def content_hash(rows):
+    """SHA-256 of the row hashes of a revision's history rows by entity type."""
+    hashes = sorted(f"{entity_type}:{row.row_hash}" for entity_type, typed in rows.items() for row in typed)
+    return hashlib.sha256(",".join(hashes).encode("utf-8")).hexdigest()
+
+
+def diff_entities(entity_type, revision, previous_revision, hashes, previous_hashes, read_rows):
+    """dasf_revision_diffs rows of ``entity_type`` between two revisions, from their row hashes by id.
+
+    ``read_rows(revision, ids)`` returns the history rows of ``ids`` in a revision by id; it
+    is only asked for the ids whose hashes differ.
+    """
+    _, sheet, id_column, _ = HISTORIES[entity_type]
+    diffs = [
+        RevisionDiff(revision, previous_revision, entity_type, entity_id, change, "", None, None)
+        for change, ids in ((ADDED, hashes.keys() - previous_hashes.keys()), (REMOVED, previous_hashes.keys() - hashes.keys()))
+        for entity_id in ids
+    ]
+    modified = [entity_id for entity_id, h in hashes.items() if entity_id in previous_hashes and previous_hashes[entity_id] != h]
+    if modified:
+        current, previous = read_rows(revision, modified), read_rows(previous_revision, modified)
+        for entity_id in modified:
+            for name in column_names(sheet):
+                value, previous_value = field_text(getattr(current[entity_id], name)), field_text(getattr(previous[entity_id], name))
+                if value != previous_value:
+                    diffs.append(RevisionDiff(revision, previous_revision, entity_type, entity_id, MODIFIED, name, previous_value, value))
+    return sorted(diffs, key=lambda d: (d.entity_id, d.field))
+
+
+def amended_revision(revision, amendment):
+    """Label of the ``amendment``-th edit of a compendium ingested again under ``revision``."""
+    return f"{revision} (amendment {amendment})"
+
+
+def amended_from(label):
+    """Revision an amendment label was amended from, or the label itself."""
+    match = _AMENDMENT.match(label or "")
+    return match.group(1) if match else label
+
+
+def plan_revision(store, revision, rows):
+    """What ingesting the history ``rows`` (by entity type) of ``revision`` changes in ``store``.
+
+    Returns a :class:`RevisionUpdate`, or None when the latest stored content of the revision
+    is the same. A compendium whose content differs from what is stored under its revision
+    was edited without a new revision label; it is filed as an amendment of the revision
+    (see :func:`amended_revision`) next to it, so the edits are kept as the amendment's diffs
+    rather than overwriting the stored rows. The diffs of the revision and of the revision
+    after it (whose previous revision it may have become) are recomputed.
+    """
+    existing = {entry.revision: entry for entry in store.revisions()}
+    digest = content_hash(rows)
+    filed = [label for label in existing if amended_from(label) == revision]
+    if filed:
+        if existing[max(filed, key=revision_key)].content_hash == digest:
+            return None
+        revision = amended_revision(revision, len(filed))
+        rows = {entity_type: [row._replace(compendium_revision=revision) for row in typed] for entity_type, typed in rows.items()}
+    labels = sorted(set(existing) | {revision}, key=revision_key)
+    position = labels.index(revision)
+    entries = []
+    for i, label in enumerate(labels):
+        if label == revision:
+            counts = (len(rows[RISK]), len(rows[CONTROL]), digest)
+        else:
+            counts = (existing[label].risk_count, existing[label].control_count, existing[label].content_hash)
+        entries.append(RevisionEntry(label, i + 1, labels[i - 1] if i else None, *counts))
+
+    new_rows = {entity_type: {getattr(row, HISTORIES[entity_type][2]): row for row in typed} for entity_type, typed in rows.items()}
+
+    def hashes(entity_type, label):
+        if label == revision:
+            return {entity_id: row.row_hash for entity_id, row in new_rows[entity_type].items()}
+        return store.hashes(entity_type, label)
+
+    def reader(entity_type):
+        def read_rows(label, ids):
+            if label == revision:
+                return {entity_id: new_rows[entity_type][entity_id] for entity_id in ids}
+            return store.rows(entity_type, label, ids)
+
+        return read_rows
+
+    diff_revisions = labels[max(position, 1) : position + 2]
+    diffs = []
+    for label in diff_revisions:
+        previous = labels[labels.index(label) - 1]
+        for entity_type in HISTORIES:
+            diffs.extend(
+                diff_entities(entity_type, label, previous, hashes(entity_type, label), hashes(entity_type, previous), reader(entity_type))
+            )
+    return RevisionUpdate(revision, rows, entries, diffs, diff_revisions)
+
+
+def update_scopes(update):
+    """Target rows each revision table's MERGE of ``update`` may delete, as SQL conditions by table name."""
+    revisions = ", ".join(_literal(label) for label in update.diff_revisions) or "NULL"
+    return {
+        RISK_REVISIONS.table: f"target.compendium_revision = {_literal(update.revision)}",
+        CONTROL_REVISIONS.table: f"target.compendium_revision = {_literal(update.revision)}",
+        REVISIONS.table: None,
+        REVISION_DIFFS.table: f"target.revision IN ({revisions})",
+    }
+
+
+def update_tables(update):
+    """Rows of every revision table to MERGE for ``update``, by table name."""
+    return {
+        RISK_REVISIONS.table: update.rows[RISK],
+        CONTROL_REVISIONS.table: update.rows[CONTROL],
+        REVISIONS.table: update.revisions,
+        REVISION_DIFFS.table: update.diffs,
+    }
+
+
+def _literal(text):
+    return "'" + quote(text.replace("\\", "\\\\")) + "'"
+
+
+class RevisionHistory:
+    """In-memory revision store with the queries of the revision UC functions."""
+
+    def __init__(self, revisions=(), risk_rows=(), control_rows=(), diffs=()):
+        self._revisions = {entry.revision: entry for entry in revisions}
+        self._rows = {RISK: {}, CONTROL: {}}
+        for entity_type, rows in ((RISK, risk_rows), (CONTROL, control_rows)):
+            id_column = HISTORIES[entity_type][2]
+            for row in rows:
+                self._rows[entity_type].setdefault(row.compendium_revision, {})[getattr(row, id_column)] = row
+        self._diffs = {}
+        for diff in diffs:
+            self._diffs.setdefault(diff.revision, []).append(diff)
+
+    @classmethod
+    def from_tables(cls, tables):
+        """History of the revision tables' rows, keyed by table name; missing tables are empty."""
+        return cls(*(tables.get(sheet.table, ()) for sheet in (REVISIONS, RISK_REVISIONS, CONTROL_REVISIONS, REVISION_DIFFS)))
+
+    @classmethod
+    def from_compendium(cls, risks, controls, revision=None):
+        """History holding a single compendium."""
+        history = cls()
+        history.apply(plan_revision(history, *compendium_rows(risks, controls, revision)))
+        return history
+
+    def revisions(self):
+        """dasf_revisions rows, oldest first."""
+        return sorted(self._revisions.values(), key=lambda entry: entry.revision_number)
+
+    def hashes(self, entity_type, revision):
+        return {entity_id: row.row_hash for entity_id, row in self._rows[entity_type].get(revision, {}).items()}
+
+    def rows(self, entity_type, revision, ids):
+        stored = self._rows[entity_type].get(revision, {})
+        return {entity_id: stored[entity_id] for entity_id in ids}
+
+    def ingest(self, risks, controls, revision=None):
+        """File a compendium under its revision; returns the applied :class:`RevisionUpdate`, or None if unchanged."""
+        update = plan_revision(self, *compendium_rows(risks, controls, revision))
+        if update is not None:
+            self.apply(update)
+        return update
+
+    def apply(self, update):
+        for entity_type, rows in update.rows.items():
+            id_column = HISTORIES[entity_type][2]
+            self._rows[entity_type][update.revision] = {getattr(row, id_column): row for row in rows}
+        self._revisions = {entry.revision: entry for entry in update.revisions}
+        for label in update.diff_revisions:
+            self._diffs[label] = [diff for diff in update.diffs if diff.revision == label]
+
+    def tables(self):
+        """Rows of every revision table, keyed by table name."""
+        order = [entry.revision for entry in self.revisions()]
+        return {
+            RISK_REVISIONS.table: [row for label in order for row in self._rows[RISK].get(label, {}).values()],
+            CONTROL_REVISIONS.table: [row for label in order for row in self._rows[CONTROL].get(label, {}).values()],
+            REVISIONS.table: self.revisions(),
+            REVISION_DIFFS.table: [diff for label in order for diff in self._diffs.get(label, ())],
+        }
+
+    def latest_revision(self):
+        revisions = self.revisions()
+        return revisions[-1].revision if revisions else None
+
+    def changes(self, revision="", entity_type=""):
+        """Changes a revision ('' for the latest) made to the one before it, by entity type, id and field."""
+        diffs = self._diffs.get(revision or self.latest_revision(), ())
+        return sorted(
+            (d for d in diffs if not entity_type or d.entity_type == entity_type), key=lambda d: (d.entity_type, d.entity_id, d.field)
+        )
+
+    def entity_history(self, entity_id):
+        """Every change of a risk or control across the revisions, oldest first."""
+        numbers = {entry.revision: entry.revision_number for entry in self._revisions.values()}
+        return sorted(
+            (d for diffs in self._diffs.values() for d in diffs if d.entity_id == entity_id),
+            key=lambda d: (numbers.get(d.revision, 0), d.entity_type, d.field),
+        )
+
+
+class SqlRevisionStore:
+    """Revision store reading the revision tables of ``catalog.schema`` through ``query(sql)``, which returns row sequences.
+
+    Spark returns typed values and the SQL Statement Execution API returns text; both
+    compare equal once rendered by :func:`field_text`. The tables must exist.
+    """
+
+    def __init__(self, query, catalog, schema):
+        self.query = query
+        self.catalog = catalog
+        self.schema = schema
+
+    def _table(self, sheet):
+        return f"{self.catalog}.{self.schema}.{sheet.table}"
+
+    def revisions(self):
+        names = column_names(REVISIONS)
+        rows = self.query(f"SELECT {', '.join(names)} FROM {self._table(REVISIONS)}")
+        entries = [RevisionEntry(row[0], int(row[1]), row[2], int(row[3]), int(row[4]), row[5]) for row in rows]
+        return sorted(entries, key=lambda entry: entry.revision_number)
+
+    def hashes(self, entity_type, revision):
+        history, _, id_column, _ = HISTORIES[entity_type]
+        rows = self.query(f"SELECT {id_column}, row_hash FROM {self._table(history)} WHERE compendium_revision = {_literal(revision)}")
+        return {entity_id: digest for entity_id, digest in rows}
+
+    def rows(self, entity_type, revision, ids):
+        history, _, id_column, row_type = HISTORIES[entity_type]
+        rows = self.query(
+            f"SELECT {', '.join(column_names(history))} FROM {self._table(history)} "
+            f"WHERE compendium_revision = {_literal(revision)} AND {id_column} IN ({', '.join(_literal(i) for i in ids)})"
+        )
+        return {getattr(row, id_column): row for row in (row_type(*values) for values in rows)}
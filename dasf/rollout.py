@@ -0,0 +1,351 @@
+"""Concurrent rollout of the DASF tables and functions to many workspaces and catalogs.
+
+A target is a (workspace, catalog, schema, volume) location reached through the SQL
+Statement Execution API of one of its SQL warehouses. The TSVs are parsed, the tables
+derived and every MERGE source and function definition rendered once, in a
+:class:`RolloutPlan` shared by all targets. The targets are then deployed on a bounded
+thread pool. Each one creates its schema and volume, MERGEs only the tables whose
+fingerprint changed, files the compendium in the target's revision history, appends
+the risks and controls it changed to the target's change log and re-creates only the
+changed functions. The TSVs are validated once, before any target is touched. Requests to a workspace
+go through one :class:`StatementClient` per workspace and warehouse, which keeps a
+keep-alive connection per thread and retries transient failures with exponential
+backoff. Every statement it submits is idempotent, so a retried request is safe.
+:func:`rollout` returns a :class:`TargetStatus` per target. A failed target does not
+stop the others.
+
+:mod:`dasf.mock_server` serves the same API locally, for ``python -m dasf rollout --mock``.
+"""
+import datetime
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote as url_quote
+from urllib.parse import urlsplit
+
+from .changes import change_events, next_version
+from .crosswalk import CONTROL, RISK
+from .functions import FUNCTIONS, comment_fingerprint, create_function_statement, function_fingerprint, routines_query, submit_statements
+from .incremental import FINGERPRINT_PROPERTY, create_table_statement, merge_statement
+from .ingest import TABLE_SOURCES, TABLE_TAGS, TABLES, local_tables, table_fingerprints
+from .revisions import REVISION_TABLES, SqlRevisionStore, compendium_rows, plan_revision, update_scopes, update_tables
+from .schema import CHANGE_LOG, CONTROLS, RISKS, column_names, quote, target_columns
+from .sheets import RESOURCES_DIR
+from .validate import validate_resources
+
+# warehouse_id: SQL warehouse running the statements; token: personal access token, $DATABRICKS_TOKEN when None
+Target = namedtuple("Target", ["workspace", "catalog", "schema", "volume", "warehouse_id", "token"], defaults=(None, None))
+# state: "succeeded" or "failed"; retries: requests retried after a transient failure
+TargetStatus = namedtuple(
+    "TargetStatus",
+    ["workspace", "catalog", "schema", "state", "tables_written", "functions_deployed", "statements", "retries", "elapsed_ms", "error"],
+)
+# sources: MERGE source subquery of every table; functions: (fingerprint, CREATE statement) by function name
+# revision: (revision, history rows by entity type) of the compendium, for the targets' revision tables
+# rows: the parsed risks and controls by entity type, for the targets' change logs
+RolloutPlan = namedtuple("RolloutPlan", ["fingerprints", "sources", "files", "functions", "revision", "rows"])
+
+# Entity type of the tables whose changed rows go to the change log
+_LOGGED_TABLES = {RISKS.table: RISK, CONTROLS.table: CONTROL}
+
+# HTTP statuses worth retrying: rate limiting and unavailable gateways or warehouses
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+_RUNNING_STATES = ("PENDING", "RUNNING")
+
+
+class StatementError(Exception):
+    """A statement that failed, was canceled, or a request the API rejected."""
+
+    def __init__(self, message, error_code=None):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+class _Counter:
+    def __init__(self):
+        self.statements = 0
+        self.retries = 0
+
+
+class StatementClient:
+    """Client of the SQL Statement Execution and Files APIs of one workspace and warehouse.
+
+    Safe to share between threads: each thread keeps its own keep-alive connection, reused
+    by all of its requests. Connection errors and :data:`TRANSIENT_STATUSES` are retried up
+    to ``retries`` times, waiting ``backoff * 2**attempt`` seconds (with jitter, or the
+    server's Retry-After) in between.
+    """
+
+    def __init__(self, workspace, warehouse_id, token=None, retries=5, backoff=0.5, timeout=60, poll_interval=0.5):
+        url = urlsplit(workspace if "://" in workspace else f"https://{workspace}")
+        self.scheme, self.host = url.scheme, url.netloc
+        self.warehouse_id = warehouse_id
+        self.token = token if token is not None else os.environ.get("DATABRICKS_TOKEN")
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = self._local.connection = factory(self.host, timeout=self.timeout)
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt * (0.5 + random.random() / 2)
+
+    def request(self, method, path, body=None, content_type="application/json", counter=None):
+        """Send a request and return its decoded JSON response ({} when empty)."""
+        headers = {"Content-Type": content_type}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                connection = self._connection()
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self._reset()
+                if response.status < 400:
+                    return json.loads(data) if data else {}
+                if response.status not in TRANSIENT_STATUSES or attempt == self.retries:
+                    raise StatementError(f"{method} {path}: HTTP {response.status} {data[:500].decode('utf-8', 'replace')}")
+                retry_after = response.getheader("Retry-After")
+            except (OSError, http.client.HTTPException):
+                self._reset()
+                if attempt == self.retries:
+                    raise
+            if counter is not None:
+                counter.retries += 1
+            time.sleep(self._delay(attempt, retry_after))
+
+    def execute(self, statement, catalog=None, schema=None, counter=None):
+        """Run ``statement`` with ``catalog`` and ``schema`` as its defaults and return its rows as lists of strings."""
+        body = {
+            "warehouse_id": self.warehouse_id,
+            "statement": statement,
+            "wait_timeout": "30s",
+            "on_wait_timeout": "CONTINUE",
+            "disposition": "INLINE",
+            "format": "JSON_ARRAY",
+        }
+        if catalog:
+            body["catalog"] = catalog
+        if schema:
+            body["schema"] = schema
+        if counter is not None:
+            counter.statements += 1
+        response = self.request("POST", "/api/2.0/sql/statements", json.dumps(body).encode("utf-8"), counter=counter)
+        while response.get("status", {}).get("state") in _RUNNING_STATES:
+            time.sleep(self.poll_interval)
+            response = self.request("GET", f"/api/2.0/sql/statements/{response['statement_id']}", counter=counter)
+        status = response.get("status", {})
+        if status.get("state") != "SUCCEEDED":
+            error = status.get("error", {})
+            raise StatementError(
+                f"{status.get('state')}: {error.get('message', 'statement did not succeed')}\n{statement[:200]}", error.get("error_code")
+            )
+        result = response.get("result") or {}
+        rows = list(result.get("data_array") or [])
+        while result.get("next_chunk_internal_link"):
+            result = self.request("GET", result["next_chunk_internal_link"], counter=counter)
+            rows.extend(result.get("data_array") or [])
+        return rows
+
+    def upload(self, path, data, counter=None):
+        """Write ``data`` to the volume file ``path`` (``/Volumes/<catalog>/<schema>/<volume>/<file>``), replacing it."""
+        self.request("PUT", f"/api/2.0/fs/files{url_quote(path)}?overwrite=true", data, "application/octet-stream", counter)
+
+
+def sql_literal(value):
+    """SQL literal of a table value: a string, an integer, a float, a boolean, a list of strings or None."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        # A D suffix keeps the literal a DOUBLE; repr round-trips every bit
+        return f"{value!r}D"
+    if isinstance(value, (list, tuple)):
+        return f"array({', '.join(sql_literal(v) for v in value)})"
+    return "'" + quote(str(value).replace("\\", "\\\\")) + "'"
+
+
+def values_source(sheet, rows):
+    """MERGE source subquery of a table's rows as an inline VALUES table cast to the declared column types."""
+    names = column_names(sheet)
+    casts = ", ".join(f"CAST({c.name} AS {c.type}) AS {c.name}" for c in target_columns(sheet))
+    if not rows:
+        return f"(SELECT {casts} FROM VALUES ({', '.join('NULL' for _ in names)}) AS source_rows({', '.join(names)}) WHERE FALSE)"
+    values = ",\n  ".join("(" + ", ".join(sql_literal(getattr(row, name)) for name in names) + ")" for row in rows)
+    return f"(SELECT {casts}\nFROM VALUES\n  {values}\nAS source_rows({', '.join(names)}))"
+
+
+def plan_rollout(resources_dir=RESOURCES_DIR, functions=FUNCTIONS):
+    """Validate and parse the TSVs in ``resources_dir`` and render everything the targets share.
+
+    Raises :class:`dasf.validate.ValidationError` when the TSVs fail validation.
+    """
+    validate_resources(resources_dir).raise_for_errors()
+    tables = local_tables(resources_dir)
+    files = {}
+    for sheet in (RISKS, CONTROLS):
+        with open(os.path.join(resources_dir, sheet.file), "rb") as f:
+            files[sheet.file] = f.read()
+    return RolloutPlan(
+        table_fingerprints(resources_dir),
+        {sheet.table: values_source(sheet, tables[sheet.table]) for sheet in TABLES},
+        files,
+        {f.name: (function_fingerprint(f), create_function_statement(f)) for f in functions},
+        compendium_rows(tables[RISKS.table], tables[CONTROLS.table]),
+        {RISK: tables[RISKS.table], CONTROL: tables[CONTROLS.table]},
+    )
+
+
+def _read_rows(run, sheet, table):
+    # Rows of a target's table as the API returns them, text values under the sheet's column names
+    names = column_names(sheet)
+    row_type = namedtuple("Row", names)
+    return [row_type(*values) for values in run(f"SELECT {', '.join(names)} FROM {table}")]
+
+
+def deploy_target(client, target, plan, force=False):
+    """Write the changed tables and functions of ``plan`` to ``target`` and return its :class:`TargetStatus`."""
+    counter, written, deployed = _Counter(), [], []
+    loaded_at = datetime.datetime.now(datetime.timezone.utc)
+    start = time.perf_counter()
+
+    def run(statement, schema=target.schema):
+        return client.execute(statement, target.catalog, schema, counter)
+
+    try:
+        run(f"CREATE SCHEMA IF NOT EXISTS {target.catalog}.{target.schema}", schema=None)
+        if target.volume:
+            run(f"CREATE VOLUME IF NOT EXISTS {target.catalog}.{target.schema}.{target.volume}")
+        existing = {}
+        for table, column in run(
+            f"SELECT table_name, column_name FROM {target.catalog}.information_schema.columns "
+            f"WHERE table_schema = '{quote(target.schema)}' ORDER BY table_name, ordinal_position"
+        ):
+            existing.setdefault(table, []).append(column)
+
+        uploaded, previous = set(), {}
+        for sheet in TABLES:
+            table = f"{target.catalog}.{target.schema}.{sheet.table}"
+            columns = existing.get(sheet.table)
+            if columns and not force:
+                properties = dict(run(f"SHOW TBLPROPERTIES {table}"))
+                if properties.get(FINGERPRINT_PROPERTY) == plan.fingerprints[sheet.table]:
+                    continue
+            # Keep the volume's copy of the TSVs in step with the tables built from them
+            for file in TABLE_SOURCES[sheet.table]:
+                if target.volume and file not in uploaded:
+                    client.upload(f"/Volumes/{target.catalog}/{target.schema}/{target.volume}/{file}", plan.files[file], counter)
+                    uploaded.add(file)
+            # The rows before the MERGE, to find the ones it changes for the change log
+            if sheet.table in _LOGGED_TABLES:
+                previous[_LOGGED_TABLES[sheet.table]] = _read_rows(run, sheet, table) if columns == column_names(sheet) else []
+            if columns != column_names(sheet):
+                run(create_table_statement(sheet, table, replace=bool(columns), properties={"tags": TABLE_TAGS[sheet.table]}))
+            elif sheet.cluster_by:
+                run(f"ALTER TABLE {table} CLUSTER BY ({', '.join(sheet.cluster_by)})")
+            run(merge_statement(sheet, plan.sources[sheet.table], table))
+            if sheet.cluster_by:
+                run(f"OPTIMIZE {table}")
+            run(f"ALTER TABLE {table} SET TBLPROPERTIES ('{FINGERPRINT_PROPERTY}' = '{plan.fingerprints[sheet.table]}')")
+            written.append(sheet.table)
+
+        # The target's revision history is read back, and only this compendium's revision and the diffs it affects are merged
+        for sheet in REVISION_TABLES:
+            if existing.get(sheet.table) != column_names(sheet):
+                table = f"{target.catalog}.{target.schema}.{sheet.table}"
+                run(create_table_statement(sheet, table, replace=bool(existing.get(sheet.table)), properties={"tags": TABLE_TAGS[sheet.table]}))
+        update = plan_revision(SqlRevisionStore(run, target.catalog, target.schema), *plan.revision)
+        if update is not None:
+            tables, scopes = update_tables(update), update_scopes(update)
+            for sheet in REVISION_TABLES:
+                table = f"{target.catalog}.{target.schema}.{sheet.table}"
+                run(merge_statement(sheet, values_source(sheet, tables[sheet.table]), table, scopes[sheet.table]))
+                if sheet.cluster_by:
+                    run(f"OPTIMIZE {table}")
+                written.append(sheet.table)
+
+        # The risks and controls the MERGEs changed are appended to the change log under the target's next load version
+        if previous:
+            table = f"{target.catalog}.{target.schema}.{CHANGE_LOG.table}"
+            versions = []
+            if existing.get(CHANGE_LOG.table) != column_names(CHANGE_LOG):
+                run(create_table_statement(CHANGE_LOG, table, replace=bool(existing.get(CHANGE_LOG.table)), properties={"tags": TABLE_TAGS[CHANGE_LOG.table]}))
+            else:
+                versions = [int(version) for (version,) in run(f"SELECT max(version) FROM {table}") if version is not None]
+            events = change_events(previous, {entity_type: plan.rows[entity_type] for entity_type in previous}, next_version(versions), loaded_at, plan.revision[0])
+            if events:
+                run(merge_statement(CHANGE_LOG, values_source(CHANGE_LOG, events), table, f"target.version = {events[0].version}"))
+                written.append(CHANGE_LOG.table)
+
+        current = {} if force else {name: comment_fingerprint(comment) for name, comment in run(routines_query(target.catalog, target.schema))}
+        deployed = [name for name, (fingerprint, _) in plan.functions.items() if current.get(name) != fingerprint]
+        submit_statements(run, [plan.functions[name][1] for name in deployed], max_workers=4)
+        state, error = "succeeded", None
+    except Exception as e:
+        state, error = "failed", f"{type(e).__name__}: {e}"
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    return TargetStatus(
+        target.workspace, target.catalog, target.schema, state, written, deployed if state == "succeeded" else [],
+        counter.statements, counter.retries, elapsed_ms, error,
+    )
+
+
+def load_targets(path):
+    """Targets of a JSON file holding a list of objects with the :class:`Target` fields."""
+    with open(path, encoding="utf-8") as f:
+        return [Target(**target) for target in json.load(f)]
+
+
+def rollout(targets, resources_dir=RESOURCES_DIR, max_workers=4, force=False, retries=5, backoff=0.5, poll_interval=0.5):
+    """Deploy the DASF tables and functions to every target, ``max_workers`` targets at a time.
+
+    Returns a :class:`TargetStatus` per target, in the order of ``targets``. Raises
+    :class:`dasf.validate.ValidationError` before deploying any target when the TSVs fail validation.
+    """
+    plan = plan_rollout(resources_dir)
+    clients = {}
+    for target in targets:
+        key = (target.workspace, target.warehouse_id, target.token)
+        if key not in clients:
+            clients[key] = StatementClient(
+                target.workspace, target.warehouse_id, target.token, retries=retries, backoff=backoff, poll_interval=poll_interval
+            )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(
+            pool.map(lambda t: deploy_target(clients[(t.workspace, t.warehouse_id, t.token)], t, plan, force), targets)
+        )
+
+
+def report(statuses):
+    """JSON-serializable report of a rollout's target statuses."""
+    return {
+        "targets": [status._asdict() for status in statuses],
+        "succeeded": sum(status.state == "succeeded" for status in statuses),
+        "failed": sum(status.state == "failed" for status in statuses),
+    }
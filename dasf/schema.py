@@ -0,0 +1,370 @@
+"""Declarative column specs for the DASF compendium sheets.
+
+Each sheet is described once: source header, target column name, type and comment.
+The spec drives the single-pass TSV reader (no schema inference), the column renames,
+the table column comments and the RETURNS clauses of the UC functions, so the tables
+and the function signatures cannot drift apart.
+"""
+from collections import namedtuple
+
+from .deployment import DEPLOYMENT_MODELS_MASK_EXPRESSION
+from .ids import COMPONENT_NAME_EXPRESSION, COMPONENT_NUMBER_EXPRESSION, COMPONENT_SUB_NUMBER_EXPRESSION, RISK_ID_EXPRESSION
+
+# source: header in the TSV, or None for a column derived during ingestion
+# name: target column name, or None for a source column that is read but not kept
+# expression: Spark SQL expression computing a derived or normalized column
+# detail: whether the column is part of the rows returned by the detail UC functions
+Column = namedtuple("Column", ["source", "name", "type", "comment", "expression", "detail"], defaults=(None, True))
+# keys: columns identifying a row, used by the keyed MERGE of incremental ingestion
+# cluster_by: liquid clustering columns of the table
+Sheet = namedtuple("Sheet", ["table", "file", "columns", "description", "keys", "cluster_by"], defaults=((),))
+
+RISKS = Sheet(
+    table="risks_in_ai_system_components",
+    file="Databricks AI Security Framework - AI Lifecycle Risks.tsv",
+    columns=(
+        Column("Risk ID", "risk_id", "STRING", "Risk ID", RISK_ID_EXPRESSION),
+        Column("System Component", "system_component", "STRING", "System Component Category"),
+        Column("Risk", "risk", "STRING", "Risk ID and title"),
+        Column(None, "risk_name", "STRING", "Full Risk Title", "trim(split(`Risk`, ':')[1])"),
+        Column("Risk Description", "risk_description", "STRING", "Risk description"),
+        Column("Mitigation Controls IDs", "mitigation_control_ids", "STRING", "Comma separated mitigation control ids"),
+        Column("Mitigation Controls", "mitigation_controls", "STRING", "Mitigation control titles"),
+        Column("DASF  Revision", "revision", "STRING", "DASF revision the risk was introduced in"),
+        Column("Predictive ML Models", "is_predictive_ml_models", "STRING", "Applies to predictive ML models (Yes/No)"),
+        Column("RAG - LLMs", "is_rag_llms", "STRING", "Applies to RAG LLMs (Yes/No)"),
+        Column("Fine-tuned LLMs", "is_fine_tuned_llms", "STRING", "Applies to fine-tuned LLMs (Yes/No)"),
+        Column("Pre-trained LLMs", "is_pre_trained_llms", "STRING", "Applies to pre-trained LLMs (Yes/No)"),
+        Column("Foundational LLMs", "is_foundational_llms", "STRING", "Applies to foundational LLMs (Yes/No)"),
+        Column("External Models", "is_external_models", "STRING", "Applies to external models (Yes/No)"),
+        Column("Initial AI Risk Impacts", "initial_ai_risk_impacts", "STRING", "Initial AI risk impacts"),
+        Column("Business Impacts", "business_impacts", "STRING", "Business impacts"),
+        Column("AI Novelty", "ai_novelty", "STRING", "AI novelty (CyberSec or AI Sec)"),
+        Column("MITRE ATLAS as of Q3 2024", "mitre_atlas_as_of_q3_2024", "STRING", "MITRE ATLAS mapping"),
+        Column("MITRE ATTACK as of Q3 2024", "mitre_attack_as_of_q3_2024", "STRING", "MITRE ATT&CK mapping"),
+        Column("OWASP LLM Top 10 2025", "owasp_llm_top_10_2025", "STRING", "OWASP LLM Top 10 mapping"),
+        Column("OWASP ML Top 10 v0.3", "owasp_ml_top_10_v0_3", "STRING", "OWASP ML Top 10 mapping"),
+        Column("NIST - 800- 53 - Rev 5", "nist_800_53_rev_5", "STRING", "NIST 800-53 Rev 5 mapping"),
+        Column("NIST 800-53 Controls Mapping Rationale", "nist_800_53_controls_mapping_rationale", "STRING", "NIST 800-53 mapping rationale"),
+        Column("HITRUST", "hitrust", "STRING", "HITRUST mapping"),
+        Column("ENISA’s Securing ML Algorithms", "enisa_securing_ml_algorithms", "STRING", "ENISA Securing ML Algorithms mapping"),
+        Column("ISO 42001:2023 Controls Objectives and Controls (Annex A)", "iso_42001_2023_controls_objectives_and_controls_annex_a", "STRING", "ISO 42001:2023 Annex A mapping"),
+        Column("ISO 27001:2022 Information Security Control Reference (Annex A)", "iso_27001_2022_information_security_control_reference_annex_a", "STRING", "ISO 27001:2022 Annex A mapping"),
+        Column("EU AI Act", "eu_ai_act", "STRING", "EU AI Act mapping"),
+        # risk_id split into its parts, so component lookups are exact or prefix matches instead of regex scans
+        Column(None, "component_name", "STRING", "System component step of the risk id, e.g. Raw Data", COMPONENT_NAME_EXPRESSION, False),
+        Column(None, "component_number", "INT", "Component number of the risk id, e.g. 1 for Raw Data 1.10", COMPONENT_NUMBER_EXPRESSION, False),
+        Column(None, "component_sub_number", "INT", "Sub-number of the risk id, e.g. 10 for Raw Data 1.10", COMPONENT_SUB_NUMBER_EXPRESSION, False),
+        # The six Yes/No deployment model columns packed into one bitmask, see dasf.deployment
+        Column(None, "deployment_models_mask", "INT", "Bitmask of the deployment models the risk applies to: predictive ML models 1, RAG LLMs 2, fine-tuned LLMs 4, pre-trained LLMs 8, foundational LLMs 16, external models 32", DEPLOYMENT_MODELS_MASK_EXPRESSION, False),
+    ),
+    description="The 'risks_in_ai_system_components' table contains information about the risks associated with various AI system components as documented in Databricks AI Security Framework (DASF). It provides details on the identified risks, their descriptions, and the corresponding mitigation control measures. The table also includes information on the revision history of the  DSAF risks and whether the risks applies to predictive ML models, RAG LLMS, fine-tuned LLMS, pre-trained LLMS, foundational LLMS, or external models. Additionally, the table captures the initial AI risk impacts, business impacts, AI novelty, and the latest versions of MITRE Atlas, MITRE Attack, OWASP LLM Top 10, and OWASP ML Top 10. This table is crucial for understanding and managing the risks associated with our AI system components.",
+    keys=("risk_id",),
+    cluster_by=("component_name", "component_number", "component_sub_number"),
+)
+
+CONTROLS = Sheet(
+    table="databricks_ai_mitigation_controls",
+    file="Databricks AI Security Framework - Databricks AI Mitigation Controls.tsv",
+    columns=(
+        Column("Control ID", "mitigation_control_id", "STRING", "Mitigation control ID"),
+        Column("Control", "control", "STRING", "Full control title"),
+        Column("Risk ID", "risk_id", "STRING", "Comma separated ids of the risks the control mitigates"),
+        Column("Description", "description", "STRING", "Control description"),
+        Column("Databricks Shared Responsibility", "databricks_shared_responsibility", "STRING", "Databricks shared responsibility"),
+        Column("Databricks Product Reference", "databricks_product_reference", "STRING", "Databricks product reference"),
+        Column("Databricks Documentation (AWS)", "databricks_documentation_aws", "STRING", "Databricks documentation link (AWS)"),
+        Column("Databricks Documentation (Azure)", "databricks_documentation_azure", "STRING", "Databricks documentation link (Azure)"),
+        Column("Databricks Documentation (GCP)", "databricks_documentation_gcp", "STRING", "Databricks documentation link (GCP)"),
+        Column("DASF Revision", "dasf_revision", "STRING", "DASF revision the control was introduced in"),
+        Column("Security Control Type", "security_control_type", "STRING", "Security control type"),
+        Column("AI System Component Step", "ai_system_component_step", "STRING", "AI system component step"),
+        Column("Feature / Control", None, "STRING", "Feature or control"),
+        Column("Security Analysis Tool (SAT)", "security_analysis_tool_sat", "STRING", "Security Analysis Tool (SAT) check"),
+        Column("AI System Novelty", "ai_system_novelty", "STRING", "AI system novelty"),
+        Column("MITRE ATLAS as of Q3 2024", "mitre_atlas_q3_2024", "STRING", "MITRE ATLAS mapping"),
+        Column("MITRE ATTACK as of Q3 2024", "mitre_attack_q3_2024", "STRING", "MITRE ATT&CK mapping"),
+        Column("OWASP LLM Top 10 2025", "owasp_llm_top_10_2025", "STRING", "OWASP LLM Top 10 mapping"),
+        Column("OWASP ML Top 10 v0.3", "owasp_ml_top_10_v0_3", "STRING", "OWASP ML Top 10 mapping"),
+        Column("ISO 42001:2023 Controls Objectives and Controls (Annex A)", "iso_42001_2023_controls_objectives_controls_annex_a", "STRING", "ISO 42001:2023 Annex A mapping"),
+        Column("ISO 27001:2022 Information Security Control Reference (Annex A)", "iso_27001_2022_information_security_control_reference_annex_a", "STRING", "ISO 27001:2022 Annex A mapping"),
+        Column("NIST - 800- 53 - Rev 5", "nist_800_53_rev_5", "STRING", "NIST 800-53 Rev 5 mapping"),
+        Column("HITRUST", "hitrust", "STRING", "HITRUST mapping"),
+        Column("ENISA’s Securing ML Algorithms", "enisa_securing_ml_algorithms", "STRING", "ENISA Securing ML Algorithms mapping"),
+        Column("EU AI ACT", "eu_ai_act", "STRING", "EU AI Act mapping"),
+    ),
+    description="The databricks_ai_mitigation_controls table contains information about the mitigation controls used in the AI system as documented in Databricks AI Security Framework (DASF) white paper. It provides details on the mitigation control, risk mapping, and description of each mitigation control. Additionally, it includes references to Databricks shared responsibility, product documentation links for AWS, Azure, and GCP ,  as well as DASF revision information. The table also includes information on security control types, AI system components and steps, security analysis tools, AI system novelty, and various security standards such as MITRE Atlas, MITRE ATT&CK, OWASP LLM Top 10, OWASP ML Top 10, ISO 42001, and ISO 27001.",
+    keys=("mitigation_control_id",),
+)
+
+# Reconciled from both sheets during ingestion (see dasf.ids.build_edges), so it has no file of its own
+MAPPING = Sheet(
+    table="risks_and_controls_mapping",
+    file=None,
+    columns=(
+        Column(None, "risk_id", "STRING", "Risk ID"),
+        Column(None, "mitigation_control_id", "STRING", "Mitigation control ID"),
+    ),
+    description="The risks_and_controls_mapping table provides a mapping between risk IDs and mitigation control IDs as documented in Databricks AI Security Framework (DASF). This table is essential for tracking and managing risks with their corresponding controls.  It allows for the identification of which mitigation controls are associated with each risk, enabling effective risk management and mitigation strategies. The risk_id column represents the unique identifier for each risk, while the mitigation_control_id column represents the unique identifier for each mitigation control. This table serves as a valuable resource for understanding the relationship between risks and their corresponding mitigation controls.",
+    keys=("risk_id", "mitigation_control_id"),
+    cluster_by=("risk_id", "mitigation_control_id"),
+)
+
+
+# Precomputed from risks_in_ai_system_components.deployment_models_mask during ingestion, one row per deployment model
+DEPLOYMENT_MODEL_RISKS = Sheet(
+    table="dasf_deployment_model_risks",
+    file=None,
+    columns=(
+        Column(None, "deployment_model", "STRING", "Deployment model: predictive_ml_models, rag_llms, fine_tuned_llms, pre_trained_llms, foundational_llms or external_models"),
+        Column(None, "deployment_model_bit", "INT", "Bit of the deployment model in deployment_models_mask"),
+        Column(None, "risk_ids", "ARRAY<STRING>", "Ids of the risks applying to the deployment model"),
+        Column(None, "risk_count", "INT", "Number of risks applying to the deployment model"),
+    ),
+    description="The dasf_deployment_model_risks table lists, for each deployment model covered by the Databricks AI Security Framework (DASF) (predictive ML models, RAG LLMs, fine-tuned LLMs, pre-trained LLMs, foundational LLMs and external models), the ids and number of the risks that apply to it. The bit of each deployment model matches the deployment_models_mask column of the risks_in_ai_system_components table.",
+    keys=("deployment_model",),
+)
+
+# Exploded from the framework columns of both sheets during ingestion (see dasf.crosswalk), so it has no file of its own
+CROSSWALK = Sheet(
+    table="dasf_framework_crosswalk",
+    file=None,
+    columns=(
+        Column(None, "entity_type", "STRING", "Type of the DASF entity referencing the standard: risk or control"),
+        Column(None, "entity_id", "STRING", "Risk ID or mitigation control ID"),
+        Column(None, "framework", "STRING", "Standard, e.g. mitre_atlas, mitre_attack, owasp_llm, owasp_ml, nist_800_53, hitrust, enisa, iso_42001, iso_27001 or eu_ai_act"),
+        Column(None, "reference_id", "STRING", "Control, technique or article of the standard, e.g. AC-2, AML.T0020, LLM01, A.6.2.6 or Article 15.5"),
+    ),
+    description="The dasf_framework_crosswalk table maps the controls, techniques and articles of external standards (MITRE ATLAS, MITRE ATT&CK, OWASP LLM Top 10, OWASP ML Top 10, NIST 800-53, HITRUST, ENISA, ISO 42001, ISO 27001 and the EU AI Act) to the Databricks AI Security Framework (DASF) risks and mitigation controls referencing them, with one row per reference parsed from the framework columns of both sheets. It answers reverse lookups such as which DASF risks and controls map to NIST AC-2.",
+    keys=("entity_type", "entity_id", "framework", "reference_id"),
+    cluster_by=("framework", "reference_id"),
+)
+
+# Precomputed from the mapping's bitset graph during ingestion (see dasf.graph), so it has no file of its own
+RISK_COMITIGATION = Sheet(
+    table="dasf_risk_comitigation",
+    file=None,
+    columns=(
+        Column(None, "risk_id", "STRING", "Risk ID"),
+        Column(None, "related_risk_id", "STRING", "ID of a risk sharing at least one mitigation control with the risk"),
+        Column(None, "shared_control_ids", "ARRAY<STRING>", "Ids of the mitigation controls mapped to both risks"),
+        Column(None, "shared_control_count", "INT", "Number of mitigation controls mapped to both risks"),
+    ),
+    description="The dasf_risk_comitigation table lists, for each risk of the Databricks AI Security Framework (DASF), the other risks mitigated by at least one of the same controls, with the ids and number of the shared mitigation controls. It is precomputed from the risks_and_controls_mapping table and answers questions such as which other risks are addressed when the controls of a risk are implemented.",
+    keys=("risk_id", "related_risk_id"),
+    cluster_by=("risk_id",),
+)
+
+# Minimum control set covers solved during ingestion (see dasf.graph) for every deployment model combination and component
+CONTROL_COVER = Sheet(
+    table="dasf_control_cover",
+    file=None,
+    columns=(
+        Column(None, "deployment_models_mask", "INT", "Deployment models the covered risks apply to, as a deployment_models_mask bitmask; 0 for every risk"),
+        Column(None, "component_name", "STRING", "System component step of the covered risks, e.g. Raw Data; empty for every component"),
+        Column(None, "rank", "INT", "Position of the control in the set, by the number of risks it adds to the controls ranked before it"),
+        Column(None, "mitigation_control_id", "STRING", "Mitigation control ID"),
+        Column(None, "covered_risk_ids", "ARRAY<STRING>", "Ids of the risks the control covers that no higher ranked control covers"),
+        Column(None, "covered_risk_count", "INT", "Number of risks covered by the controls up to this rank"),
+        Column(None, "scope_risk_count", "INT", "Number of risks of the deployment models and component"),
+        Column(None, "optimal", "BOOLEAN", "Whether the control set is proven minimal rather than a greedy approximation"),
+    ),
+    description="The dasf_control_cover table holds, for every combination of deployment models and every system component of the Databricks AI Security Framework (DASF), the smallest set of mitigation controls that together mitigate all of its risks, ranked by the number of additional risks each control covers. It is precomputed from the risks_in_ai_system_components and risks_and_controls_mapping tables and answers questions such as which smallest set of controls covers all RAG risks.",
+    keys=("deployment_models_mask", "component_name", "rank"),
+    cluster_by=("deployment_models_mask", "component_name"),
+)
+
+# Trigram and token index of the risk and control ids and names, built during ingestion (see dasf.resolve)
+ENTITY_INDEX = Sheet(
+    table="dasf_entity_index",
+    file=None,
+    columns=(
+        Column(None, "kind", "STRING", "Kind of the term: trigram (three characters of the padded text) or token (a word)"),
+        Column(None, "term", "STRING", "Trigram or token of the normalized (lower-cased, punctuation free) id or name"),
+        Column(None, "entity_type", "STRING", "Type of the indexed DASF entity: risk or control"),
+        Column(None, "entity_id", "STRING", "Risk ID or mitigation control ID"),
+        Column(None, "field", "STRING", "Indexed field of the entity: id or name"),
+        Column(None, "entity_name", "STRING", "Risk name, or control title without its id"),
+        Column(None, "term_count", "INT", "Number of distinct terms of this kind in the field's normalized text"),
+    ),
+    description="The dasf_entity_index table indexes the normalized ids and names of the Databricks AI Security Framework (DASF) risks and mitigation controls by their character trigrams and tokens. It is built from the risks_in_ai_system_components and databricks_ai_mitigation_controls tables and lets dasf_resolve_entity match misspelled, differently cased or partial risk and control names and ids.",
+    keys=("kind", "term", "entity_type", "entity_id", "field"),
+    cluster_by=("kind", "term"),
+)
+
+TEXT_CHUNKS = Sheet(
+    table="dasf_text_chunks",
+    file=None,
+    columns=(
+        Column(None, "chunk_id", "INT", "Identifier of the chunk, referenced by dasf_text_postings"),
+        Column(None, "entity_type", "STRING", "Type of the DASF entity the text describes: risk or control"),
+        Column(None, "entity_id", "STRING", "Risk ID or mitigation control ID"),
+        Column(None, "field", "STRING", "Column the text comes from: risk_description, nist_800_53_controls_mapping_rationale or description"),
+        Column(None, "chunk_number", "INT", "Position of the chunk in the column's text, from 1"),
+        Column(None, "text", "STRING", "Whole sentences of the column's text, at most 60 words"),
+        Column(None, "token_count", "INT", "Number of indexed terms in the chunk, its length for BM25"),
+    ),
+    description="The dasf_text_chunks table splits the descriptions of the Databricks AI Security Framework (DASF) risks, their NIST 800-53 mapping rationales and the descriptions of the mitigation controls into chunks of whole sentences. Together with dasf_text_postings it is the retrieval index dasf_search_text ranks risks and controls with.",
+    keys=("chunk_id",),
+)
+
+TEXT_POSTINGS = Sheet(
+    table="dasf_text_postings",
+    file=None,
+    columns=(
+        Column(None, "term", "STRING", "Indexed term: a normalized word of the chunk that is not a stopword"),
+        Column(None, "chunk_id", "INT", "Chunk of dasf_text_chunks the term occurs in"),
+        Column(None, "term_frequency", "INT", "Number of occurrences of the term in the chunk"),
+        Column(None, "weight", "DOUBLE", "BM25 weight of the term in the chunk (k1 1.2, b 0.75); a query scores a chunk with the sum of its terms' weights"),
+    ),
+    description="The dasf_text_postings table is the BM25 inverted index of the dasf_text_chunks table: one row per term of each chunk with its precomputed BM25 weight. dasf_search_text sums the weights of a question's terms to rank risks and controls by the text of their descriptions.",
+    keys=("term", "chunk_id"),
+    cluster_by=("term",),
+)
+
+SUMMARY = Sheet(
+    table="dasf_summary",
+    file=None,
+    columns=(
+        Column(None, "dimension", "STRING", "What is counted: total, system_component, deployment_model, ai_novelty, security_control_type, databricks_shared_responsibility, ai_system_novelty, controls_per_risk or risks_per_control"),
+        Column(None, "entity_type", "STRING", "What the count counts: risk, control, or mapping for the total of mapped risk and control pairs"),
+        Column(None, "value", "STRING", "Value of the dimension, e.g. Data operations; the number of mapped controls or risks for the distributions; empty for the totals"),
+        Column(None, "position", "INT", "Position of the value within the dimension: most frequent first, deployment models in column order, distributions by number"),
+        Column(None, "entity_count", "INT", "Number of risks, controls or mapped pairs with the value"),
+        Column(None, "share", "DOUBLE", "entity_count as a fraction of all risks or controls, rounded to 4 digits; NULL for the mapping total"),
+    ),
+    description="The dasf_summary table holds precomputed counts of the Databricks AI Security Framework (DASF) risks and mitigation controls: the totals, the risks by system component, deployment model and AI novelty, the controls by security control type, shared responsibility and AI system novelty, and the distributions of mitigation controls per risk and risks per control. Counting questions are answered from its rows without aggregating the risks_in_ai_system_components and databricks_ai_mitigation_controls tables.",
+    keys=("dimension", "entity_type", "value"),
+)
+
+
+def _revision_columns(sheet):
+    return (
+        Column(None, "compendium_revision", "STRING", "Compendium revision the row belongs to: the latest DASF revision any risk or control of the compendium was introduced in"),
+        Column(None, "row_hash", "STRING", "SHA-256 of the row's values; rows whose hash differs from the previous revision's are compared field by field"),
+        *(Column(None, c.name, c.type, c.comment) for c in sheet.columns if c.name is not None),
+    )
+
+
+RISK_REVISIONS = Sheet(
+    table="risks_in_ai_system_components_history",
+    file=None,
+    columns=_revision_columns(RISKS),
+    description="The risks_in_ai_system_components_history table keeps the risks_in_ai_system_components rows of every ingested Databricks AI Security Framework (DASF) compendium revision side by side, keyed by compendium revision and risk id, each with a hash of its values.",
+    keys=("compendium_revision", "risk_id"),
+    cluster_by=("compendium_revision",),
+)
+
+CONTROL_REVISIONS = Sheet(
+    table="databricks_ai_mitigation_controls_history",
+    file=None,
+    columns=_revision_columns(CONTROLS),
+    description="The databricks_ai_mitigation_controls_history table keeps the databricks_ai_mitigation_controls rows of every ingested Databricks AI Security Framework (DASF) compendium revision side by side, keyed by compendium revision and mitigation control id, each with a hash of its values.",
+    keys=("compendium_revision", "mitigation_control_id"),
+    cluster_by=("compendium_revision",),
+)
+
+REVISIONS = Sheet(
+    table="dasf_revisions",
+    file=None,
+    columns=(
+        Column(None, "revision", "STRING", "Compendium revision, e.g. DASF v 2.0"),
+        Column(None, "revision_number", "INT", "Position of the revision among the ingested revisions, oldest first"),
+        Column(None, "previous_revision", "STRING", "Ingested revision before this one, NULL for the oldest"),
+        Column(None, "risk_count", "INT", "Number of risks in the revision"),
+        Column(None, "control_count", "INT", "Number of mitigation controls in the revision"),
+        Column(None, "content_hash", "STRING", "SHA-256 of the row hashes of the revision; equal hashes mean identical risks and controls"),
+    ),
+    description="The dasf_revisions table lists the ingested Databricks AI Security Framework (DASF) compendium revisions in order, with their risk and mitigation control counts. Their rows are kept in the risks_in_ai_system_components_history and databricks_ai_mitigation_controls_history tables.",
+    keys=("revision",),
+)
+
+REVISION_DIFFS = Sheet(
+    table="dasf_revision_diffs",
+    file=None,
+    columns=(
+        Column(None, "revision", "STRING", "Compendium revision the change landed in"),
+        Column(None, "previous_revision", "STRING", "Ingested revision the change is relative to"),
+        Column(None, "entity_type", "STRING", "Type of the changed DASF entity: risk or control"),
+        Column(None, "entity_id", "STRING", "Risk ID or mitigation control ID"),
+        Column(None, "change", "STRING", "Kind of change: added, removed or modified"),
+        Column(None, "field", "STRING", "Changed column of a modified risk or control; empty for an added or removed one"),
+        Column(None, "previous_value", "STRING", "Value of the column in the previous revision, as text (lists as JSON)"),
+        Column(None, "value", "STRING", "Value of the column in this revision, as text (lists as JSON)"),
+    ),
+    description="The dasf_revision_diffs table holds the precomputed row- and field-level changes between consecutive Databricks AI Security Framework (DASF) compendium revisions: the risks and mitigation controls added or removed, and for each modified one the columns whose values changed, with their previous and new values.",
+    keys=("revision", "entity_type", "entity_id", "field"),
+    cluster_by=("revision", "entity_id"),
+)
+
+CHANGE_LOG = Sheet(
+    table="dasf_change_log",
+    file=None,
+    columns=(
+        Column(None, "version", "INT", "Load version the change was recorded in; every load that changes a risk or control takes the next version"),
+        Column(None, "event_number", "INT", "Position of the change within its version"),
+        Column(None, "loaded_at", "STRING", "UTC start time of the load, ISO 8601"),
+        Column(None, "compendium_revision", "STRING", "Compendium revision of the load, e.g. DASF v 2.0"),
+        Column(None, "entity_type", "STRING", "Type of the changed DASF entity: risk or control"),
+        Column(None, "entity_id", "STRING", "Risk ID or mitigation control ID, the key of the changed row"),
+        Column(None, "operation", "STRING", "Kind of change: insert, update or delete"),
+        Column(None, "changed_fields", "ARRAY<STRING>", "Columns whose values changed, for an update; empty for an insert or a delete"),
+        Column(None, "row_hash", "STRING", "SHA-256 of the row's values after the change; NULL for a delete"),
+        Column(None, "row_values", "STRING", "Row after the change as a JSON object of its columns; NULL for a delete"),
+    ),
+    description="The dasf_change_log table records, load after load, the rows of the risks_in_ai_system_components and databricks_ai_mitigation_controls tables that each load inserted, updated or deleted, keyed by risk id or mitigation control id, with the columns an update changed and the row's new values. Each load that changes a row appends its events under the next version, so a consumer syncs by reading the versions after the last one it applied.",
+    keys=("version", "event_number"),
+    cluster_by=("version",),
+)
+
+
+def source_columns(sheet):
+    """Columns present in the TSV, in file order."""
+    return [c for c in sheet.columns if c.source is not None]
+
+
+def target_columns(sheet):
+    """Columns kept in the table, in table order."""
+    return [c for c in sheet.columns if c.name is not None]
+
+
+def column_names(sheet):
+    return [c.name for c in target_columns(sheet)]
+
+
+def detail_column_names(sheet):
+    """Columns returned by the detail UC functions, in table order."""
+    return [c.name for c in target_columns(sheet) if c.detail]
+
+
+def reader_schema(sheet):
+    """DDL schema string for reading the sheet's TSV in a single pass."""
+    return ", ".join(f"`{c.source}` {c.type}" for c in source_columns(sheet))
+
+
+def select_columns(sheet):
+    """Spark columns renaming (or deriving) every kept column, carrying its comment."""
+    from pyspark.sql.functions import expr
+
+    return [
+        expr(c.expression if c.expression is not None else f"`{c.source}`").alias(c.name, metadata={"comment": c.comment})
+        for c in target_columns(sheet)
+    ]
+
+
+def returns_clause(sheet, names=None):
+    """Column list for a ``RETURNS TABLE (...)`` clause over ``names`` (the detail columns by default)."""
+    columns = {c.name: c for c in target_columns(sheet)}
+    selected = [columns[name] for name in (names if names is not None else detail_column_names(sheet))]
+    return ",\n  ".join(f"{c.name} {c.type} COMMENT '{quote(c.comment)}'" for c in selected)
+
+
+def quote(text):
+    """Escape ``text`` for use inside a single quoted SQL string literal."""
+    return text.replace("'", "\\'")
+
+
+def projection(sheet, names=None, alias=None):
+    """Comma separated column list for a function body (the detail columns by default), optionally qualified by a table alias."""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + name for name in (names if names is not None else detail_column_names(sheet)))
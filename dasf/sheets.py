@@ -0,0 +1,102 @@
+"""Pure-Python readers for the DASF compendium worksheets shipped in ``resources/``.
+
+The transformations below mirror the ingestion steps in ``notebooks/setup.py`` and are
+driven by the same column specs in :mod:`dasf.schema`, so the rows produced here match
+the rows written to Unity Catalog by the notebook.
+"""
+import csv
+import os
+from collections import namedtuple
+
+from .deployment import deployment_models_mask
+from .ids import build_edges, normalize_risk_id, parse_risk_id
+from .schema import CONTROLS, RISKS, column_names, detail_column_names, source_columns, target_columns
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+RISKS_FILE = RISKS.file
+CONTROLS_FILE = CONTROLS.file
+
+# Table rows, and the rows returned by the detail UC functions
+Risk = namedtuple("Risk", column_names(RISKS))
+Control = namedtuple("Control", column_names(CONTROLS))
+RiskDetail = namedtuple("RiskDetail", detail_column_names(RISKS))
+ControlDetail = namedtuple("ControlDetail", detail_column_names(CONTROLS))
+
+
+def read_tsv(path):
+    """Read a tab separated sheet into a header list and a list of row lists.
+
+    Empty cells are returned as None, matching the Spark CSV reader's null handling.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader)
+        rows = [[value if value != "" else None for value in row] for row in reader]
+    return header, rows
+
+
+def read_sheet(sheet, resources_dir=RESOURCES_DIR):
+    """Read a sheet in a single pass, checking its header against the declared source columns."""
+    header, rows = read_tsv(os.path.join(resources_dir, sheet.file))
+    expected = [c.source for c in source_columns(sheet)]
+    if [h.lower() for h in header] != [s.lower() for s in expected]:
+        raise ValueError(f"{sheet.file} header does not match the declared schema: expected {expected}, found {header}")
+    return rows
+
+
+def _risk_name(values):
+    # Extract the risk name from the 'Risk' column by splitting the string at ':' and trimming spaces
+    risk = values["Risk"]
+    if risk is None:
+        return None
+    parts = risk.split(":")
+    return parts[1].strip(" ") if len(parts) > 1 else None
+
+
+def _risk_id_part(index):
+    def part(values):
+        parts = parse_risk_id(values["Risk ID"])
+        return parts[index] if parts is not None else None
+
+    return part
+
+
+# Python equivalents of the Spark expressions of derived and normalized columns, keyed by target column name
+DERIVED = {
+    "risk_id": lambda values: normalize_risk_id(values["Risk ID"]),
+    "risk_name": _risk_name,
+    "component_name": _risk_id_part(0),
+    "component_number": _risk_id_part(1),
+    "component_sub_number": _risk_id_part(2),
+    "deployment_models_mask": deployment_models_mask,
+}
+
+
+def _project(sheet, rows):
+    sources = [c.source for c in source_columns(sheet)]
+    columns = target_columns(sheet)
+    projected = []
+    for row in rows:
+        values = dict(zip(sources, row))
+        projected.append([DERIVED[c.name](values) if c.expression is not None else values[c.source] for c in columns])
+    return projected
+
+
+def load_risks(resources_dir=RESOURCES_DIR):
+    """Return the AI Lifecycle Risks sheet as ``risks_in_ai_system_components`` rows."""
+    return [Risk(*values) for values in _project(RISKS, read_sheet(RISKS, resources_dir))]
+
+
+def load_controls(resources_dir=RESOURCES_DIR):
+    """Return the Mitigation Controls sheet as ``databricks_ai_mitigation_controls`` rows."""
+    return [Control(*values) for values in _project(CONTROLS, read_sheet(CONTROLS, resources_dir))]
+
+
+def detail(row, detail_type):
+    """Project a table row onto the columns of ``detail_type``."""
+    return detail_type._make(getattr(row, name) for name in detail_type._fields)
+
+
+def build_mapping(risks, controls):
+    """Return ``risks_and_controls_mapping`` rows reconciled from both sheets."""
+    return build_edges(risks, controls)
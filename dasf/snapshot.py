@@ -0,0 +1,321 @@
+"""Compact, memory-mapped snapshot of the risks, controls and mapping tables.
+
+The compendium repeats the same strings across dozens of rows: documentation links, the
+"DASF n: ..." mitigation titles, framework references and Yes/No flags. The snapshot
+stores every distinct string once, in a pool shared by the three tables, and every row as
+a fixed-width record of int32 codes, so row ``i`` of a table sits at a computed offset.
+The local ingest backend writes it as ``dasf_snapshot.bin``; :meth:`Snapshot.open`
+memory-maps it without parsing any row. Fields are decoded from the pool when they are
+read, so a process holds the pages it touched rather than a copy of every string, and
+the processes sharing a host share those pages.
+
+Layout, in native byte order, every section aligned to 8 bytes::
+
+    MAGIC
+    pool offsets  uint32 * (strings + 1)   string k is data[offsets[k]:offsets[k + 1]]
+    pool data     UTF-8 bytes of the strings, sorted by their bytes
+    records       int32 * rows * columns, per table
+    footer        JSON: format, byteorder, pool and table sections
+    footer size   uint64
+    MAGIC
+
+A STRING field is the code of its string in the pool and an INT field its value, with
+NULL_CODE for NULL. Because the pool is shared, equal strings have equal codes in every
+table: the mapping joins the risks and controls on codes without decoding them.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from .schema import CONTROLS, MAPPING, RISKS
+
+SNAPSHOT_FILE = "dasf_snapshot.bin"
+FORMAT_VERSION = 1
+MAGIC = b"DASFSNAP"
+# Tables stored in the snapshot
+SNAPSHOT_TABLES = (RISKS, CONTROLS, MAPPING)
+# Code of a NULL field, for both STRING and INT columns
+NULL_CODE = -(2**31)
+_ALIGNMENT = 8
+_FOOTER_SIZE = struct.Struct("<Q")
+
+
+def _pad(f):
+    # Pad the file to the next aligned offset and return it
+    position = f.tell()
+    padding = -position % _ALIGNMENT
+    f.write(b"\0" * padding)
+    return position + padding
+
+
+def write_snapshot(path, tables):
+    """Write ``tables``, rows by table name of every sheet in SNAPSHOT_TABLES, to ``path`` and return it."""
+    for sheet in SNAPSHOT_TABLES:
+        for column in sheet.columns:
+            if column.name is not None and column.type not in ("STRING", "INT"):
+                raise ValueError(f"Cannot store {sheet.table}.{column.name} of type {column.type} in a snapshot")
+    strings = sorted(
+        {
+            getattr(row, column.name).encode("utf-8")
+            for sheet in SNAPSHOT_TABLES
+            for row in tables[sheet.table]
+            for column in sheet.columns
+            if column.name is not None and column.type == "STRING" and getattr(row, column.name) is not None
+        }
+    )
+    codes = {string.decode("utf-8"): code for code, string in enumerate(strings)}
+    offsets = array("I", [0])
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    footer = {"format": FORMAT_VERSION, "byteorder": sys.byteorder, "tables": {}}
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        footer["pool"] = {"strings": len(strings), "offsets": _pad(f)}
+        offsets.tofile(f)
+        footer["pool"]["data"] = f.tell()
+        f.write(b"".join(strings))
+        for sheet in SNAPSHOT_TABLES:
+            columns = [column for column in sheet.columns if column.name is not None]
+            records = array("i")
+            for row in tables[sheet.table]:
+                for column in columns:
+                    value = getattr(row, column.name)
+                    if value is None:
+                        records.append(NULL_CODE)
+                    elif column.type == "STRING":
+                        records.append(codes[value])
+                    elif NULL_CODE < value < 2**31:
+                        records.append(value)
+                    else:
+                        raise ValueError(f"{sheet.table}.{column.name} value {value} does not fit an INT")
+            footer["tables"][sheet.table] = {
+                "columns": [[column.name, column.type] for column in columns],
+                "rows": len(tables[sheet.table]),
+                "records": _pad(f),
+            }
+            records.tofile(f)
+        encoded = json.dumps(footer, sort_keys=True).encode("utf-8")
+        f.write(encoded)
+        f.write(_FOOTER_SIZE.pack(len(encoded)))
+        f.write(MAGIC)
+    return path
+
+
+class StringPool:
+    """Strings of a snapshot, decoded on access by their code."""
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, code):
+        if code == NULL_CODE:
+            return None
+        return str(self._data[self._offsets[code] : self._offsets[code + 1]], "utf-8")
+
+    def _bytes(self, code):
+        return bytes(self._data[self._offsets[code] : self._offsets[code + 1]])
+
+    def code(self, value):
+        """Code of string ``value``, NULL_CODE for None, or None if the pool does not hold it."""
+        if value is None:
+            return NULL_CODE
+        encoded = value.encode("utf-8")
+        # Bisect the sorted pool, comparing bytes without decoding them
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._bytes(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self._bytes(low) == encoded else None
+
+
+class SnapshotRecord:
+    """Row of a snapshot table whose fields are decoded when read, by attribute or position."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    @property
+    def _fields(self):
+        return self._table.columns
+
+    def __getattr__(self, name):
+        try:
+            position = self._table._positions[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return self._table.value(self._index, position)
+
+    def __getitem__(self, position):
+        return self._table.value(self._index, position)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __iter__(self):
+        return (self._table.value(self._index, position) for position in range(len(self._table.columns)))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._table.name}[{self._index}])"
+
+    def _asdict(self):
+        return dict(zip(self._table.columns, self))
+
+
+class SnapshotTable:
+    """Fixed-width int32 records of a snapshot table, a sequence of :class:`SnapshotRecord`."""
+
+    def __init__(self, name, columns, types, records, pool):
+        self.name = name
+        self.columns = tuple(columns)
+        self._positions = {column: position for position, column in enumerate(self.columns)}
+        self._strings = tuple(type == "STRING" for type in types)
+        self._records = records
+        self._pool = pool
+        self.row_type = namedtuple("Row", self.columns)
+
+    def __len__(self):
+        return len(self._records) // len(self.columns)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{self.name} has no row {index}")
+        return SnapshotRecord(self, index)
+
+    def __iter__(self):
+        return (SnapshotRecord(self, index) for index in range(len(self)))
+
+    def value(self, index, position):
+        """Decoded field ``position`` of row ``index``."""
+        code = self._records[index * len(self.columns) + position]
+        if self._strings[position]:
+            return self._pool[code]
+        return None if code == NULL_CODE else code
+
+    def row(self, index):
+        """Row ``index`` fully decoded, as a namedtuple."""
+        return self.row_type(*self[index])
+
+    def codes(self, column):
+        """Codes of ``column`` in row order, without decoding them."""
+        return self._records[self._positions[column] :: len(self.columns)]
+
+    def find(self, column, value):
+        """Records whose ``column`` equals ``value``, compared by code."""
+        position = self._positions[column]
+        code = self._pool.code(value) if self._strings[position] else (NULL_CODE if value is None else value)
+        if code is None:
+            return []
+        return self.find_codes(column, {code})
+
+    def find_codes(self, column, codes):
+        """Records whose ``column`` code is in ``codes``, in row order."""
+        return [SnapshotRecord(self, index) for index, code in enumerate(self.codes(column)) if code in codes]
+
+
+class Snapshot:
+    """Snapshot file memory-mapped by :meth:`open`; its tables are read by attribute or :meth:`table`."""
+
+    def __init__(self, mapped, footer):
+        self._mmap = mapped
+        self._buffer = memoryview(mapped)
+        pool = footer["pool"]
+        self.pool = StringPool(
+            self._buffer[pool["offsets"] : pool["offsets"] + 4 * (pool["strings"] + 1)].cast("I"),
+            self._buffer[pool["data"] :],
+        )
+        self.tables = {}
+        for name, table in footer["tables"].items():
+            start = table["records"]
+            end = start + 4 * table["rows"] * len(table["columns"])
+            names, types = zip(*table["columns"]) if table["columns"] else ((), ())
+            self.tables[name] = SnapshotTable(name, names, types, self._buffer[start:end].cast("i"), self.pool)
+        self.risks = self.tables[RISKS.table]
+        self.controls = self.tables[CONTROLS.table]
+        self.mapping = self.tables[MAPPING.table]
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map the snapshot at ``path`` written by :func:`write_snapshot`."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < 2 * len(MAGIC) + _FOOTER_SIZE.size:
+                raise ValueError(f"{path} is not a DASF snapshot")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        trailer = len(MAGIC) + _FOOTER_SIZE.size
+        (footer_size,) = _FOOTER_SIZE.unpack(mapped[size - trailer : size - len(MAGIC)])
+        if mapped[: len(MAGIC)] != MAGIC or mapped[size - len(MAGIC) :] != MAGIC or footer_size > size - trailer:
+            mapped.close()
+            raise ValueError(f"{path} is not a DASF snapshot")
+        footer = json.loads(mapped[size - trailer - footer_size : size - trailer])
+        if footer["format"] != FORMAT_VERSION or footer["byteorder"] != sys.byteorder:
+            mapped.close()
+            raise ValueError(f"{path} holds a snapshot of format {footer['format']} ({footer['byteorder']} endian), expected {FORMAT_VERSION} ({sys.byteorder} endian)")
+        return cls(mapped, footer)
+
+    def table(self, sheet):
+        """Records of ``sheet``."""
+        return self.tables[sheet.table]
+
+    def risk(self, risk_id):
+        """Record of risk ``risk_id``, or None."""
+        return next(iter(self.risks.find("risk_id", risk_id)), None)
+
+    def control(self, mitigation_control_id):
+        """Record of control ``mitigation_control_id``, or None."""
+        return next(iter(self.controls.find("mitigation_control_id", mitigation_control_id)), None)
+
+    def controls_for_risk(self, risk_id):
+        """Records of the controls mapped to ``risk_id``, in control row order."""
+        return self.controls.find_codes("mitigation_control_id", self._mapped_codes("risk_id", risk_id, "mitigation_control_id"))
+
+    def risks_for_control(self, mitigation_control_id):
+        """Records of the risks mapped to ``mitigation_control_id``, in risk row order."""
+        return self.risks.find_codes("risk_id", self._mapped_codes("mitigation_control_id", mitigation_control_id, "risk_id"))
+
+    def _mapped_codes(self, column, value, other):
+        # Codes of the other column of the mapping rows whose column equals value
+        code = self.pool.code(value)
+        return {
+            other_code
+            for this_code, other_code in zip(self.mapping.codes(column), self.mapping.codes(other))
+            if code is not None and this_code == code
+        }
+
+    def close(self):
+        """Release the mapping; records read from the snapshot cannot be decoded after."""
+        for table in self.tables.values():
+            table._records.release()
+        self.pool._offsets.release()
+        self.pool._data.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
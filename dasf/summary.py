@@ -0,0 +1,112 @@
+"""Precomputed counts answering the counting questions.
+
+"How many risks are there?", "how many risks per component?" or "how many controls are
+out of the box?" would otherwise each be a fresh GROUP BY over the sheets. Ingestion
+materializes every such count into ``dasf_summary``, one row per dimension, entity type
+and value, and ``dasf_summary`` reads them back. The counts cover:
+
+- the totals of risks, controls and mapped pairs;
+- risks by system component, deployment model and AI novelty;
+- controls by security control type, shared responsibility and AI system novelty;
+- the distributions of controls per risk and of risks per control.
+
+Category values differing only in case or spacing ('Novel AI Control/Capability' and
+'Novel AI control/capability') are counted together under their most frequent spelling.
+"""
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from .crosswalk import CONTROL, RISK
+from .deployment import DEPLOYMENT_MODELS
+
+# Rows of dasf_summary; share is entity_count over the number of risks or controls
+SummaryRow = namedtuple("SummaryRow", ["dimension", "entity_type", "value", "position", "entity_count", "share"])
+
+TOTAL = "total"
+MAPPING = "mapping"
+DEPLOYMENT_MODEL = "deployment_model"
+CONTROLS_PER_RISK = "controls_per_risk"
+RISKS_PER_CONTROL = "risks_per_control"
+# Categorical columns counted by value: (dimension, entity type, column)
+CATEGORIES = (
+    ("system_component", RISK, "system_component"),
+    ("ai_novelty", RISK, "ai_novelty"),
+    ("security_control_type", CONTROL, "security_control_type"),
+    ("databricks_shared_responsibility", CONTROL, "databricks_shared_responsibility"),
+    ("ai_system_novelty", CONTROL, "ai_system_novelty"),
+)
+SHARE_DIGITS = 4
+_SPACES = re.compile(" +")
+# Order of the rows read back: the totals first, then by dimension and position. Every dimension
+# but the totals counts one entity type, and the totals' positions order them risk, control, mapping
+SUMMARY_ORDER = "dimension <> 'total', dimension, position, entity_type"
+
+
+def summary_order_key(row):
+    return row.dimension != TOTAL, row.dimension, row.position, row.entity_type
+
+
+def dimension_key(text):
+    """Dimension named by ``text``, 'deployment_model' for ' Deployment model'."""
+    return _SPACES.sub("_", (text or "").lower().strip(" "))
+
+
+def dimension_key_sql(param):
+    """Spark SQL expression of :func:`dimension_key` over a parameter."""
+    return f"regexp_replace(trim(lower(coalesce({param}, ''))), ' +', '_')"
+
+
+def _share(count, total):
+    return round(count / total, SHARE_DIGITS) if total else None
+
+
+def _category_counts(values):
+    # Count case and spacing variants together, labelled with their most frequent spelling
+    groups = defaultdict(Counter)
+    for value in values:
+        label = " ".join((value or "").split())
+        groups[label.lower()][label] += 1
+    counts = []
+    for spellings in groups.values():
+        label = min(spellings, key=lambda spelling: (-spellings[spelling], spelling))
+        counts.append((label, sum(spellings.values())))
+    return sorted(counts, key=lambda item: (-item[1], item[0]))
+
+
+def summary_rows(risks, controls, mapping):
+    """Rows of dasf_summary for ``risks``, ``controls`` (table rows of both sheets) and their ``mapping`` edges."""
+    risks = [r for r in risks if r.risk_id is not None]
+    controls = [c for c in controls if c.mitigation_control_id is not None]
+    totals = {RISK: len(risks), CONTROL: len(controls)}
+    rows = [
+        SummaryRow(TOTAL, RISK, "", 1, len(risks), _share(len(risks), len(risks))),
+        SummaryRow(TOTAL, CONTROL, "", 2, len(controls), _share(len(controls), len(controls))),
+        SummaryRow(TOTAL, MAPPING, "", 3, len(mapping), None),
+    ]
+    entities = {RISK: risks, CONTROL: controls}
+    for dimension, entity_type, column in CATEGORIES:
+        counts = _category_counts(getattr(row, column) for row in entities[entity_type])
+        rows.extend(
+            SummaryRow(dimension, entity_type, value, position, count, _share(count, totals[entity_type]))
+            for position, (value, count) in enumerate(counts, 1)
+        )
+    for position, model in enumerate(DEPLOYMENT_MODELS, 1):
+        count = sum(1 for r in risks if (r.deployment_models_mask or 0) & model.bit)
+        rows.append(SummaryRow(DEPLOYMENT_MODEL, RISK, model.source, position, count, _share(count, len(risks))))
+
+    # Distributions of the mapping's degrees, counting the risks and controls without any mapped pair as 0
+    controls_per_risk = Counter({r.risk_id: 0 for r in risks})
+    risks_per_control = Counter({c.mitigation_control_id: 0 for c in controls})
+    for edge in mapping:
+        controls_per_risk[edge.risk_id] += 1
+        risks_per_control[edge.mitigation_control_id] += 1
+    for dimension, entity_type, degrees in (
+        (CONTROLS_PER_RISK, RISK, controls_per_risk),
+        (RISKS_PER_CONTROL, CONTROL, risks_per_control),
+    ):
+        distribution = sorted(Counter(degrees.values()).items())
+        rows.extend(
+            SummaryRow(dimension, entity_type, str(degree), position, count, _share(count, totals[entity_type]))
+            for position, (degree, count) in enumerate(distribution, 1)
+        )
+    return sorted(rows, key=summary_order_key)
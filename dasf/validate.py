@@ -0,0 +1,256 @@
+"""Validation of the compendium TSVs before anything is copied, written or created.
+
+Problems in the sheets otherwise surface after the slow work: a renamed header fails the
+Spark read after the volume copy, a duplicate risk id makes the MERGE fail after other
+tables were written, and a control id missing from the controls sheet silently drops an
+edge from the mapping. :func:`validate_resources` reads each sheet once, transposes it
+into columns and checks whole columns at a time:
+
+- header: the header matches the declared source columns (case-insensitive, in order),
+  and every row has as many cells as the header;
+- uniqueness: every risk and control has a well-formed id, and no id repeats;
+- references: every id in the risks' "Mitigation Controls IDs" names a control, and every
+  id in the controls' "Risk ID" names a risk;
+- agreement: a risk lists a control exactly when the control lists the risk;
+- Yes/No: the deployment model columns hold Yes or No.
+
+Dangling references and disagreements between the sheets are warnings: the mapping is
+the union of both sheets' references without the dangling ones, so they cost an edge at
+worst, and the shipped compendium has some. ``strict`` makes them errors. Any error
+fails the gate with a :class:`ValidationError` carrying the report.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter, namedtuple
+
+from .deployment import DEPLOYMENT_MODELS
+from .ids import canonical_control_id, canonical_risk_id, normalize_risk_id, parse_risk_id, risk_id_key, split_ids
+from .schema import CONTROLS, RISKS, source_columns
+from .sheets import RESOURCES_DIR
+
+ERROR = "error"
+WARNING = "warning"
+
+# One problem found: the check, the file, the source column and the 1-based line of the
+# cell (None for the header or a whole sheet), and the offending value
+Finding = namedtuple("Finding", ["severity", "check", "file", "column", "line", "value", "message"])
+
+# Findings of the checks demoted to warnings unless the validation is strict
+LENIENT_CHECKS = ("dangling_reference", "sheet_disagreement")
+YES_NO = ("yes", "no")
+
+
+class ValidationError(ValueError):
+    """The compendium failed validation; ``report`` is the :class:`ValidationReport`."""
+
+    def __init__(self, report):
+        errors = report.errors
+        lines = [f"{f.file}:{f.line or 1}: {f.message}" for f in errors[:10]]
+        if len(errors) > 10:
+            lines.append(f"... and {len(errors) - 10} more")
+        super().__init__(f"{len(errors)} validation errors in {report.resources_dir}:\n" + "\n".join(lines))
+        self.report = report
+
+
+class ValidationReport:
+    """Findings of a validation, with the rows checked per file and the time taken."""
+
+    def __init__(self, resources_dir, findings, rows, elapsed_ms):
+        self.resources_dir = resources_dir
+        self.findings = findings
+        self.rows = rows
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def errors(self):
+        return [f for f in self.findings if f.severity == ERROR]
+
+    @property
+    def warnings(self):
+        return [f for f in self.findings if f.severity == WARNING]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def row_count(self):
+        return sum(self.rows.values())
+
+    def summary(self):
+        return f"{len(self.errors)} errors, {len(self.warnings)} warnings in {self.row_count} rows ({self.elapsed_ms:.1f} ms)"
+
+    def as_dict(self):
+        return {
+            "ok": self.ok,
+            "resources_dir": self.resources_dir,
+            "rows": self.rows,
+            "errors": len(self.errors),
+            "warnings": len(self.warnings),
+            "elapsed_ms": self.elapsed_ms,
+            "findings": [f._asdict() for f in self.findings],
+        }
+
+    def write_json(self, path):
+        """Write the report to ``path`` as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    def raise_for_errors(self):
+        """Raise :class:`ValidationError` if any finding is an error."""
+        if not self.ok:
+            raise ValidationError(self)
+
+
+def _read_columns(path):
+    # Header, the columns of the rows as tuples and the line of every row; ragged rows are padded or cut to the header
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader, [])
+        rows, lines, widths = [], [], []
+        for row in reader:
+            lines.append(reader.line_num)
+            widths.append(len(row))
+            rows.append([value if value != "" else None for value in row[: len(header)]] + [None] * (len(header) - len(row)))
+    columns = list(zip(*rows)) if rows else [() for _ in header]
+    return header, columns, lines, widths
+
+
+def _check_header(sheet, header, lines, widths):
+    expected = [c.source for c in source_columns(sheet)]
+    findings = []
+    if [h.lower() for h in header] != [s.lower() for s in expected]:
+        lowered = {h.lower() for h in header}
+        missing = [s for s in expected if s.lower() not in lowered]
+        unexpected = [h for h in header if h.lower() not in {s.lower() for s in expected}]
+        for source in missing:
+            findings.append(Finding(ERROR, "header", sheet.file, source, 1, None, f"missing column {source!r}"))
+        for name in unexpected:
+            findings.append(Finding(ERROR, "header", sheet.file, name, 1, name, f"unexpected column {name!r}"))
+        if not missing and not unexpected:
+            findings.append(Finding(ERROR, "header", sheet.file, None, 1, "\t".join(header), f"columns out of order, expected {expected}"))
+    findings.extend(
+        Finding(ERROR, "row_width", sheet.file, None, line, str(width), f"row has {width} cells, the header has {len(header)}")
+        for line, width in zip(lines, widths)
+        if width != len(header)
+    )
+    return findings
+
+
+def _risk_id(value):
+    return normalize_risk_id(value) if parse_risk_id(value) is not None else None
+
+
+def _check_ids(sheet, column, ids, canonical, lines, kind):
+    # Missing, malformed and duplicate ids of a key column; returns the findings and the canonical id of every row
+    canonical_ids = [canonical(value) if value is not None else None for value in ids]
+    findings = [
+        Finding(ERROR, "missing_key", sheet.file, column, line, None, f"{kind} without an id")
+        for line, value in zip(lines, ids)
+        if value is None
+    ]
+    findings.extend(
+        Finding(ERROR, "malformed_id", sheet.file, column, line, value, f"{value!r} is not a {kind} id")
+        for line, value, canonical_id in zip(lines, ids, canonical_ids)
+        if value is not None and canonical_id is None
+    )
+    counts = Counter(key for key in canonical_ids if key is not None)
+    findings.extend(
+        Finding(ERROR, "duplicate_key", sheet.file, column, line, value, f"{kind} id {value!r} appears {counts[key]} times")
+        for line, value, key in zip(lines, ids, canonical_ids)
+        if key is not None and counts[key] > 1
+    )
+    return findings, canonical_ids
+
+
+def _check_references(sheet, column, cells, lines, resolve, known, kind, target):
+    # Malformed and dangling references of an id list column; returns the findings and the resolved references by line.
+    # Without the ids of the target sheet (known is None), only the malformed references are found
+    findings, references = [], []
+    for line, cell in zip(lines, cells):
+        resolved = []
+        for reference in split_ids(cell):
+            canonical = resolve(reference)
+            if canonical is None:
+                findings.append(Finding(ERROR, "malformed_reference", sheet.file, column, line, reference, f"{reference.strip()!r} is not a {kind} id"))
+            elif known is not None and canonical not in known:
+                findings.append(Finding(ERROR, "dangling_reference", sheet.file, column, line, reference, f"{kind} {canonical!r} is not in {target.file}"))
+            else:
+                resolved.append(canonical)
+        references.append(resolved)
+    return findings, references
+
+
+def validate_resources(resources_dir=RESOURCES_DIR, strict=False):
+    """Validate the risks and controls sheets in ``resources_dir`` and return the :class:`ValidationReport`.
+
+    ``strict`` keeps the LENIENT_CHECKS findings as errors instead of warnings.
+    """
+    start = time.perf_counter()
+    findings, rows, sheets = [], {}, {}
+    for sheet in (RISKS, CONTROLS):
+        path = os.path.join(resources_dir, sheet.file)
+        if not os.path.exists(path):
+            findings.append(Finding(ERROR, "header", sheet.file, None, None, None, f"{path} does not exist"))
+            continue
+        header, columns, lines, widths = _read_columns(path)
+        rows[sheet.file] = len(lines)
+        header_findings = _check_header(sheet, header, lines, widths)
+        findings.extend(header_findings)
+        if not any(f.check == "header" for f in header_findings):
+            sheets[sheet.table] = ({source.lower(): values for source, values in zip(header, columns)}, lines)
+
+    risk_ids = control_ids = None
+    if RISKS.table in sheets:
+        columns, lines = sheets[RISKS.table]
+        # A risk id needs a component and numbers, e.g. Raw Data 1.1; ids are compared as the table stores them
+        id_findings, risk_ids = _check_ids(RISKS, "Risk ID", columns["risk id"], _risk_id, lines, "risk")
+        findings.extend(id_findings)
+        for model in DEPLOYMENT_MODELS:
+            findings.extend(
+                Finding(ERROR, "yes_no", RISKS.file, model.source, line, value, f"{model.source} is {value!r}, expected Yes or No")
+                for line, value in zip(lines, columns[model.source.lower()])
+                if (value or "").strip().lower() not in YES_NO
+            )
+    if CONTROLS.table in sheets:
+        columns, lines = sheets[CONTROLS.table]
+        id_findings, control_ids = _check_ids(CONTROLS, "Control ID", columns["control id"], canonical_control_id, lines, "control")
+        findings.extend(id_findings)
+
+    # References in both directions, resolved like the mapping resolves them (see dasf.ids.build_edges)
+    known_risks = {risk_id_key(r): r for r in risk_ids if r is not None} if risk_ids is not None else None
+    if RISKS.table in sheets:
+        columns, risk_lines = sheets[RISKS.table]
+        reference_findings, risk_references = _check_references(
+            RISKS, "Mitigation Controls IDs", columns["mitigation controls ids"], risk_lines,
+            canonical_control_id, set(control_ids) if control_ids is not None else None, "control", CONTROLS,
+        )
+        findings.extend(reference_findings)
+    if CONTROLS.table in sheets:
+        columns, control_lines = sheets[CONTROLS.table]
+        reference_findings, control_references = _check_references(
+            CONTROLS, "Risk ID", columns["risk id"], control_lines,
+            lambda reference: canonical_risk_id(reference, known_risks), set(known_risks.values()) if known_risks is not None else None, "risk", RISKS,
+        )
+        findings.extend(reference_findings)
+    if RISKS.table in sheets and CONTROLS.table in sheets:
+        listed_by_risks = {(r, c): line for r, line, cs in zip(risk_ids, risk_lines, risk_references) for c in cs}
+        listed_by_controls = {(r, c): line for c, line, rs in zip(control_ids, control_lines, control_references) for r in rs}
+        findings.extend(
+            Finding(ERROR, "sheet_disagreement", RISKS.file, "Mitigation Controls IDs", line, c, f"risk {r!r} lists control {c!r}, which does not list it")
+            for (r, c), line in listed_by_risks.items()
+            if (r, c) not in listed_by_controls
+        )
+        findings.extend(
+            Finding(ERROR, "sheet_disagreement", CONTROLS.file, "Risk ID", line, r, f"control {c!r} lists risk {r!r}, which does not list it")
+            for (r, c), line in listed_by_controls.items()
+            if (r, c) not in listed_by_risks
+        )
+
+    if not strict:
+        findings = [f._replace(severity=WARNING) if f.check in LENIENT_CHECKS else f for f in findings]
+    findings.sort(key=lambda f: (f.severity != ERROR, f.file, f.line or 0, f.check, f.column or ""))
+    return ValidationReport(resources_dir, findings, rows, round((time.perf_counter() - start) * 1000, 3))
@@ -17,6 +17,8 @@ catalogs = list(filter(None, [x.catalog for x in sql("SHOW CATALOGS").limit(1000
 dbutils.widgets.dropdown(name="catalog", defaultValue=catalogs[0], choices=catalogs, label="catalog")
 dbutils.widgets.text(name="schema", defaultValue="dasf", label="schema")
 dbutils.widgets.text(name="volume", defaultValue="dasf", label="volume")
+dbutils.widgets.dropdown(name="mode", defaultValue="interactive", choices=["interactive", "job"], label="mode")
+dbutils.widgets.text(name="change_stream", defaultValue="", label="change stream")
 
 # COMMAND ----------
 
@@ -29,6 +31,64 @@ dbutils.widgets.text(name="volume", defaultValue="dasf", label="volume")
 catalog = dbutils.widgets.get("catalog")
 schema = dbutils.widgets.get("schema")
 volume = dbutils.widgets.get("volume")
+# JSON Lines file (e.g. on the volume) the change log events are also appended to; empty for none
+change_stream = dbutils.widgets.get("change_stream")
+
+# In job mode (scheduled and automated runs) nothing is displayed: the sample queries after each table and
+# function are collected and run as one batched validation query at the end of the notebook
+job_mode = dbutils.widgets.get("mode") == "job"
+smoke_checks = []
+
+
+def sample(query):
+    if job_mode:
+        smoke_checks.append(query)
+    else:
+        display(sql(query))
+
+# COMMAND ----------
+
+import os
+import sys
+
+# Make the dasf package at the root of this repo importable
+sys.path.append(os.path.abspath(".."))
+
+from dasf.metrics import METRICS_TABLE, StageMetrics
+
+# Every stage below records its wall time, row counts and bytes written; the records are appended to dasf_ingest_metrics at the end
+metrics = StageMetrics(workspace=spark.conf.get("spark.databricks.workspaceUrl", None))
+
+source_folder = "../resources"
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Pre-write validation
+
+# COMMAND ----------
+
+from dasf.validate import validate_resources
+
+# Check the source TSVs in one pass before any schema, volume or table is created or written: the headers against the declared
+# columns, unique and well-formed risk and control ids, the references between both sheets in both directions and the
+# Yes/No deployment model cells. Any error stops the run here; dangling references and disagreements between the
+# sheets are reported as warnings, since the mapping drops or unions them
+with metrics.stage("validate", source_folder) as stage:
+    validation = validate_resources(source_folder)
+    stage.rows_in = stage.rows_out = validation.row_count
+    stage.detail = validation.summary()
+print(validation.summary())
+for finding in validation.findings:
+    print(f"{finding.severity}: {finding.file}:{finding.line or 1}: {finding.message}")
+if not validation.ok:
+    # Append the metrics of the failed run before stopping it; the schema is created after the validation,
+    # so on a first run there is no schema to hold dasf_ingest_metrics yet and they are printed instead
+    if spark.catalog.databaseExists(f"{catalog}.{schema}"):
+        metrics.write_table(spark, f"{catalog}.{schema}.{METRICS_TABLE}")
+    else:
+        print(metrics.summary())
+validation.raise_for_errors()
 
 # COMMAND ----------
 
@@ -43,24 +103,27 @@ sql(f"USE SCHEMA {schema}")
 
 # COMMAND ----------
 
-import shutil
-import os
+# MAGIC %md
+# MAGIC # Ingestion
 
-source_folder = "../resources"
-destination_folder = volume_path
+# COMMAND ----------
 
-# Create destination folder if it doesn't exist
-os.makedirs(destination_folder, exist_ok=True)
+from dasf.ingest import SparkBackend
 
-# Copy files from source to destination
-for filename in os.listdir(source_folder):
-    if filename.endswith(".tsv"):
-        source_file = os.path.join(source_folder, filename)
-        destination_file = os.path.join(destination_folder, filename)
-        if os.path.isfile(destination_file):
-            os.remove(destination_file)
-        if os.path.isfile(source_file):
-            shutil.copy(source_file, destination_file)
+# dasf.ingest.SparkBackend runs the whole ingestion, the same way `python -m dasf ingest --backend spark` does:
+# - each table's fingerprint covers its source files, column specs and the code deriving it, and tables whose stored fingerprint matches are skipped
+# - the changed TSVs are copied to the volume and read by Spark with the schema declared in dasf.schema, in a single pass;
+#   enforceSchema is disabled so a renamed header fails the read instead of silently shifting columns
+# - the mapping, framework crosswalk, deployment model risks, co-mitigation graph, control covers, entity resolution index,
+#   retrieval index and summary are derived from the parsed rows with the same functions as the local backend
+# - every changed table is applied with a MERGE on its keys, and the new fingerprint is stored on the table
+# - the compendium is filed under its revision next to the revisions ingested before, and the risks and controls this run
+#   inserted, updated or deleted are appended to dasf_change_log under the next version (and to the change stream if set)
+ingest_backend = SparkBackend(spark, catalog, schema)
+changed_tables = ingest_backend.ingest(
+    source_folder, metrics, change_stream=change_stream or None, staging_dir=volume_path, report=validation
+)
+print(f"changed tables: {', '.join(sorted(changed_tables)) or 'none'}")
 
 # COMMAND ----------
 
@@ -69,280 +132,15 @@ for filename in os.listdir(source_folder):
 
 # COMMAND ----------
 
-# Read the AI Lifecycle Risks file into a Spark DataFrame
-# The file is located in the specified catalog, schema, and volume
-# The file has a header, schema is inferred, and the delimiter is a tab
-df_AI_Lifecycle_Risks = spark.read.format("csv").option("header", True).option("inferSchema", True).option("delimiter", "\t").load(f"{volume_path}/Databricks AI Security Framework - AI Lifecycle Risks.tsv")
-
-# Display the DataFrame
-display(df_AI_Lifecycle_Risks)
-
-# COMMAND ----------
-
-from pyspark.sql.functions import split, trim
-
-# Extract the 'Risk name' from the 'Risk' column by splitting the string at ':' and trimming any leading/trailing spaces
-df_AI_Lifecycle_Risks = df_AI_Lifecycle_Risks.withColumn("Risk name", trim(split(df_AI_Lifecycle_Risks["Risk"], ":")[1]))
-
-# Display the 'Risk name' column to verify the transformation
-display(df_AI_Lifecycle_Risks.select("Risk name"))
-
-# COMMAND ----------
-
-# Select and rename columns from the df_AI_Lifecycle_Risks DataFrame
-risks_in_ai_system_components = df_AI_Lifecycle_Risks.selectExpr(
-    "`Risk Id` as risk_id", 
-    "`System component` as system_component", 
-    "`Risk` as risk", 
-    "`Risk name` as risk_name", 
-    "`Risk description` as risk_description", 
-    "`Mitigation Controls IDs` as mitigation_control_ids", 
-    "`Mitigation controls` as mitigation_controls", 
-    "`DASF  Revision` as revision",  
-    "`Predictive ML models` as is_predictive_ml_models", 
-    "`RAG - LLMs` as is_rag_llms", 
-    "`Fine-tuned LLMs` as is_fine_tuned_llms", 
-    "`Pre-trained LLMs` as is_pre_trained_llms", 
-    "`Foundational LLMs` as is_foundational_llms", 
-    "`External models` as is_external_models", 
-    "`Initial AI Risk Impacts` as initial_ai_risk_impacts", 
-    "`Business Impacts` as business_impacts", 
-    "`AI Novelty` as ai_novelty", 
-    "`MITRE ATLAS as of Q3 2024` as mitre_atlas_as_of_q3_2024", 
-    "`MITRE ATTACK as of Q3 2024` as mitre_attack_as_of_q3_2024", 
-    "`OWASP LLM Top 10 2025` as owasp_llm_top_10_2025", 
-    "`OWASP ML Top 10 v0.3` as owasp_ml_top_10_v0_3", 
-    "`NIST - 800- 53 - Rev 5` as nist_800_53_rev_5", 
-    "`NIST 800-53 Controls Mapping Rationale` as nist_800_53_controls_mapping_rationale", 
-    "`HITRUST` as hitrust", 
-    "`ENISA’s Securing ML Algorithms` as enisa_securing_ml_algorithms", 
-    "`ISO 42001:2023 Controls Objectives and Controls (Annex A)` as iso_42001_2023_controls_objectives_and_controls_annex_a", 
-    "`ISO 27001:2022 Information Security Control Reference (Annex A)` as iso_27001_2022_information_security_control_reference_annex_a", 
-    "`EU AI Act` as eu_ai_act"
-)
+# Select all columns from the risks_in_ai_system_components table
+sample("SELECT * FROM risks_in_ai_system_components")
 
-# Display the transformed DataFrame
-display(df_AI_Lifecycle_Risks)
-
-# COMMAND ----------
-
-# Write the DataFrame to a table with specified options
-risks_in_ai_system_components.write \
-    .option("overwriteSchema", "true") \
-    .option("description", "The databricks_ai_mitigation_controls table contains information about the mitigation controls used in the AI system as documented in Databricks AI Security Framework (DASF) white paper. It provides details on the mitigation control, risk mapping, and description of each mitigation control. Additionally, it includes references to Databricks shared responsibility, product documentation links for AWS, Azure, and GCP ,  as well as DASF revision information. The table also includes information on security control types, AI system components and steps, security analysis tools, AI system novelty, and various security standards such as MITRE Atlas, MITRE ATT&CK, OWASP LLM Top 10, OWASP ML Top 10, ISO 42001, and ISO 27001.") \
-    .option("tags", "AI, Risks, System Components") \
-    .saveAsTable(f"{catalog}.{schema}.risks_in_ai_system_components", mode="overwrite")
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_components table
-# MAGIC SELECT * FROM risks_in_ai_system_components
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Create a new function that returns a table with specific columns
-# MAGIC CREATE OR REPLACE FUNCTION risks_in_ai_system_components() RETURNS TABLE (
-# MAGIC   risk_id STRING COMMENT 'Risk ID', -- Column for Risk ID
-# MAGIC   system_component STRING COMMENT 'System Component Category', -- Column for System Component Category
-# MAGIC   risk_name STRING COMMENT 'Full Risk Title' -- Column for Full Risk Title
-# MAGIC   -- Additional columns can be uncommented and added as needed
-# MAGIC   -- risk_description STRING,
-# MAGIC   -- mitigation_control_ids STRING,
-# MAGIC   -- mitigation_controls STRING,
-# MAGIC   -- revision STRING,
-# MAGIC   -- is_predictive_ml_models STRING,
-# MAGIC   -- is_rag_llms STRING,
-# MAGIC   -- is_fine_tuned_llms STRING,
-# MAGIC   -- is_pre_trained_llms STRING,
-# MAGIC   -- is_foundational_llms STRING,
-# MAGIC   -- is_external_models STRING,
-# MAGIC   -- initial_ai_risk_impacts STRING,
-# MAGIC   -- business_impacts STRING,
-# MAGIC   -- ai_novelty STRING,
-# MAGIC   -- mitre_atlas_as_of_q3_2024 STRING,
-# MAGIC   -- mitre_attack_as_of_q3_2024 STRING,
-# MAGIC   -- owasp_llm_top_10_2025 STRING,
-# MAGIC   -- owasp_ml_top_10_v0_3 STRING,
-# MAGIC   -- nist_800_53_rev_5 STRING,
-# MAGIC   -- nist_800_53_controls_mapping_rationale STRING,
-# MAGIC   -- hitrust STRING,
-# MAGIC   -- enisa_securing_ml_algorithms STRING,
-# MAGIC   -- iso_42001_2023_controls_objectives_and_controls_annex_a STRING,
-# MAGIC   -- iso_27001_2022_information_security_control_reference_annex_a STRING,
-# MAGIC   -- eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns risk details consisting of risk id, system components, and the full risk title from Risks in AI system components table' 
-# MAGIC RETURN 
-# MAGIC -- Select the specified columns from the risks_in_ai_system_components table
-# MAGIC SELECT
-# MAGIC   risk_id,
-# MAGIC   system_component,
-# MAGIC   risk_name
-# MAGIC FROM
-# MAGIC   risks_in_ai_system_components;
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_components function
-# MAGIC SELECT * FROM risks_in_ai_system_components()
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Create a new function that returns a table of risks based on the provided risk_id_param
-# MAGIC CREATE OR REPLACE FUNCTION risks_in_ai_system_for_component(risk_id_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   risk_id STRING, 
-# MAGIC   system_component STRING, 
-# MAGIC   risk STRING, 
-# MAGIC   risk_name STRING,
-# MAGIC   risk_description STRING, 
-# MAGIC   mitigation_control_ids STRING, 
-# MAGIC   mitigation_controls STRING, 
-# MAGIC   revision STRING, 
-# MAGIC   is_predictive_ml_models STRING, 
-# MAGIC   is_rag_llms STRING, 
-# MAGIC   is_fine_tuned_llms STRING, 
-# MAGIC   is_pre_trained_llms STRING, 
-# MAGIC   is_foundational_llms STRING, 
-# MAGIC   is_external_models STRING, 
-# MAGIC   initial_ai_risk_impacts STRING, 
-# MAGIC   business_impacts STRING, 
-# MAGIC   ai_novelty STRING, 
-# MAGIC   mitre_atlas_as_of_q3_2024 STRING, 
-# MAGIC   mitre_attack_as_of_q3_2024 STRING, 
-# MAGIC   owasp_llm_top_10_2025 STRING, 
-# MAGIC   owasp_ml_top_10_v0_3 STRING, 
-# MAGIC   nist_800_53_rev_5 STRING, 
-# MAGIC   nist_800_53_controls_mapping_rationale STRING, 
-# MAGIC   hitrust STRING, 
-# MAGIC   enisa_securing_ml_algorithms STRING, 
-# MAGIC   iso_42001_2023_controls_objectives_and_controls_annex_a STRING, 
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING, 
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns all related risk of AI system components and all the details associated to each risk based on Risk Category and or Risk ID'
-# MAGIC RETURN
-# MAGIC -- Select all columns from the risks_in_ai_system_components table where the risk_id matches the provided parameter
-# MAGIC SELECT * FROM risks_in_ai_system_components
-# MAGIC WHERE risk_id rlike risk_id_param
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_for_component function
-# MAGIC -- where the risk_id matches the pattern 'Raw Data'
-# MAGIC SELECT * FROM risks_in_ai_system_for_component('Raw Data')
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_for_component function
-# MAGIC -- where the risk_id matches the pattern 'Raw Data 1.10'
-# MAGIC SELECT * FROM risks_in_ai_system_for_component('Raw Data 1.10')
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- This code creates a new function risks_in_ai_system_component_by_risk_id
-# MAGIC -- The function takes a single parameter risk_id_param of type STRING
-# MAGIC -- The function returns a table with all columns
-# MAGIC -- The function returns all details for a risk in AI system components by risk id
-# MAGIC CREATE OR REPLACE FUNCTION risks_in_ai_system_component_by_risk_id(risk_id_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   risk_id STRING, 
-# MAGIC   system_component STRING, 
-# MAGIC   risk STRING, 
-# MAGIC   risk_name STRING,
-# MAGIC   risk_description STRING, 
-# MAGIC   mitigation_control_ids STRING, 
-# MAGIC   mitigation_controls STRING, 
-# MAGIC   revision STRING, 
-# MAGIC   is_predictive_ml_models STRING, 
-# MAGIC   is_rag_llms STRING, 
-# MAGIC   is_fine_tuned_llms STRING, 
-# MAGIC   is_pre_trained_llms STRING, 
-# MAGIC   is_foundational_llms STRING, 
-# MAGIC   is_external_models STRING, 
-# MAGIC   initial_ai_risk_impacts STRING, 
-# MAGIC   business_impacts STRING, 
-# MAGIC   ai_novelty STRING, 
-# MAGIC   mitre_atlas_as_of_q3_2024 STRING, 
-# MAGIC   mitre_attack_as_of_q3_2024 STRING, 
-# MAGIC   owasp_llm_top_10_2025 STRING, 
-# MAGIC   owasp_ml_top_10_v0_3 STRING, 
-# MAGIC   nist_800_53_rev_5 STRING, 
-# MAGIC   nist_800_53_controls_mapping_rationale STRING, 
-# MAGIC   hitrust STRING, 
-# MAGIC   enisa_securing_ml_algorithms STRING, 
-# MAGIC   iso_42001_2023_controls_objectives_and_controls_annex_a STRING, 
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING, 
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns all details for a risk in AI system components risk_id'
-# MAGIC RETURN
-# MAGIC SELECT * FROM risks_in_ai_system_components
-# MAGIC WHERE risk_id = risk_id_param
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_component_by_risk_id function
-# MAGIC -- where the risk_id matches the pattern 'Datasets 3.1'
-# MAGIC SELECT * from risks_in_ai_system_component_by_risk_id('Datasets 3.1')
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- This code creates a new function risks_in_ai_system_component_by_risk_name
-# MAGIC -- The function takes a single parameter risk_name_param of type STRING
-# MAGIC -- The function returns a table with all columns
-# MAGIC -- The function returns all details for a risk in AI system components by risk name
-# MAGIC CREATE OR REPLACE FUNCTION risks_in_ai_system_component_by_risk_name(risk_name_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   risk_id STRING, 
-# MAGIC   system_component STRING, 
-# MAGIC   risk STRING, 
-# MAGIC   risk_name STRING,
-# MAGIC   risk_description STRING, 
-# MAGIC   mitigation_control_ids STRING, 
-# MAGIC   mitigation_controls STRING, 
-# MAGIC   revision STRING, 
-# MAGIC   is_predictive_ml_models STRING, 
-# MAGIC   is_rag_llms STRING, 
-# MAGIC   is_fine_tuned_llms STRING, 
-# MAGIC   is_pre_trained_llms STRING, 
-# MAGIC   is_foundational_llms STRING, 
-# MAGIC   is_external_models STRING, 
-# MAGIC   initial_ai_risk_impacts STRING, 
-# MAGIC   business_impacts STRING, 
-# MAGIC   ai_novelty STRING, 
-# MAGIC   mitre_atlas_as_of_q3_2024 STRING, 
-# MAGIC   mitre_attack_as_of_q3_2024 STRING, 
-# MAGIC   owasp_llm_top_10_2025 STRING, 
-# MAGIC   owasp_ml_top_10_v0_3 STRING, 
-# MAGIC   nist_800_53_rev_5 STRING, 
-# MAGIC   nist_800_53_controls_mapping_rationale STRING, 
-# MAGIC   hitrust STRING, 
-# MAGIC   enisa_securing_ml_algorithms STRING, 
-# MAGIC   iso_42001_2023_controls_objectives_and_controls_annex_a STRING, 
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING, 
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns all details for a risk in AI system components by risk name'
-# MAGIC RETURN
-# MAGIC SELECT * FROM risks_in_ai_system_components
-# MAGIC WHERE risk_name = risk_name_param
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_in_ai_system_component_by_risk_name function
-# MAGIC -- where the risk_name matches 'Data poisoning'
-# MAGIC SELECT * from risks_in_ai_system_component_by_risk_name('Data poisoning')
+# COMMAND ----------
+
+# Select the risks of every deployment model
+# The six Yes/No deployment model columns are packed into deployment_models_mask on ingest, one bit per model:
+# predictive ML models 1, RAG LLMs 2, fine-tuned LLMs 4, pre-trained LLMs 8, foundational LLMs 16, external models 32
+sample("SELECT * FROM dasf_deployment_model_risks")
 
 # COMMAND ----------
 
@@ -351,168 +149,8 @@ risks_in_ai_system_components.write \
 
 # COMMAND ----------
 
-# Read the Databricks AI Mitigation Controls data from a TSV file into a DataFrame
-df_Databricks_AI_Mitigation_Controls = spark.read.format("csv") \
-    .option("header", True) \
-    .option("inferSchema", True) \
-    .option("delimiter", "\t") \
-    .load(f"{volume_path}/Databricks AI Security Framework - Databricks AI Mitigation Controls.tsv")
-
-# Display the DataFrame
-display(df_Databricks_AI_Mitigation_Controls)
-
-# COMMAND ----------
-
-# Select and rename columns from the DataFrame for the Databricks AI Mitigation Controls table
-databricks_ai_mitigation_controls = df_Databricks_AI_Mitigation_Controls.selectExpr(
-    "`Control ID` as mitigation_control_id",
-    "`Control` as control",
-    "`Risk ID` as risk_id",
-    "`Description` as description",
-    "`Databricks Shared Responsibility` as databricks_shared_responsibility",
-    "`Databricks Product Reference` as databricks_product_reference",
-    "`Databricks Documentation (AWS)` as databricks_documentation_aws",
-    "`Databricks Documentation (Azure)` as databricks_documentation_azure",
-    "`Databricks Documentation (GCP)` as databricks_documentation_gcp",
-    "`DASF Revision` as dasf_revision",
-    "`Security Control Type` as security_control_type",
-    "`AI System Component Step` as ai_system_component_step",
-    "`Security Analysis Tool (SAT)` as security_analysis_tool_sat",
-    "`AI System Novelty` as ai_system_novelty",
-    "`MITRE ATLAS as of Q3 2024` as mitre_atlas_q3_2024",
-    "`MITRE ATTACK as of Q3 2024` as mitre_attack_q3_2024",
-    "`OWASP LLM Top 10 2025` as owasp_llm_top_10_2025",
-    "`OWASP ML Top 10 v0.3` as owasp_ml_top_10_v0_3",
-    "`ISO 42001:2023 Controls Objectives and Controls (Annex A)` as iso_42001_2023_controls_objectives_controls_annex_a",
-    "`ISO 27001:2022 Information Security Control Reference (Annex A)` as iso_27001_2022_information_security_control_reference_annex_a",
-    "`NIST - 800- 53 - Rev 5` as nist_800_53_rev_5",
-    "`HITRUST` as hitrust",
-    "`ENISA’s Securing ML Algorithms` as enisa_securing_ml_algorithms",
-    "`EU AI ACT` as eu_ai_act"
-)
-
-# Display the resulting DataFrame
-display(databricks_ai_mitigation_controls)
-
-# COMMAND ----------
-
-# Write the databricks_ai_mitigation_controls DataFrame to a table with specified options
-databricks_ai_mitigation_controls.write \
-    .option("overwriteSchema", "true") \
-    .option("description", "The 'risks_in_ai_system_components' table contains information about the risks associated with various AI system components as documented in Databricks AI Security Framework (DASF). It provides details on the identified risks, their descriptions, and the corresponding mitigation control measures. The table also includes information on the revision history of the  DSAF risks and whether the risks applies to predictive ML models, RAG LLMS, fine-tuned LLMS, pre-trained LLMS, foundational LLMS, or external models. Additionally, the table captures the initial AI risk impacts, business impacts, AI novelty, and the latest versions of MITRE Atlas, MITRE Attack, OWASP LLM Top 10, and OWASP ML Top 10. This table is crucial for understanding and managing the risks associated with our AI system components.") \
-    .option("tags", "AI, Security, Controls") \
-    .saveAsTable(f"{catalog}.{schema}.databricks_ai_mitigation_controls", mode="overwrite")
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- This code creates a new function databricks_ai_mitigation_controls
-# MAGIC -- The function returns a table with selected columns
-# MAGIC -- The function returns the mitigation control id, full control title, and each risk associated to each control
-# MAGIC CREATE OR REPLACE FUNCTION databricks_ai_mitigation_controls() RETURNS TABLE (
-# MAGIC   mitigation_control_id STRING,
-# MAGIC   control STRING,
-# MAGIC   risk_id STRING
-# MAGIC   -- description STRING,
-# MAGIC   -- databricks_shared_responsibility STRING,
-# MAGIC   -- databricks_product_reference STRING,
-# MAGIC   -- databricks_documentation_aws STRING,
-# MAGIC   -- databricks_documentation_azure STRING,
-# MAGIC   -- databricks_documentation_gcp STRING,
-# MAGIC   -- dasf_revision STRING,
-# MAGIC   -- security_control_type STRING,
-# MAGIC   -- ai_system_component_step STRING,
-# MAGIC   -- security_analysis_tool_sat STRING,
-# MAGIC   -- ai_system_novelty STRING,
-# MAGIC   -- mitre_atlas_q3_2024 STRING,
-# MAGIC   -- mitre_attack_q3_2024 STRING,
-# MAGIC   -- owasp_llm_top_10_2025 STRING,
-# MAGIC   -- owasp_ml_top_10_v0_3 STRING,
-# MAGIC   -- iso_42001_2023_controls_objectives_controls_annex_a STRING,
-# MAGIC   -- iso_27001_2022_information_security_control_reference_annex_a STRING,
-# MAGIC   -- nist_800_53_rev_5 STRING,
-# MAGIC   -- hitrust STRING,
-# MAGIC   -- enisa_securing_ml_algorithms STRING,
-# MAGIC   -- eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns the mitigation control id, full control title, and each risk associated to each control' 
-# MAGIC RETURN
-# MAGIC SELECT
-# MAGIC   mitigation_control_id,
-# MAGIC   control,
-# MAGIC   risk_id
-# MAGIC   -- description,
-# MAGIC   -- databricks_shared_responsibility,
-# MAGIC   -- databricks_product_reference,
-# MAGIC   -- databricks_documentation_aws,
-# MAGIC   -- databricks_documentation_azure,
-# MAGIC   -- databricks_documentation_gcp,
-# MAGIC   -- dasf_revision,
-# MAGIC   -- security_control_type,
-# MAGIC   -- ai_system_component_step,
-# MAGIC   -- security_analysis_tool_sat,
-# MAGIC   -- ai_system_novelty,
-# MAGIC   -- mitre_atlas_q3_2024,
-# MAGIC   -- mitre_attack_q3_2024,
-# MAGIC   -- owasp_llm_top_10_2025,
-# MAGIC   -- owasp_ml_top_10_v0_3,
-# MAGIC   -- iso_42001_2023_controls_objectives_controls_annex_a,
-# MAGIC   -- iso_27001_2022_information_security_control_reference_annex_a,
-# MAGIC   -- nist_800_53_rev_5,
-# MAGIC   -- hitrust,
-# MAGIC   -- enisa_securing_ml_algorithms,
-# MAGIC   -- eu_ai_act
-# MAGIC FROM
-# MAGIC   databricks_ai_mitigation_controls;
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the databricks_ai_mitigation_controls function
-# MAGIC SELECT * FROM databricks_ai_mitigation_controls()
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Create a new function databricks_ai_mitigation_control_by_mitigation_control_id
-# MAGIC -- The function returns a table with details of the control for a given mitigation control id
-# MAGIC CREATE OR REPLACE FUNCTION databricks_ai_mitigation_control_by_mitigation_control_id(mitigation_control_id_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   mitigation_control_id STRING,
-# MAGIC   control STRING,
-# MAGIC   risk_id STRING,
-# MAGIC   description STRING,
-# MAGIC   databricks_shared_responsibility STRING,
-# MAGIC   databricks_product_reference STRING,
-# MAGIC   databricks_documentation_aws STRING,
-# MAGIC   databricks_documentation_azure STRING,
-# MAGIC   databricks_documentation_gcp STRING,
-# MAGIC   dasf_revision STRING,
-# MAGIC   security_control_type STRING,
-# MAGIC   ai_system_component_step STRING,
-# MAGIC   security_analysis_tool_sat STRING,
-# MAGIC   ai_system_novelty STRING,
-# MAGIC   mitre_atlas_q3_2024 STRING,
-# MAGIC   mitre_attack_q3_2024 STRING,
-# MAGIC   owasp_llm_top_10_2025 STRING,
-# MAGIC   owasp_ml_top_10_v0_3 STRING,
-# MAGIC   iso_42001_2023_controls_objectives_controls_annex_a STRING,
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING,
-# MAGIC   nist_800_53_rev_5 STRING,
-# MAGIC   hitrust STRING,
-# MAGIC   enisa_securing_ml_algorithms STRING,
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns the mitigation control id, full control title, risk_id, description, and all the details of the control for a given mitigation control id'
-# MAGIC RETURN
-# MAGIC SELECT * FROM databricks_ai_mitigation_controls
-# MAGIC WHERE mitigation_control_id = mitigation_control_id_param
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all details of the mitigation control with the specified mitigation control id 'DASF 12'
-# MAGIC SELECT * FROM databricks_ai_mitigation_control_by_mitigation_control_id('DASF 12')
+# Select all columns from the databricks_ai_mitigation_controls table
+sample("SELECT * FROM databricks_ai_mitigation_controls")
 
 # COMMAND ----------
 
@@ -521,126 +159,241 @@ databricks_ai_mitigation_controls.write \
 
 # COMMAND ----------
 
-from pyspark.sql.functions import split, explode
-
-# Split the 'mitigation_control_ids' column by commas and explode the resulting array into separate rows
-risks_and_controls_df = risks_in_ai_system_components.withColumn("mitigation_control_id", explode(split(risks_in_ai_system_components["mitigation_control_ids"], ",")))
-
-# Display the resulting DataFrame
-display(risks_and_controls_df)
-
-# COMMAND ----------
-
-# Select the 'risk_id' and 'mitigation_control_id' columns from the DataFrame
-# Write the DataFrame to a table with specified options
-risks_and_controls_df.select("risk_id", "mitigation_control_id").write \
-    .option("overwriteSchema", "true") \
-    .option("description", "The risks_and_controls_mapping table provides a mapping between risk IDs and mitigation control IDs as documented in Databricks AI Security Framework (DASF). This table is essential for tracking and managing risks with their corresponding controls.  It allows for the identification of which mitigation controls are associated with each risk, enabling effective risk management and mitigation strategies. The risk_id column represents the unique identifier for each risk, while the mitigation_control_id column represents the unique identifier for each mitigation control. This table serves as a valuable resource for understanding the relationship between risks and their corresponding mitigation controls.") \
-    .option("tags", "AI, Risks, Mitigation Components") \
-    .saveAsTable(f"{catalog}.{schema}.risks_and_controls_mapping", mode="overwrite")
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the risks_and_controls_mapping table
-# MAGIC SELECT * FROM risks_and_controls_mapping
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Create a new function to return mitigation controls by risk id
-# MAGIC CREATE OR REPLACE FUNCTION databricks_ai_mitigation_controls_by_risk_id(risk_id_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   mitigation_control_id STRING,
-# MAGIC   control STRING,
-# MAGIC   risk_id STRING,
-# MAGIC   description STRING,
-# MAGIC   databricks_shared_responsibility STRING,
-# MAGIC   databricks_product_reference STRING,
-# MAGIC   databricks_documentation_aws STRING,
-# MAGIC   databricks_documentation_azure STRING,
-# MAGIC   databricks_documentation_gcp STRING,
-# MAGIC   dasf_revision STRING,
-# MAGIC   security_control_type STRING,
-# MAGIC   ai_system_component_step STRING,
-# MAGIC   security_analysis_tool_sat STRING,
-# MAGIC   ai_system_novelty STRING,
-# MAGIC   mitre_atlas_q3_2024 STRING,
-# MAGIC   mitre_attack_q3_2024 STRING,
-# MAGIC   owasp_llm_top_10_2025 STRING,
-# MAGIC   owasp_ml_top_10_v0_3 STRING,
-# MAGIC   iso_42001_2023_controls_objectives_controls_annex_a STRING,
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING,
-# MAGIC   nist_800_53_rev_5 STRING,
-# MAGIC   hitrust STRING,
-# MAGIC   enisa_securing_ml_algorithms STRING,
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns mitigation controls with control id, full control title, risk_id, description, and all the details of the control for a given risk id'
-# MAGIC RETURN
-# MAGIC SELECT controls.* 
-# MAGIC FROM databricks_ai_mitigation_controls as controls, risks_and_controls_mapping as risks_and_controls_mapping
-# MAGIC WHERE risks_and_controls_mapping.risk_id = risk_id_param
-# MAGIC and risks_and_controls_mapping.mitigation_control_id = controls.mitigation_control_id
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC SELECT * 
-# MAGIC FROM databricks_ai_mitigation_controls as controls, risks_and_controls_mapping as risks_and_controls_mapping
-# MAGIC WHERE risks_and_controls_mapping.risk_id = 'Datasets 3.1'
-# MAGIC and risks_and_controls_mapping.mitigation_control_id = controls.mitigation_control_id 
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Select all columns from the function databricks_ai_mitigation_controls_by_risk_id for a given risk id
-# MAGIC SELECT * FROM databricks_ai_mitigation_controls_by_risk_id('Datasets 3.1')
-
-# COMMAND ----------
-
-# MAGIC %sql
-# MAGIC -- Create a new function to return risks in AI system components by mitigation control id
-# MAGIC CREATE OR REPLACE FUNCTION risks_in_ai_system_by_mitigation_controls_id(mitigation_controls_id_param STRING) 
-# MAGIC RETURNS TABLE (
-# MAGIC   risk_id STRING, 
-# MAGIC   system_component STRING, 
-# MAGIC   risk STRING, 
-# MAGIC   risk_name STRING,
-# MAGIC   risk_description STRING, 
-# MAGIC   mitigation_control_ids STRING, 
-# MAGIC   mitigation_controls STRING, 
-# MAGIC   revision STRING, 
-# MAGIC   is_predictive_ml_models STRING, 
-# MAGIC   is_rag_llms STRING, 
-# MAGIC   is_fine_tuned_llms STRING, 
-# MAGIC   is_pre_trained_llms STRING, 
-# MAGIC   is_foundational_llms STRING, 
-# MAGIC   is_external_models STRING, 
-# MAGIC   initial_ai_risk_impacts STRING, 
-# MAGIC   business_impacts STRING, 
-# MAGIC   ai_novelty STRING, 
-# MAGIC   mitre_atlas_as_of_q3_2024 STRING, 
-# MAGIC   mitre_attack_as_of_q3_2024 STRING, 
-# MAGIC   owasp_llm_top_10_2025 STRING, 
-# MAGIC   owasp_ml_top_10_v0_3 STRING, 
-# MAGIC   nist_800_53_rev_5 STRING, 
-# MAGIC   nist_800_53_controls_mapping_rationale STRING, 
-# MAGIC   hitrust STRING, 
-# MAGIC   enisa_securing_ml_algorithms STRING, 
-# MAGIC   iso_42001_2023_controls_objectives_and_controls_annex_a STRING, 
-# MAGIC   iso_27001_2022_information_security_control_reference_annex_a STRING, 
-# MAGIC   eu_ai_act STRING
-# MAGIC )
-# MAGIC COMMENT 'Returns all related risks addressed in a AI system components and all the details associated to each risk by a given mitigation control id'
-# MAGIC RETURN
-# MAGIC SELECT risks.* 
-# MAGIC FROM risks_in_ai_system_components as risks, risks_and_controls_mapping as risks_and_controls_mapping
-# MAGIC WHERE risks_and_controls_mapping.mitigation_control_id = mitigation_controls_id_param
-# MAGIC and risks_and_controls_mapping.risk_id = risks.risk_id
-
-# COMMAND ----------
-
-# MAGIC %sql 
-# MAGIC -- Select all columns from the function risks_in_ai_system_by_mitigation_controls_id for a given mitigation control id
-# MAGIC SELECT * FROM risks_in_ai_system_by_mitigation_controls_id('DASF 1')
+# Select all columns from the risks_and_controls_mapping table
+# The mapping reconciles the risks sheet's 'mitigation_control_ids' and the controls sheet's 'risk_id' references into one edge list,
+# clustered by risk_id and mitigation_control_id so lookups in either direction are exact
+sample("SELECT * FROM risks_and_controls_mapping")
+
+# COMMAND ----------
+
+# Join the controls and the mapping for a given risk id
+sample("""
+SELECT *
+FROM databricks_ai_mitigation_controls as controls, risks_and_controls_mapping as risks_and_controls_mapping
+WHERE risks_and_controls_mapping.risk_id = 'Datasets 3.1'
+and risks_and_controls_mapping.mitigation_control_id = controls.mitigation_control_id
+""")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Framework crosswalk
+
+# COMMAND ----------
+
+# Select all columns from the dasf_framework_crosswalk table
+# It holds one (entity_type, entity_id, framework, reference_id) row per standard control referenced by a risk or control,
+# clustered by framework and reference_id, so reverse lookups from a standard's id skip unrelated files
+sample("SELECT * FROM dasf_framework_crosswalk")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Risk co-mitigation graph
+
+# COMMAND ----------
+
+# Select the minimum control set covering every risk
+sample("SELECT * FROM dasf_control_cover WHERE deployment_models_mask = 0 AND component_name = '' ORDER BY rank")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Summary
+
+# COMMAND ----------
+
+# Count the risks per system component
+sample("SELECT * FROM dasf_summary('system_component')")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Change log
+
+# COMMAND ----------
+
+# Select the risks and controls changed by the latest load; downstream systems sync by reading the versions after the last one they applied
+# The first load inserts every row, and a run that changes no row appends nothing, so this is not one of the job mode smoke checks
+if not job_mode:
+    display(sql("SELECT * FROM dasf_change_log WHERE version = (SELECT max(version) FROM dasf_change_log) ORDER BY event_number"))
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Functions
+
+# COMMAND ----------
+
+from dasf.functions import FUNCTIONS, deploy_functions
+
+# Every UC function is generated from its spec in dasf.functions: the RETURNS clause and the projection come from dasf.schema
+# Each definition's fingerprint is kept at the end of its comment; the deployed fingerprints are read from information_schema
+# in one query and only the functions whose definition changed are re-created, in one batched submission
+with metrics.stage("functions", f"{catalog}.{schema}", rows_in=len(FUNCTIONS)) as stage:
+    deployed_functions = deploy_functions(spark, catalog, schema)
+    stage.rows_out = len(deployed_functions)
+    stage.skipped = not deployed_functions
+    stage.detail = ", ".join(deployed_functions) or "unchanged"
+print(f"re-created {len(deployed_functions)} of {len(FUNCTIONS)} functions: {', '.join(deployed_functions) or 'none'}")
+
+# COMMAND ----------
+
+# Select all columns from the risks_in_ai_system_components function
+sample("SELECT * FROM risks_in_ai_system_components()")
+
+# COMMAND ----------
+
+# Select all columns from the risks_in_ai_system_for_component function
+# where the risk_id matches the pattern 'Raw Data'
+sample("SELECT * FROM risks_in_ai_system_for_component('Raw Data')")
+
+# COMMAND ----------
+
+# Select all columns from the risks_in_ai_system_for_component function
+# where the risk_id matches the pattern 'Raw Data 1.10'
+sample("SELECT * FROM risks_in_ai_system_for_component('Raw Data 1.10')")
+
+# COMMAND ----------
+
+# Select all risks of the Data Prep component
+sample("SELECT * FROM risks_in_ai_system_by_component('Data Prep')")
+
+# COMMAND ----------
+
+# Select all risks of the Model Serving components (inference requests and responses)
+sample("SELECT * FROM risks_in_ai_system_by_component_prefix('Model Serving')")
+
+# COMMAND ----------
+
+# Select all columns from the risks_in_ai_system_component_by_risk_id function
+# where the risk_id matches the pattern 'Datasets 3.1'
+sample("SELECT * from risks_in_ai_system_component_by_risk_id('Datasets 3.1')")
+
+# COMMAND ----------
+
+# Select all columns from the risks_in_ai_system_component_by_risk_name function
+# where the risk_name matches 'Data poisoning'
+sample("SELECT * from risks_in_ai_system_component_by_risk_name('Data poisoning')")
+
+# COMMAND ----------
+
+# Select all details of several risks in one call
+sample("SELECT * FROM risks_in_ai_system_component_by_risk_ids(array('Datasets 3.1', 'Raw Data 1.1'))")
+
+# COMMAND ----------
+
+# Select all risks that apply for a RAG deployment model
+sample("SELECT * FROM risks_for_deployment_models(deployment_models_mask('RAG'))")
+
+# COMMAND ----------
+
+# Select the risks shared by fine-tuned and pre-trained LLMs (4 | 8)
+sample("SELECT * FROM risks_for_deployment_models(12, TRUE)")
+
+# COMMAND ----------
+
+# Select all columns from the databricks_ai_mitigation_controls function
+sample("SELECT * FROM databricks_ai_mitigation_controls()")
+
+# COMMAND ----------
+
+# Select all details of the mitigation control with the specified mitigation control id 'DASF 12'
+sample("SELECT * FROM databricks_ai_mitigation_control_by_mitigation_control_id('DASF 12')")
+
+# COMMAND ----------
+
+# Select all details of several mitigation controls in one call
+sample("SELECT * FROM databricks_ai_mitigation_control_by_mitigation_control_ids(array('DASF 1', 'DASF 12'))")
+
+# COMMAND ----------
+
+# Select all columns from the function databricks_ai_mitigation_controls_by_risk_id for a given risk id
+sample("SELECT * FROM databricks_ai_mitigation_controls_by_risk_id('Datasets 3.1')")
+
+# COMMAND ----------
+
+# Select only the id, title and AWS documentation link of the same controls
+sample("SELECT * FROM databricks_ai_mitigation_controls_by_risk_id_projected('Datasets 3.1', 'docs_aws')")
+
+# COMMAND ----------
+
+# Select the second page of ten RAG risks, with their core columns
+sample("SELECT * FROM risks_for_deployment_models_projected(deployment_models_mask('RAG'), FALSE, 'core', 10, 10)")
+
+# COMMAND ----------
+
+# Select all columns from the function risks_in_ai_system_by_mitigation_controls_id for a given mitigation control id
+sample("SELECT * FROM risks_in_ai_system_by_mitigation_controls_id('DASF 1')")
+
+# COMMAND ----------
+
+# Select the mitigation controls of several risks in one call
+sample("SELECT * FROM databricks_ai_mitigation_controls_by_risk_ids(array('Datasets 3.1', 'Raw Data 1.1'))")
+
+# COMMAND ----------
+
+# Select the DASF risks and controls mapped to NIST 800-53 AC-2
+sample("SELECT * FROM framework_crosswalk_by_reference('NIST 800-53', 'AC-2')")
+
+# COMMAND ----------
+
+# Select all risks mapped to NIST 800-53 AC-2
+sample("SELECT * FROM risks_in_ai_system_by_framework_reference('nist_800_53', 'AC-2')")
+
+# COMMAND ----------
+
+# Select all mitigation controls mapped to ISO 27001 access control (A.5.15)
+sample("SELECT * FROM databricks_ai_mitigation_controls_by_framework_reference('ISO 27001', 'A.5.15')")
+
+# COMMAND ----------
+
+# Select the risks sharing mitigation controls with Datasets 3.1
+sample("SELECT * FROM dasf_risk_comitigation_by_risk_id('Datasets 3.1')")
+
+# COMMAND ----------
+
+# Select the smallest set of mitigation controls covering all RAG risks
+sample("SELECT * FROM dasf_minimum_control_set('RAG')")
+
+# COMMAND ----------
+
+# Resolve a misspelled risk name to its best matching risks and controls
+sample("SELECT * FROM dasf_resolve_entity('missing data clasification')")
+
+# COMMAND ----------
+
+# Rank the risks and controls whose descriptions best match a free-text question
+sample("SELECT * FROM dasf_search_text('prompt injection through retrieved documents')")
+
+# COMMAND ----------
+
+# Select what the latest ingested revision changed compared with the revision before it
+# A compendium with a single revision has no changes, so this query is not one of the job mode smoke checks
+if not job_mode:
+    display(sql("SELECT * FROM dasf_revision_changes()"))
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Validation
+
+# COMMAND ----------
+
+from dasf.jobs import run_smoke_checks
+
+# In job mode, run every collected sample query in one batched query and fail the run if any returned no rows
+if job_mode:
+    run_smoke_checks(spark, smoke_checks)
+    print(f"{len(smoke_checks)} smoke checks passed")
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Ingestion metrics
+
+# COMMAND ----------
+
+# Append the wall time, row counts and bytes written of every stage of this run to dasf_ingest_metrics
+metrics.write_table(spark, f"{catalog}.{schema}.{METRICS_TABLE}")
+print(metrics.summary())
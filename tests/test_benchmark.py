@@ -0,0 +1,46 @@
+"""Question replay of the benchmark against the in-process engine."""
+import inspect
+
+import pytest
+
+from dasf.benchmark import BENCHMARK_QUESTIONS, QUESTION_CALLS, QUESTIONS_FILE, benchmark, percentile, question_calls, read_questions, run
+from dasf.engine import DASFEngine
+from dasf.functions import FUNCTIONS
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DASFEngine.from_resources()
+
+
+@pytest.mark.parametrize("function", FUNCTIONS, ids=lambda f: f.name)
+def test_every_uc_function_has_an_engine_method_with_its_parameters(function):
+    method = getattr(DASFEngine, function.name)
+    assert list(inspect.signature(method).parameters)[1:] == [p.name for p in function.parameters]
+
+
+def test_every_question_of_the_question_set_maps_to_engine_calls():
+    questions = read_questions()
+    assert questions[: -len(BENCHMARK_QUESTIONS)] == read_questions(QUESTIONS_FILE)
+    assert question_calls(questions)[1] == []
+
+
+@pytest.mark.parametrize("function, args", sorted({call for calls in QUESTION_CALLS.values() for call in calls}))
+def test_question_calls_run_on_the_engine(engine, function, args):
+    assert isinstance(getattr(engine, function)(*args), list)
+
+
+def test_the_report_has_percentiles_and_rows_per_function():
+    report = run(lambda function, *args: [args] * len(args), [("f", (1, 2)), ("g", ())], iterations=3)
+    assert report["f"]["calls"] == 3 and report["f"]["rows"] == {"[1, 2]": 2}
+    assert report["g"]["rows"] == {"[]": 0}
+    assert percentile([1, 2, 3, 4], 0.5) == 2 and percentile([], 0.5) is None
+
+
+def test_benchmark_replays_the_question_set(tmp_path):
+    questions = tmp_path / "questions.txt"
+    questions.write_text("What is DASF?\nWhat other risks are covered by the mitigation control DASF 1?\nUnknown question\n", encoding="utf-8")
+    report = benchmark(iterations=2, questions_file=str(questions), graph_iterations=1)
+    assert report["unmapped_questions"] == ["Unknown question"]
+    assert set(report["functions"]) == {"risks_in_ai_system_by_mitigation_controls_id"}
+    assert report["functions"]["risks_in_ai_system_by_mitigation_controls_id"]["calls"] == 2
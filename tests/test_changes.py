@@ -0,0 +1,123 @@
+"""Change events of the risks and controls, and their versions across local loads."""
+import csv
+import json
+import os
+import shutil
+
+import pytest
+
+from dasf.changes import DELETE, INSERT, UPDATE, change_events, next_version, row_changes
+from dasf.crosswalk import CONTROL, RISK
+from dasf.ids import risk_id_sort_key
+from dasf.ingest import LocalBackend, local_tables
+from dasf.schema import CHANGE_LOG, CONTROLS, RISKS, column_names
+from dasf.sheets import RESOURCES_DIR
+
+LOADED_AT = "2024-05-01T12:00:00+00:00"
+
+
+@pytest.fixture(scope="module")
+def tables():
+    tables = local_tables()
+    return tables[RISKS.table], tables[CONTROLS.table]
+
+
+def _text(value):
+    if value is None:
+        return None
+    return json.dumps(value) if isinstance(value, list) else str(value)
+
+
+def _as_text(rows):
+    # Rows as the SQL Statement Execution API returns them: every value as text
+    return [row._replace(**{name: _text(value) for name, value in row._asdict().items()}) for row in rows]
+
+
+def test_inserts_updates_and_deletes_are_found_by_key(tables):
+    risks, controls = tables
+    previous = {RISK: risks[:10], CONTROL: controls}
+    current = {RISK: [risks[0]._replace(risk_description="Changed.")] + risks[1:9] + [risks[10]], CONTROL: controls[1:]}
+    events = change_events(previous, current, 3, LOADED_AT, "DASF v 2.0")
+    assert [(e.entity_type, e.entity_id, e.operation, e.changed_fields) for e in events] == [
+        (RISK, risks[0].risk_id, UPDATE, ["risk_description"]),
+        *sorted([(RISK, risks[9].risk_id, DELETE, []), (RISK, risks[10].risk_id, INSERT, [])], key=lambda e: risk_id_sort_key(e[1])),
+        (CONTROL, controls[0].mitigation_control_id, DELETE, []),
+    ]
+    assert [e.event_number for e in events] == list(range(1, 5))
+    assert {(e.version, e.loaded_at, e.compendium_revision) for e in events} == {(3, LOADED_AT, "DASF v 2.0")}
+
+
+def test_events_carry_the_new_row_and_deletes_carry_none(tables):
+    risks, _ = tables
+    changed = risks[0]._replace(risk_description="Changed.")
+    update, delete = change_events({RISK: risks[:2]}, {RISK: [changed]}, 1, LOADED_AT)
+    assert json.loads(update.row_values)["risk_description"] == "Changed."
+    assert update.row_hash
+    assert (delete.operation, delete.row_hash, delete.row_values) == (DELETE, None, None)
+
+
+def test_rows_read_back_as_text_are_unchanged(tables):
+    risks, controls = tables
+    assert change_events({RISK: _as_text(risks), CONTROL: _as_text(controls)}, {RISK: risks, CONTROL: controls}, 1, LOADED_AT) == []
+
+
+def test_rows_without_an_id_are_ignored(tables):
+    risks, _ = tables
+    assert row_changes(RISK, [], [risks[0]._replace(risk_id=None)]) == []
+
+
+def test_the_event_columns_are_those_of_the_change_log(tables):
+    risks, _ = tables
+    (event,) = change_events({}, {RISK: risks[:1]}, 1, LOADED_AT)
+    assert list(event._fields) == column_names(CHANGE_LOG)
+
+
+def test_the_next_version_follows_the_highest_recorded_one():
+    assert next_version([]) == 1
+    assert next_version([None]) == 1
+    assert next_version([3, None, 1]) == 4
+
+
+def _edit(resources, sheet, change):
+    path = resources / sheet.file
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f, delimiter="\t"))
+    change(rows)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, delimiter="\t", lineterminator="\n").writerows(rows)
+
+
+def test_versions_increase_only_with_loads_that_change_rows(tmp_path):
+    resources, output = tmp_path / "resources", str(tmp_path / "tables")
+    os.makedirs(resources)
+    for sheet in (RISKS, CONTROLS):
+        shutil.copy(os.path.join(RESOURCES_DIR, sheet.file), resources / sheet.file)
+    stream = str(tmp_path / "changes.jsonl")
+    backend = LocalBackend(output, "jsonl")
+
+    backend.ingest(str(resources), change_stream=stream)
+    first = backend.read(CHANGE_LOG)
+    assert {e.version for e in first} == {1}
+    assert {e.operation for e in first} == {INSERT}
+    assert len(first) == len(backend.read(RISKS)) + len(backend.read(CONTROLS))
+
+    backend.ingest(str(resources), change_stream=stream)
+    assert backend.read(CHANGE_LOG) == first
+
+    def amend(rows):
+        description = rows[0].index("Risk Description")
+        rows[1][description] += " Amended."
+
+    _edit(resources, RISKS, amend)
+    _edit(resources, CONTROLS, lambda rows: rows.pop())
+    backend.ingest(str(resources), change_stream=stream)
+    log = backend.read(CHANGE_LOG)
+    assert log[: len(first)] == first
+    second = log[len(first) :]
+    assert {e.version for e in second} == {2}
+    assert sorted((e.entity_type, e.operation, tuple(e.changed_fields)) for e in second) == [
+        (CONTROL, DELETE, ()),
+        (RISK, UPDATE, ("risk_description",)),
+    ]
+    with open(stream, encoding="utf-8") as f:
+        assert [json.loads(line)["version"] for line in f] == [1] * len(first) + [2, 2]
@@ -0,0 +1,79 @@
+"""Column groups and pagination of the projected lookups."""
+import sqlite3
+from collections import namedtuple
+
+import pytest
+
+from dasf.column_groups import CORE, DOCS_AWS, FULL, IDENTITY, PROJECTED, PROJECTED_SUFFIX, group_columns, page, page_predicate_sql
+from dasf.engine import DASFEngine
+from dasf.functions import FUNCTIONS
+from dasf.schema import CONTROLS, detail_column_names
+
+Detail = namedtuple("Detail", ["id", "title", "link"])
+PagedDetail = namedtuple("PagedDetail", ["position", "total_count", *Detail._fields])
+ROWS = [Detail(f"C {i}", f"Control {i}", f"https://docs/{i}") for i in range(1, 8)]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DASFEngine.from_resources()
+
+
+def test_a_page_holds_limit_rows_after_the_offset_with_the_total_count():
+    rows = page(ROWS, PagedDetail, {"id", "title", "link"}, limit=3, offset=2)
+    assert [(r.position, r.total_count, r.id) for r in rows] == [(3, 7, "C 3"), (4, 7, "C 4"), (5, 7, "C 5")]
+
+
+def test_a_limit_of_zero_returns_every_row_from_the_offset():
+    assert [r.position for r in page(ROWS, PagedDetail, {"id"}, limit=0, offset=5)] == [6, 7]
+    assert len(page(ROWS, PagedDetail, {"id"}, limit=0)) == 7
+
+
+def test_pages_past_the_end_are_empty_and_negative_offsets_start_at_the_first_row():
+    assert page(ROWS, PagedDetail, {"id"}, limit=3, offset=7) == []
+    assert [r.position for r in page(ROWS, PagedDetail, {"id"}, limit=3, offset=-2)] == [1]
+
+
+def test_columns_outside_the_group_are_none():
+    row = page(ROWS, PagedDetail, {"id", "title"}, limit=1)[0]
+    assert (row.id, row.title, row.link) == ("C 1", "Control 1", None)
+
+
+def test_the_sql_predicate_keeps_the_rows_of_the_page():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE page (position INT)")
+    connection.executemany("INSERT INTO page VALUES (?)", [(position,) for position in range(1, 8)])
+
+    def kept(limit, offset):
+        predicate = page_predicate_sql("position", ":limit", ":offset")
+        return [position for (position,) in connection.execute(f"SELECT position FROM page WHERE {predicate} ORDER BY position", {"limit": limit, "offset": offset})]
+
+    assert kept(3, 2) == [3, 4, 5]
+    assert kept(0, 5) == [6, 7]
+    assert kept(3, 7) == []
+
+
+def test_groups_keep_the_identifying_columns():
+    assert set(IDENTITY[CONTROLS.table]) <= group_columns(CONTROLS, DOCS_AWS)
+    assert group_columns(CONTROLS, DOCS_AWS) == {"mitigation_control_id", "control", "databricks_documentation_aws"}
+    assert group_columns(CONTROLS, "FULL") == set(detail_column_names(CONTROLS))
+    assert group_columns(CONTROLS, CORE) < group_columns(CONTROLS, FULL)
+
+
+def test_the_engine_pages_a_lookup_in_id_order(engine):
+    controls = engine.databricks_ai_mitigation_controls_by_risk_id("Datasets 3.1")
+    full = engine.databricks_ai_mitigation_controls_by_risk_id_projected("Datasets 3.1", DOCS_AWS, 0, 0)
+    assert [r.position for r in full] == list(range(1, len(controls) + 1))
+    assert {r.total_count for r in full} == {len(controls)}
+    assert sorted(r.mitigation_control_id for r in full) == sorted(c.mitigation_control_id for c in controls)
+    second = engine.databricks_ai_mitigation_controls_by_risk_id_projected("Datasets 3.1", DOCS_AWS, 2, 2)
+    assert second == full[2:4]
+    assert all(r.databricks_documentation_aws and r.description is None for r in second)
+
+
+def test_every_projected_function_declares_int_positions_and_counts():
+    projected = {f.name: f for f in FUNCTIONS if f.name.endswith(PROJECTED_SUFFIX)}
+    assert set(projected) == {name + PROJECTED_SUFFIX for name in PROJECTED}
+    for function in projected.values():
+        assert [(c.name, c.type) for c in function.leading] == [("position", "INT"), ("total_count", "INT")]
+        assert "CAST(count(*) OVER () AS INT) AS total_count" in function.source
@@ -0,0 +1,50 @@
+"""Framework references exploded from the sheets into the crosswalk."""
+import pytest
+
+from dasf.crosswalk import RISK, RISK_FRAMEWORK_COLUMNS, build_crosswalk, framework_key, parse_references
+from dasf.engine import DASFEngine
+from dasf.sheets import load_controls, load_risks
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DASFEngine.from_resources()
+
+
+def test_cells_are_split_into_reference_ids():
+    assert parse_references("nist_800_53", "AC-2:Account Management,  AC-3:Access Enforcement, SI-7 (8)") == [
+        ("nist_800_53", "AC-2"),
+        ("nist_800_53", "AC-3"),
+        ("nist_800_53", "SI-7(8)"),
+    ]
+    # ATT&CK mitigations appear in the ATLAS column and are filed under ATT&CK
+    assert parse_references("mitre_atlas", "AML.T0020: Poison Training Data M1030 Network Segmentation") == [
+        ("mitre_atlas", "AML.T0020"),
+        ("mitre_attack", "M1030"),
+    ]
+    assert parse_references("owasp_llm", "No mapping") == []
+
+
+def test_a_risk_row_has_one_entry_per_reference_of_its_cells():
+    risks = load_risks()
+    risk = next(r for r in risks if r.risk_id == "Datasets 3.1")
+    entries = [e for e in build_crosswalk(risks, load_controls()) if e.entity_type == RISK and e.entity_id == risk.risk_id]
+    nist = sorted(reference for _, reference in parse_references("nist_800_53", getattr(risk, RISK_FRAMEWORK_COLUMNS["nist_800_53"])))
+    assert nist == ["AC-3", "AC-6", "CM-3", "PL-8", "SC-28", "SI-4", "SI-7", "SR-4", "SR-6"]
+    assert sorted(e.reference_id for e in entries if e.framework == "nist_800_53") == nist
+    assert {e.reference_id for e in entries if e.framework == "owasp_ml"} == {"ML02", "ML03", "ML04", "ML05", "ML07", "ML08", "ML09", "ML10"}
+    assert len(entries) == len(set(entries))
+
+
+def test_reverse_lookups_match_the_reference_and_the_references_below_it(engine):
+    family = {r.risk_id for r in engine.risks_in_ai_system_by_framework_reference("NIST 800-53", "ac")}
+    assert "Datasets 3.1" in family
+    assert {r.risk_id for r in engine.risks_in_ai_system_by_framework_reference("nist", "AC-3")} <= family
+    assert "Datasets 3.1" in {r.risk_id for r in engine.risks_in_ai_system_by_framework_reference("OWASP ML Top 10", "ml02")}
+    assert engine.risks_in_ai_system_by_framework_reference("nist", "ZZ-1") == []
+
+
+def test_framework_names_resolve_to_their_key():
+    assert framework_key("NIST 800-53") == "nist_800_53"
+    assert framework_key("MITRE ATT&CK") == "mitre_attack"
+    assert framework_key("ATLAS") == "mitre_atlas"
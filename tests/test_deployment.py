@@ -0,0 +1,38 @@
+"""Deployment model bitmasks of the risks."""
+import pytest
+
+from dasf.deployment import DEPLOYMENT_MODELS, deployment_model_names, deployment_model_risk_sets, deployment_models_mask, parse_deployment_models
+from dasf.sheets import load_risks
+
+
+@pytest.fixture(scope="module")
+def risks():
+    return load_risks()
+
+
+def test_the_mask_has_one_bit_per_yes_cell():
+    values = {m.source: "No" for m in DEPLOYMENT_MODELS}
+    values["RAG - LLMs"] = " yes "
+    values["External Models"] = "Yes"
+    assert deployment_models_mask(values) == 2 | 32
+    assert deployment_model_names(34) == ["rag_llms", "external_models"]
+
+
+def test_every_risk_mask_matches_its_yes_no_columns(risks):
+    for risk in risks:
+        expected = sum(m.bit for m in DEPLOYMENT_MODELS if getattr(risk, m.column) == "Yes")
+        assert risk.deployment_models_mask == expected, risk.risk_id
+
+
+def test_deployment_model_names_parse_to_a_mask():
+    assert parse_deployment_models("RAG, fine-tuned LLMs") == 6
+    assert parse_deployment_models("predictive and external") == 33
+    assert parse_deployment_models("") == 0
+    with pytest.raises(ValueError, match="Unknown deployment model"):
+        parse_deployment_models("RAG, quantum")
+
+
+def test_risk_sets_hold_the_risks_with_the_model_bit_set(risks):
+    for row in deployment_model_risk_sets(risks):
+        assert set(row.risk_ids) == {r.risk_id for r in risks if r.deployment_models_mask & row.deployment_model_bit}
+        assert row.risk_count == len(row.risk_ids)
@@ -0,0 +1,53 @@
+"""Lookups of the in-process engine against the shipped compendium TSVs."""
+import csv
+import os
+
+import pytest
+
+from dasf.engine import DASFEngine
+from dasf.ids import normalize_risk_id
+from dasf.schema import CONTROLS, RISKS
+from dasf.sheets import RESOURCES_DIR
+
+
+def _sheet(sheet):
+    with open(os.path.join(RESOURCES_DIR, sheet.file), encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DASFEngine.from_resources()
+
+
+def test_every_risk_of_the_sheet_is_found_by_its_id(engine):
+    rows = _sheet(RISKS)
+    assert len(engine.risks_in_ai_system_components()) == len(rows)
+    for row in rows:
+        risk_id = normalize_risk_id(row["Risk ID"])
+        found = engine.risks_in_ai_system_component_by_risk_id(risk_id)
+        assert [r.risk_id for r in found] == [risk_id]
+        assert found[0].risk == row["Risk"]
+
+
+def test_every_control_of_the_sheet_is_found_by_its_id(engine):
+    rows = _sheet(CONTROLS)
+    assert len(engine.databricks_ai_mitigation_controls()) == len(rows)
+    for row in rows:
+        found = engine.databricks_ai_mitigation_control_by_mitigation_control_id(row["Control ID"])
+        assert [c.mitigation_control_id for c in found] == [row["Control ID"]]
+        assert found[0].description == row["Description"]
+
+
+def test_mapping_lookups_agree_in_both_directions(engine):
+    for risk in engine.risks_in_ai_system_components():
+        for control in engine.databricks_ai_mitigation_controls_by_risk_id(risk.risk_id):
+            risks = engine.risks_in_ai_system_by_mitigation_controls_id(control.mitigation_control_id)
+            assert risk.risk_id in {r.risk_id for r in risks}
+
+
+def test_component_lookup_matches_the_component_prefix(engine):
+    risks = engine.risks_in_ai_system_for_component("Raw Data")
+    assert risks
+    assert all(r.risk_id.startswith("Raw Data ") for r in risks)
+
@@ -0,0 +1,89 @@
+"""Submission order and error handling of the generated UC function statements."""
+import threading
+
+import pytest
+
+from dasf.functions import FUNCTIONS, batch_statement, create_function_statement, statement_waves, submit_statements
+from dasf.resolve import RESOLVE_FUNCTION
+
+_UNSUPPORTED = "[PARSE_SYNTAX_ERROR] Syntax error at or near 'BEGIN'. SQLSTATE: 42601"
+
+
+def _created(statement):
+    return statement.split("(", 1)[0].split()[-1]
+
+
+class Runtime:
+    """Records the executed statements, optionally rejecting SQL scripts or failing a statement."""
+
+    def __init__(self, scripting=True, failing=None):
+        self.scripting = scripting
+        self.failing = failing
+        self.executed = []
+        self.lock = threading.Lock()
+
+    def __call__(self, statement):
+        if statement.startswith("BEGIN\n") and not self.scripting:
+            raise RuntimeError(_UNSUPPORTED)
+        if self.failing and self.failing in statement:
+            raise RuntimeError(f"[TABLE_OR_VIEW_NOT_FOUND] {self.failing}")
+        with self.lock:
+            self.executed.append(statement)
+
+
+@pytest.fixture(scope="module")
+def statements():
+    # Callers first, so only the dependency order puts dasf_resolve_entity before them
+    return [create_function_statement(f) for f in reversed(FUNCTIONS)]
+
+
+def _callers(statements):
+    return {_created(s) for s in statements if f"{RESOLVE_FUNCTION}(" in s and _created(s) != RESOLVE_FUNCTION}
+
+
+def test_functions_are_created_after_the_functions_they_call(statements):
+    waves = statement_waves(statements)
+    first = {_created(s) for s in waves[0]}
+    later = {_created(s) for wave in waves[1:] for s in wave}
+    assert RESOLVE_FUNCTION in first
+    assert "databricks_ai_mitigation_controls_by_risk_id" in _callers(statements)
+    assert _callers(statements) <= later
+    assert sorted(s for wave in waves for s in wave) == sorted(statements)
+
+
+def test_the_script_runs_the_waves_in_order(statements):
+    runtime = Runtime()
+    submit_statements(runtime, statements)
+    assert runtime.executed == [batch_statement([s for wave in statement_waves(statements) for s in wave])]
+
+
+def test_without_scripting_each_wave_runs_after_the_previous_one(statements):
+    runtime = Runtime(scripting=False)
+    submit_statements(runtime, statements, max_workers=8)
+    created = [_created(s) for s in runtime.executed]
+    assert sorted(created) == sorted(f.name for f in FUNCTIONS)
+    resolver = created.index(RESOLVE_FUNCTION)
+    assert all(created.index(name) > resolver for name in _callers(statements))
+
+
+def test_a_failing_statement_is_raised_without_rerunning_the_script(statements):
+    runtime = Runtime(failing="dasf_summary")
+    with pytest.raises(RuntimeError, match="TABLE_OR_VIEW_NOT_FOUND"):
+        submit_statements(runtime, statements)
+    assert runtime.executed == []
+
+
+def test_a_single_statement_is_not_wrapped_in_a_script():
+    runtime = Runtime(scripting=False)
+    submit_statements(runtime, ["SELECT 1"])
+    assert runtime.executed == ["SELECT 1"]
+
+
+def test_dependent_statements_form_waves_in_submission_order():
+    statements = [
+        "CREATE OR REPLACE FUNCTION c() RETURN b() + a()",
+        "CREATE OR REPLACE FUNCTION b() RETURN a()",
+        "CREATE OR REPLACE FUNCTION a() RETURN 1",
+        "CREATE OR REPLACE FUNCTION d() RETURN 2",
+    ]
+    assert statement_waves(statements) == [[statements[2], statements[3]], [statements[1]], [statements[0]]]
@@ -0,0 +1,60 @@
+"""Co-mitigation pairs and minimum control set covers of the risk/control graph."""
+from collections import namedtuple
+
+import pytest
+
+from dasf.engine import DASFEngine
+from dasf.graph import RiskControlGraph
+from dasf.ingest import local_tables
+from dasf.schema import MAPPING, RISKS
+
+Risk = namedtuple("Risk", ["risk_id"])
+Edge = namedtuple("Edge", ["risk_id", "mitigation_control_id"])
+
+# DASF 1 covers the most risks, but DASF 2 and DASF 3 cover all six together
+COVERS = {"DASF 1": (1, 2, 3, 4), "DASF 2": (1, 3, 5), "DASF 3": (2, 4, 6)}
+
+
+@pytest.fixture(scope="module")
+def graph():
+    risks = [Risk(f"Raw Data 1.{n}") for n in range(1, 8)]
+    edges = [Edge(f"Raw Data 1.{n}", control) for control, numbers in COVERS.items() for n in numbers]
+    return RiskControlGraph(risks, edges)
+
+
+def test_the_exact_cover_improves_on_the_greedy_cover(graph):
+    risk_ids = graph.risk_ids[:6]
+    greedy = graph.minimum_control_set(risk_ids, exact=False)
+    assert [step.mitigation_control_id for step in greedy.steps] == ["DASF 1", "DASF 2", "DASF 3"]
+    assert not greedy.optimal
+    exact = graph.minimum_control_set(risk_ids)
+    assert sorted(step.mitigation_control_id for step in exact.steps) == ["DASF 2", "DASF 3"]
+    assert exact.optimal and exact.uncovered_risk_ids == []
+    assert [step.covered_risk_count for step in exact.steps] == [3, 6]
+
+
+def test_risks_without_a_control_are_reported_uncovered(graph):
+    cover = graph.minimum_control_set(["Raw Data 1.5", "Raw Data 1.7"])
+    assert [step.mitigation_control_id for step in cover.steps] == ["DASF 2"]
+    assert cover.uncovered_risk_ids == ["Raw Data 1.7"]
+
+
+def test_related_risks_share_controls(graph):
+    related = {row.related_risk_id: row.shared_control_ids for row in graph.related_risks("Raw Data 1.1")}
+    assert related == {"Raw Data 1.2": ["DASF 1"], "Raw Data 1.3": ["DASF 1", "DASF 2"], "Raw Data 1.4": ["DASF 1"], "Raw Data 1.5": ["DASF 2"]}
+    assert graph.related_risks("Raw Data 1.7") == []
+
+
+def test_the_rag_cover_mitigates_every_mapped_rag_risk():
+    tables = local_tables()
+    engine = DASFEngine.from_resources()
+    graph = RiskControlGraph(tables[RISKS.table], tables[MAPPING.table])
+    mapped = {edge.risk_id for edge in tables[MAPPING.table]}
+    rag = {r.risk_id for r in engine.risks_for_deployment_models(2)}
+    steps = engine.dasf_minimum_control_set("RAG")
+    assert [step.rank for step in steps] == list(range(1, len(steps) + 1))
+    assert all(step.optimal and step.scope_risk_count == len(rag) for step in steps)
+    assert rag & mapped <= set(graph.risks_covered_by([step.mitigation_control_id for step in steps]))
+    # Every control adds risks the controls ranked before it leave uncovered
+    counts = [step.covered_risk_count for step in steps]
+    assert counts == sorted(set(counts)) and counts[-1] == len(rag & mapped)
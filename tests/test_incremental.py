@@ -0,0 +1,80 @@
+"""Fingerprints and keyed MERGEs of the incremental ingestion."""
+import shutil
+from collections import namedtuple
+
+from dasf import incremental
+from dasf.incremental import FINGERPRINT_PROPERTY, merge_statement, table_source_fingerprint
+from dasf.ingest import TABLE_SOURCES, TABLES, SparkBackend, table_fingerprints
+from dasf.metrics import StageMetrics
+from dasf.revisions import REVISION_TABLES
+from dasf.schema import CONTROLS, RISKS
+from dasf.sheets import RESOURCES_DIR
+
+Property = namedtuple("Property", ["key", "value"])
+
+
+class Catalog:
+    def __init__(self, properties):
+        self.properties = properties
+
+    def tableExists(self, table):
+        return table in self.properties
+
+
+class Spark:
+    """Answers the table lookups of SparkBackend from fingerprints stored by table name, and records the SQL it runs."""
+
+    def __init__(self, properties):
+        self.catalog = Catalog(properties)
+        self.statements = []
+
+    def sql(self, statement):
+        self.statements.append(statement)
+        table = statement.split()[-1]
+        return Result([Property(FINGERPRINT_PROPERTY, self.catalog.properties[table])])
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def collect(self):
+        return self.rows
+
+
+def test_merge_statement_applies_changed_rows_by_key():
+    statement = merge_statement(RISKS, "source_view", "main.dasf.risks", scope="target.revision = 'x'")
+    assert statement.startswith("MERGE INTO main.dasf.risks AS target\nUSING source_view AS source\nON target.risk_id <=> source.risk_id\n")
+    assert "WHEN MATCHED AND NOT (target.system_component <=> source.system_component AND " in statement
+    assert "target.risk_id <=> source.risk_id AND" not in statement
+    assert statement.endswith("WHEN NOT MATCHED THEN INSERT *\nWHEN NOT MATCHED BY SOURCE AND target.revision = 'x' THEN DELETE")
+
+
+def test_a_changed_sheet_changes_only_the_fingerprints_of_the_tables_built_from_it(tmp_path):
+    shutil.copytree(RESOURCES_DIR, tmp_path, dirs_exist_ok=True)
+    before = table_fingerprints(str(tmp_path))
+    assert table_fingerprints(str(tmp_path)) == before
+    with open(tmp_path / CONTROLS.file, "a", encoding="utf-8") as f:
+        f.write("\n")
+    after = table_fingerprints(str(tmp_path))
+    changed = {table for table in before if before[table] != after[table]}
+    assert changed == {table for table, files in TABLE_SOURCES.items() if CONTROLS.file in files}
+    assert RISKS.table not in changed
+
+
+def test_a_change_to_the_derivation_code_changes_every_fingerprint(monkeypatch):
+    before = table_source_fingerprint(RISKS, "0" * 64)
+    monkeypatch.setattr(incremental, "code_fingerprint", lambda: "1" * 64)
+    assert table_source_fingerprint(RISKS, "0" * 64) != before
+
+
+def test_a_second_run_over_unchanged_sheets_skips_every_table():
+    backend = SparkBackend(None, "main", "dasf")
+    fingerprints = table_fingerprints(RESOURCES_DIR)
+    stored = {backend.table_name(sheet): fingerprints[sheet.table] for sheet in TABLES}
+    stored.update({backend.table_name(sheet): None for sheet in REVISION_TABLES})
+    backend.spark = Spark(stored)
+    metrics = StageMetrics()
+    assert backend.ingest(RESOURCES_DIR, metrics) == set()
+    assert all(statement.startswith("SHOW TBLPROPERTIES ") for statement in backend.spark.statements)
+    assert [(r.stage, r.target, r.skipped) for r in metrics.records] == [("write", sheet.table, True) for sheet in TABLES]
@@ -0,0 +1,28 @@
+"""Parity of the Spark and local ingestion backends over the shipped compendium."""
+import pytest
+
+from dasf.ingest import TABLES, LocalBackend, _comparable, parity, spark_tables
+from dasf.sheets import RESOURCES_DIR
+
+pytest.importorskip("pyspark")
+
+
+@pytest.fixture(scope="module")
+def spark():
+    from pyspark.sql import SparkSession
+
+    session = SparkSession.builder.master("local[1]").appName("dasf-tests").getOrCreate()
+    yield session
+    session.stop()
+
+
+def test_spark_and_python_parsers_produce_the_same_tables(spark):
+    assert parity(spark, RESOURCES_DIR) == {}
+
+
+def test_local_backend_writes_the_rows_spark_derives(spark, tmp_path):
+    backend = LocalBackend(str(tmp_path), "jsonl")
+    backend.ingest(RESOURCES_DIR)
+    remote = spark_tables(spark, RESOURCES_DIR)
+    for sheet in TABLES:
+        assert _comparable(backend.read(sheet), sheet) == _comparable(remote[sheet.table], sheet), sheet.table
@@ -0,0 +1,51 @@
+"""Stage records of the ingestion metrics."""
+import json
+
+import pytest
+
+from dasf.ingest import TABLES, LocalBackend
+from dasf.metrics import StageMetrics
+from dasf.schema import CONTROLS, RISKS
+from dasf.sheets import RESOURCES_DIR
+
+
+def test_a_stage_records_its_counts_even_when_it_fails():
+    metrics = StageMetrics(run_id="run")
+    with metrics.stage("parse", "risks.tsv", rows_in=3) as stage:
+        stage.rows_out = 2
+        stage.bytes_written = 10
+    with pytest.raises(ValueError):
+        with metrics.stage("validate", "resources"):
+            raise ValueError("bad sheet")
+    metrics.skip("write", "risks", "unchanged")
+    parse, validate, write = metrics.records
+    assert (parse.run_id, parse.stage, parse.target, parse.rows_in, parse.rows_out, parse.bytes_written, parse.skipped) == ("run", "parse", "risks.tsv", 3, 2, 10, False)
+    assert parse.wall_ms >= 0
+    assert (validate.stage, validate.rows_out, validate.skipped) == ("validate", None, False)
+    assert (write.skipped, write.detail) == (True, "unchanged")
+    assert "(skipped)" in metrics.summary().splitlines()[2]
+
+
+def test_records_are_appended_to_a_json_lines_log(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    for run_id in ("first", "second"):
+        metrics = StageMetrics(run_id=run_id)
+        metrics.skip("copy", "volume")
+        metrics.write_json(str(path))
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["run_id"] for r in records] == ["first", "second"]
+    assert records[0]["started_at"].endswith("+00:00")
+
+
+def test_a_local_ingest_records_every_stage_with_its_row_counts(tmp_path):
+    metrics = StageMetrics()
+    LocalBackend(str(tmp_path), "jsonl").ingest(RESOURCES_DIR, metrics)
+    stages = [(r.stage, r.target) for r in metrics.records]
+    assert stages[:3] == [("validate", RESOURCES_DIR), ("parse", RISKS.file), ("parse", CONTROLS.file)]
+    assert {("write", sheet.table) for sheet in TABLES} <= set(stages)
+    validate, risks, controls = metrics.records[:3]
+    # The parse stages take the rows read from the validation instead of counting the sheets again
+    assert risks.rows_in == risks.rows_out and controls.rows_in == controls.rows_out
+    assert validate.rows_out == risks.rows_in + controls.rows_in
+    writes = [r for r in metrics.records if r.stage == "write"]
+    assert all(r.rows_out == r.rows_in and r.bytes_written is not None for r in writes)
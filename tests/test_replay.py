@@ -0,0 +1,86 @@
+"""Replays of the question set against the Genie routes of the local mock."""
+import pytest
+
+from dasf.benchmark import BENCHMARK_QUESTIONS, QUESTION_CALLS, read_questions
+from dasf.engine import DASFEngine
+from dasf.mock_server import MockWorkspace
+from dasf.replay import COMPLETED, GenieClient, Question, called_function, engine_answerer, load_question_set, question_set, replay, report
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DASFEngine.from_resources()
+
+
+@pytest.fixture(scope="module")
+def questions():
+    return load_question_set()
+
+
+def _client(workspace, **options):
+    return GenieClient(workspace.url, "space", "token", concurrency=4, backoff=0.01, poll_interval=0.01, max_poll_interval=0.02, **options)
+
+
+def test_the_question_set_carries_the_first_call_of_each_question(questions):
+    assert [q.text for q in questions] == read_questions()
+    for question in questions:
+        calls = QUESTION_CALLS[question.text]
+        assert (question.function, question.args) == (calls[0] if calls else (None, ()))
+    assert BENCHMARK_QUESTIONS[0] in {q.text for q in questions}
+
+
+def test_expanded_question_sets_ask_about_every_id_once(engine):
+    questions = load_question_set(expand=True, engine=engine)
+    assert len(questions) == len({q.text for q in questions})
+    asked = {q.args[0] for q in questions if q.function == "databricks_ai_mitigation_controls_by_risk_id"}
+    assert asked >= {r.risk_id for r in engine.risks if r.risk_id is not None}
+    assert question_set(["Who are you?", "Who are you?"]) == [Question("Who are you?", None, ())]
+
+
+def test_the_called_function_is_read_from_the_sql():
+    assert called_function("SELECT * FROM main.dasf.dasf_summary('total')") == "dasf_summary"
+    assert called_function("select id from `main`.`dasf`.`dasf_search_text` ('rag', 5)") == "dasf_search_text"
+    assert called_function("SELECT * FROM risks_in_ai_system_components") is None
+    assert called_function(None) is None
+
+
+def test_a_replay_answers_every_question_with_its_function(engine, questions):
+    with MockWorkspace(pending_polls=2, fail_requests=2, genie=engine_answerer(engine, questions)) as workspace:
+        results, elapsed = replay(_client(workspace), questions, repeat=2)
+        connections = len(workspace.connections)
+    assert [r.question for r in results] == [q.text for q in questions] * 2
+    assert all(r.status == COMPLETED for r in results), [r.error for r in results if r.error]
+    assert [r.function for r in results] == [q.function for q in questions] * 2
+    for result, question in zip(results, questions):
+        if question.function is not None:
+            assert result.rows == len(getattr(engine, question.function)(*question.args))
+            assert result.polls >= 2
+    summary = report(results, elapsed, connections)
+    assert summary["questions"] == 2 * len(questions)
+    assert summary["retries"] == 2
+    assert summary["failed"] == [] and summary["mismatched"] == []
+    assert summary["statuses"] == {COMPLETED: 2 * len(questions)}
+    assert 0 < summary["connections"] <= 4
+
+
+def test_an_answer_calling_another_function_is_a_regression(engine):
+    questions = [Question("How many risks are there?", "dasf_summary", ("total",))]
+    wrong = [Question("How many risks are there?", "risks_in_ai_system_components", ())]
+    with MockWorkspace(genie=engine_answerer(engine, wrong)) as workspace:
+        results, elapsed = replay(_client(workspace), questions)
+    assert results[0].function == "risks_in_ai_system_components"
+    assert [r["question"] for r in report(results, elapsed)["mismatched"]] == ["How many risks are there?"]
+
+
+def test_a_message_that_never_completes_times_out(engine, questions):
+    with MockWorkspace(pending_polls=1000, genie=engine_answerer(engine, questions)) as workspace:
+        results, elapsed = replay(_client(workspace, timeout=0.1), questions[:1])
+    assert results[0].status == "TIMEOUT"
+    assert report(results, elapsed)["failed"][0]["status"] == "TIMEOUT"
+
+
+def test_a_workspace_without_genie_fails_every_question(questions):
+    with MockWorkspace() as workspace:
+        results, _ = replay(_client(workspace, retries=0), questions[:2])
+    assert [r.status for r in results] == ["ERROR", "ERROR"]
+    assert all("HTTP 404" in r.error for r in results)
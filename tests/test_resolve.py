@@ -0,0 +1,52 @@
+"""Fuzzy resolution of risk and control names and ids."""
+import pytest
+
+from dasf.crosswalk import CONTROL, RISK
+from dasf.engine import DASFEngine
+from dasf.resolve import ID_FIELD, NAME_FIELD, EntityResolver, normalize_text
+from dasf.sheets import load_controls, load_risks
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return EntityResolver.from_tables(load_risks(), load_controls())
+
+
+def test_normalize_text_ignores_case_spacing_and_punctuation():
+    assert normalize_text("Raw-Data 1.1") == "raw data 1.1"
+    assert normalize_text("DASF1") == "dasf 1"
+    assert normalize_text("  Model   Serving — Inference requests 9.9 ") == "model serving inference requests 9.9"
+
+
+def test_an_id_resolves_to_itself_with_a_perfect_score(resolver):
+    best = resolver.resolve("raw data 1.1", 2)
+    assert (best[0].entity_id, best[0].field, best[0].score) == ("Raw Data 1.1", ID_FIELD, 1.0)
+    # Raw Data 1.10 shares most trigrams, but ranks below the exact id
+    assert best[1].entity_id == "Raw Data 1.10" and best[1].score < 1.0
+    assert resolver.resolve_id("dasf1", CONTROL) == "DASF 1"
+
+
+def test_an_id_resolves_only_within_its_entity_type(resolver):
+    assert resolver.resolve_id("raw data 1.1", CONTROL) is None
+
+
+def test_misspelled_names_resolve_to_ranked_candidates(resolver):
+    candidates = resolver.resolve("data poisening", 3, RISK)
+    assert [c.rank for c in candidates] == [1, 2, 3]
+    assert candidates[0].entity_id == "Datasets 3.1"
+    assert candidates[0].field == NAME_FIELD
+    assert [c.score for c in candidates] == sorted((c.score for c in candidates), reverse=True)
+    assert resolver.resolve_name("missing data clasification", RISK) == "Raw Data 1.2"
+
+
+def test_names_scoring_below_the_threshold_do_not_resolve(resolver):
+    assert resolver.resolve_name("zzzz qqq", RISK) is None
+
+
+def test_engine_lookups_by_id_resolve_ids_differing_in_case_and_spacing():
+    engine = DASFEngine.from_resources()
+    assert [r.risk_id for r in engine.risks_in_ai_system_component_by_risk_id("raw data 1.1")] == ["Raw Data 1.1"]
+    assert [c.mitigation_control_id for c in engine.databricks_ai_mitigation_control_by_mitigation_control_id("dasf1")] == ["DASF 1"]
+    assert engine.databricks_ai_mitigation_controls_by_risk_id("raw data 1.1") == engine.databricks_ai_mitigation_controls_by_risk_id("Raw Data 1.1")
+    assert engine.risks_in_ai_system_by_mitigation_controls_id("dasf1") == engine.risks_in_ai_system_by_mitigation_controls_id("DASF 1")
+    assert engine.databricks_ai_mitigation_controls_by_risk_id("Raw Data 99.9") == []
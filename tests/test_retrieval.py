@@ -0,0 +1,111 @@
+"""BM25 retrieval over synthetic descriptions and over the shipped compendium."""
+from collections import namedtuple
+
+import pytest
+
+from dasf.crosswalk import CONTROL, RISK
+from dasf.ingest import local_tables
+from dasf.retrieval import RetrievalIndex, analyze, chunk_text, idf, text_chunks, text_postings
+from dasf.schema import CONTROLS, RISKS
+
+Risk = namedtuple("Risk", ["risk_id", "risk_description", "nist_800_53_controls_mapping_rationale"])
+Control = namedtuple("Control", ["mitigation_control_id", "description"])
+
+SYNTHETIC_RISKS = [
+    Risk("R 1", "Prompt injection hides instructions in retrieved documents.", None),
+    Risk("R 2", "Prompt injection in user input overrides the system prompt of a model serving endpoint with many other words.", None),
+    Risk("R 3", "Training data is poisoned by an attacker.", "Integrity checks detect tampered data."),
+]
+SYNTHETIC_CONTROLS = [
+    Control("C 1", "Scan retrieved documents for injection before adding them to the prompt."),
+    Control("C 2", "Encrypt data at rest."),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return RetrievalIndex.from_tables(SYNTHETIC_RISKS, SYNTHETIC_CONTROLS)
+
+
+@pytest.fixture(scope="module")
+def compendium():
+    tables = local_tables()
+    return RetrievalIndex.from_tables(tables[RISKS.table], tables[CONTROLS.table])
+
+
+def test_analyze_drops_stopwords_and_one_character_tokens():
+    assert analyze("What is a Prompt-Injection through the RAG?") == ["prompt", "injection", "rag"]
+
+
+def test_chunks_keep_whole_sentences_and_split_long_ones():
+    assert chunk_text("One two three. Four five. Six.", max_words=3) == ["One two three.", "Four five. Six."]
+    assert chunk_text("a b c d e f g", max_words=3) == ["a b c", "d e f", "g"]
+    assert chunk_text(None) == []
+
+
+def test_every_text_field_is_chunked_and_empty_ones_are_dropped():
+    chunks = text_chunks(SYNTHETIC_RISKS, SYNTHETIC_CONTROLS)
+    assert [(c.entity_type, c.entity_id, c.field) for c in chunks] == [
+        (RISK, "R 1", "risk_description"),
+        (RISK, "R 2", "risk_description"),
+        (RISK, "R 3", "risk_description"),
+        (RISK, "R 3", "nist_800_53_controls_mapping_rationale"),
+        (CONTROL, "C 1", "description"),
+        (CONTROL, "C 2", "description"),
+    ]
+    assert [c.chunk_id for c in chunks] == list(range(len(chunks)))
+
+
+def test_rarer_terms_weigh_more():
+    assert idf(1, 10) > idf(5, 10) > idf(10, 10) > 0
+    postings = {(p.term, p.chunk_id): p.weight for p in text_postings(text_chunks(SYNTHETIC_RISKS, SYNTHETIC_CONTROLS))}
+    # "poisoned" is in one chunk and "injection" in three, both once in chunks of similar length
+    assert postings[("poisoned", 2)] > postings[("injection", 0)]
+
+
+def test_a_chunk_scores_the_sum_of_its_query_terms_weights(index):
+    postings = text_postings(index.chunks)
+    scores = index.chunk_scores("prompt injection")
+    for chunk_id, score in scores.items():
+        expected = sum(p.weight for p in postings if p.chunk_id == chunk_id and p.term in ("prompt", "injection"))
+        assert score == pytest.approx(expected)
+    assert set(scores) == {0, 1, 4}
+
+
+def test_the_shorter_description_with_the_same_terms_ranks_first(index):
+    results = index.search("prompt injection", k=2, entity_type=RISK)
+    assert [r.entity_id for r in results] == ["R 1", "R 2"]
+    assert results[0].score > results[1].score
+    assert [r.rank for r in results] == [1, 2]
+
+
+def test_matching_more_query_terms_ranks_higher(index):
+    results = index.search("prompt injection retrieved documents")
+    assert [(r.entity_type, r.entity_id) for r in results[:2]] == [(RISK, "R 1"), (CONTROL, "C 1")]
+    assert index.search("prompt injection", entity_type=CONTROL)[0].entity_id == "C 1"
+
+
+def test_each_entity_is_returned_once_with_its_best_chunk(index):
+    results = index.search("data", k=10)
+    assert [r.entity_id for r in results].count("R 3") == 1
+    assert {r.entity_id for r in results} == {"R 3", "C 2"}
+
+
+def test_unknown_terms_and_non_positive_k_find_nothing(index):
+    assert index.search("kubernetes") == []
+    assert index.search("prompt", k=0) == []
+    with pytest.raises(ValueError):
+        index.chunk_scores("prompt", method="keyword")
+
+
+def test_a_saved_index_searches_like_the_built_one(index, tmp_path):
+    loaded = RetrievalIndex.load(index.save(str(tmp_path / "index")))
+    for query in ("prompt injection retrieved documents", "data", "encrypt"):
+        assert loaded.search(query, k=10) == index.search(query, k=10)
+
+
+def test_prompt_injection_questions_find_prompt_injection_risks(compendium):
+    results = compendium.search("prompt injection through retrieved documents", k=5)
+    assert len(results) == 5
+    assert all("inject" in r.text.lower() for r in results[:3])
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
@@ -0,0 +1,69 @@
+"""Revision planning over one, two and amended compendium revisions."""
+import pytest
+
+from dasf.crosswalk import CONTROL, RISK
+from dasf.revisions import ADDED, MODIFIED, REMOVED, RevisionHistory, compendium_rows, plan_revision
+from dasf.sheets import load_controls, load_risks
+
+
+@pytest.fixture(scope="module")
+def sheets():
+    return load_risks(), load_controls()
+
+
+def test_a_single_revision_has_no_diffs(sheets):
+    risks, controls = sheets
+    update = plan_revision(RevisionHistory(), *compendium_rows(risks, controls))
+    assert update.revision == "DASF v 2.0"
+    assert [entry.revision for entry in update.revisions] == ["DASF v 2.0"]
+    assert update.revisions[0].previous_revision is None
+    assert (update.revisions[0].risk_count, update.revisions[0].control_count) == (len(risks), len(controls))
+    assert update.diffs == []
+    assert update.diff_revisions == []
+
+
+def test_an_unchanged_revision_plans_nothing(sheets):
+    risks, controls = sheets
+    history = RevisionHistory.from_compendium(risks, controls)
+    assert plan_revision(history, *compendium_rows(risks, controls)) is None
+
+
+def test_a_second_revision_is_diffed_against_the_first(sheets):
+    risks, controls = sheets
+    history = RevisionHistory.from_compendium(risks, controls, "DASF v 1.0")
+    edited = [r._replace(risk_name="Renamed") if r.risk_id == "Raw Data 1.1" else r for r in risks if r.risk_id != "Raw Data 1.2"]
+    added = controls + [controls[0]._replace(mitigation_control_id="DASF 99")]
+    update = plan_revision(history, *compendium_rows(edited, added, "DASF v 2.0"))
+    assert [(e.revision, e.previous_revision) for e in update.revisions] == [("DASF v 1.0", None), ("DASF v 2.0", "DASF v 1.0")]
+    assert update.diff_revisions == ["DASF v 2.0"]
+    changes = {(d.entity_type, d.entity_id, d.change, d.field) for d in update.diffs}
+    assert changes == {
+        (RISK, "Raw Data 1.1", MODIFIED, "risk_name"),
+        (RISK, "Raw Data 1.2", REMOVED, ""),
+        (CONTROL, "DASF 99", ADDED, ""),
+    }
+    renamed = next(d for d in update.diffs if d.change == MODIFIED)
+    assert (renamed.previous_value, renamed.value) == ("Insufficient access controls", "Renamed")
+
+
+def test_an_earlier_revision_landing_late_rediffs_the_next_one(sheets):
+    risks, controls = sheets
+    history = RevisionHistory.from_compendium(risks, controls, "DASF v 2.0")
+    update = plan_revision(history, *compendium_rows(risks[1:], controls, "DASF v 1.0"))
+    assert [e.revision for e in update.revisions] == ["DASF v 1.0", "DASF v 2.0"]
+    assert update.diff_revisions == ["DASF v 2.0"]
+    assert [(d.revision, d.entity_id, d.change) for d in update.diffs] == [("DASF v 2.0", risks[0].risk_id, ADDED)]
+
+
+def test_an_edited_compendium_under_the_same_revision_is_filed_as_an_amendment(sheets):
+    risks, controls = sheets
+    history = RevisionHistory.from_compendium(risks, controls)
+    edited = [r._replace(risk_name="Renamed") if r.risk_id == "Raw Data 1.1" else r for r in risks]
+    update = history.ingest(edited, controls)
+    assert update.revision == "DASF v 2.0 (amendment 1)"
+    assert [(d.previous_revision, d.entity_id, d.field) for d in update.diffs] == [("DASF v 2.0", "Raw Data 1.1", "risk_name")]
+    assert {row.compendium_revision for row in update.rows[RISK]} == {"DASF v 2.0 (amendment 1)"}
+    # The original rows are kept, and the amended compendium is not filed twice
+    assert history.rows(RISK, "DASF v 2.0", ["Raw Data 1.1"])["Raw Data 1.1"].risk_name == "Insufficient access controls"
+    assert history.ingest(edited, controls) is None
+    assert history.ingest(risks, controls).revision == "DASF v 2.0 (amendment 2)"
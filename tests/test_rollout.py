@@ -0,0 +1,107 @@
+"""Rollouts against the local mock of the SQL Statement Execution and Files APIs."""
+import os
+import shutil
+
+import pytest
+
+from dasf.functions import FUNCTIONS
+from dasf.ingest import TABLES
+from dasf.mock_server import MockWorkspace
+from dasf.revisions import REVISION_TABLES
+from dasf.rollout import StatementClient, Target, deploy_target, plan_rollout, rollout
+from dasf.schema import CHANGE_LOG, CONTROLS, RISKS
+from dasf.sheets import RESOURCES_DIR
+from dasf.validate import ValidationError
+
+
+@pytest.fixture(scope="module")
+def plan():
+    return plan_rollout()
+
+
+def _target(workspace, schema="dasf"):
+    return Target(workspace.url, "main", schema, "files", "warehouse", "token")
+
+
+def _client(workspace):
+    return StatementClient(workspace.url, "warehouse", "token", retries=5, backoff=0.01, poll_interval=0.01)
+
+
+def test_a_first_deploy_writes_everything_and_a_second_one_is_skipped(plan):
+    with MockWorkspace(pending_polls=1) as workspace:
+        client, target = _client(workspace), _target(workspace)
+        first = deploy_target(client, target, plan)
+        assert first.state == "succeeded", first.error
+        assert set(first.tables_written) == {sheet.table for sheet in TABLES + REVISION_TABLES} | {CHANGE_LOG.table}
+        assert set(first.functions_deployed) == {f.name for f in FUNCTIONS}
+        assert {RISKS.file, CONTROLS.file} <= {os.path.basename(path) for path in workspace.files}
+
+        second = deploy_target(client, target, plan)
+        assert second.state == "succeeded", second.error
+        # The mock keeps no rows, so only the revision tables (which compare rows, not fingerprints) are written again
+        assert set(second.tables_written) == {sheet.table for sheet in REVISION_TABLES}
+        assert second.functions_deployed == []
+        assert second.statements < first.statements
+
+
+def test_the_change_log_records_every_risk_and_control_as_inserted(plan):
+    with MockWorkspace() as workspace:
+        deploy_target(_client(workspace), _target(workspace), plan)
+    merges = [s for _, _, s in workspace.statements if s.startswith("MERGE INTO") and CHANGE_LOG.table in s.split("\n")[0]]
+    assert len(merges) == 1
+    assert merges[0].count("'insert'") == len(plan.rows["risk"]) + len(plan.rows["control"])
+
+
+def test_forcing_a_deploy_rewrites_the_unchanged_tables(plan):
+    with MockWorkspace() as workspace:
+        client, target = _client(workspace), _target(workspace)
+        deploy_target(client, target, plan)
+        forced = deploy_target(client, target, plan, force=True)
+    assert {sheet.table for sheet in TABLES} <= set(forced.tables_written)
+    assert set(forced.functions_deployed) == {f.name for f in FUNCTIONS}
+
+
+def test_transient_failures_are_retried(plan):
+    with MockWorkspace(fail_requests=3) as workspace:
+        status = deploy_target(_client(workspace), _target(workspace), plan)
+    assert status.state == "succeeded", status.error
+    assert status.retries == 3
+
+
+def test_a_target_fails_once_its_retries_are_spent(plan):
+    with MockWorkspace(fail_requests=100) as workspace:
+        client = StatementClient(workspace.url, "warehouse", "token", retries=1, backoff=0.01, poll_interval=0.01)
+        status = deploy_target(client, _target(workspace), plan)
+    assert status.state == "failed"
+    assert status.error
+
+
+def test_targets_are_deployed_concurrently_and_in_order():
+    with MockWorkspace() as workspace:
+        targets = [_target(workspace, schema) for schema in ("dasf_a", "dasf_b", "dasf_c")]
+        statuses = rollout(targets, max_workers=3, backoff=0.01, poll_interval=0.01)
+    assert [status.schema for status in statuses] == ["dasf_a", "dasf_b", "dasf_c"]
+    assert all(status.state == "succeeded" for status in statuses)
+
+
+def test_a_compendium_that_fails_validation_is_not_rolled_out(tmp_path):
+    for sheet in (RISKS, CONTROLS):
+        shutil.copy(os.path.join(RESOURCES_DIR, sheet.file), tmp_path / sheet.file)
+    # A renamed header column is a validation error
+    path = tmp_path / RISKS.file
+    header, rest = path.read_text(encoding="utf-8").split("\n", 1)
+    columns = header.split("\t")
+    columns[1] = "Component"
+    path.write_text("\t".join(columns) + "\n" + rest, encoding="utf-8")
+    with MockWorkspace() as workspace:
+        with pytest.raises(ValidationError):
+            rollout([_target(workspace)], str(tmp_path), backoff=0.01, poll_interval=0.01)
+    assert workspace.requests == 0
+
+
+def test_the_revision_tables_are_created_on_the_first_deploy(plan):
+    with MockWorkspace() as workspace:
+        deploy_target(_client(workspace), _target(workspace), plan)
+    created = [s for _, _, s in workspace.statements if s.startswith("CREATE")]
+    for sheet in REVISION_TABLES:
+        assert any(f"main.dasf.{sheet.table} " in s or f"main.dasf.{sheet.table}(" in s for s in created)
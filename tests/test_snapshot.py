@@ -0,0 +1,71 @@
+"""Snapshot write, memory-map and lazy decoding round trips over the shipped compendium."""
+import pytest
+
+from dasf.ingest import local_tables
+from dasf.schema import CONTROLS, MAPPING, RISKS
+from dasf.snapshot import MAGIC, NULL_CODE, SNAPSHOT_FILE, Snapshot, SnapshotRecord, write_snapshot
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return local_tables()
+
+
+@pytest.fixture(scope="module")
+def snapshot(tables, tmp_path_factory):
+    with Snapshot.open(write_snapshot(str(tmp_path_factory.mktemp("snapshot") / SNAPSHOT_FILE), tables)) as snapshot:
+        yield snapshot
+
+
+@pytest.mark.parametrize("sheet", [RISKS, CONTROLS, MAPPING], ids=lambda sheet: sheet.table)
+def test_every_row_decodes_to_the_parsed_row(snapshot, tables, sheet):
+    table = snapshot.table(sheet)
+    rows = tables[sheet.table]
+    assert len(table) == len(rows)
+    assert table.columns == tuple(c.name for c in sheet.columns if c.name is not None)
+    for index, row in enumerate(rows):
+        assert tuple(table.row(index)) == tuple(getattr(row, name) for name in table.columns)
+
+
+def test_records_decode_fields_by_name_and_position(snapshot, tables):
+    record, row = snapshot.risks[-1], tables[RISKS.table][-1]
+    assert isinstance(record, SnapshotRecord)
+    assert record.risk_id == row.risk_id and record[0] == getattr(row, snapshot.risks.columns[0])
+    assert record == snapshot.risks.row(len(snapshot.risks) - 1)
+    assert record._asdict()["risk_name"] == row.risk_name
+    with pytest.raises(AttributeError):
+        record.no_such_column
+    with pytest.raises(IndexError):
+        snapshot.risks[len(snapshot.risks)]
+
+
+def test_equal_strings_share_one_code(snapshot):
+    pool = snapshot.pool
+    strings = [pool[code] for code in range(len(pool))]
+    assert strings == sorted(strings, key=lambda s: s.encode("utf-8"))
+    assert len(set(strings)) == len(strings)
+    assert pool.code("DASF 1") is not None and pool[pool.code("DASF 1")] == "DASF 1"
+    assert pool.code("no such string") is None
+    assert pool.code(None) == NULL_CODE
+
+
+def test_lookups_join_through_the_mapping(snapshot, tables):
+    assert snapshot.risk("Datasets 3.1").risk_id == "Datasets 3.1"
+    assert snapshot.control("DASF 1").mitigation_control_id == "DASF 1"
+    assert snapshot.risk("no such risk") is None
+    mapping = tables[MAPPING.table]
+    expected = {e.mitigation_control_id for e in mapping if e.risk_id == "Datasets 3.1"}
+    assert {c.mitigation_control_id for c in snapshot.controls_for_risk("Datasets 3.1")} == expected
+    expected = {e.risk_id for e in mapping if e.mitigation_control_id == "DASF 1"}
+    assert {r.risk_id for r in snapshot.risks_for_control("DASF 1")} == expected
+    assert snapshot.controls_for_risk("no such risk") == []
+
+
+def test_a_file_that_is_not_a_snapshot_is_rejected(tmp_path):
+    path = tmp_path / SNAPSHOT_FILE
+    path.write_bytes(MAGIC + b"\0" * 64)
+    with pytest.raises(ValueError):
+        Snapshot.open(str(path))
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        Snapshot.open(str(path))
@@ -0,0 +1,80 @@
+"""Precomputed counts of synthetic rows and of the shipped compendium."""
+from collections import Counter, namedtuple
+
+import pytest
+
+from dasf.crosswalk import CONTROL, RISK
+from dasf.deployment import DEPLOYMENT_MODELS
+from dasf.engine import DASFEngine
+from dasf.ingest import local_tables
+from dasf.schema import RISKS
+from dasf.summary import CONTROLS_PER_RISK, RISKS_PER_CONTROL, TOTAL, dimension_key, summary_rows
+
+Risk = namedtuple("Risk", ["risk_id", "system_component", "ai_novelty", "deployment_models_mask"])
+Control = namedtuple("Control", ["mitigation_control_id", "security_control_type", "databricks_shared_responsibility", "ai_system_novelty"])
+Edge = namedtuple("Edge", ["risk_id", "mitigation_control_id"])
+
+SYNTHETIC_RISKS = [
+    Risk("R 1", "Data operations", "Novel", 1),
+    Risk("R 2", "Data  operations", "Novel", 3),
+    Risk("R 3", "data operations", "Traditional", None),
+    Risk("R 4", "Model operations", "Novel", 2),
+    Risk(None, "Model operations", "Novel", 1),
+]
+SYNTHETIC_CONTROLS = [
+    Control("C 1", "Out-of-the-box", "Databricks", "Novel AI Control/Capability"),
+    Control("C 2", "Configuration", "Customer", "Novel AI control/capability"),
+    Control("C 3", "Configuration", "Customer", "Traditional"),
+]
+SYNTHETIC_MAPPING = [Edge("R 1", "C 1"), Edge("R 1", "C 2"), Edge("R 2", "C 1")]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return summary_rows(SYNTHETIC_RISKS, SYNTHETIC_CONTROLS, SYNTHETIC_MAPPING)
+
+
+def _dimension(rows, dimension):
+    return [(r.value, r.position, r.entity_count, r.share) for r in rows if r.dimension == dimension]
+
+
+def test_the_totals_come_first_in_risk_control_mapping_order(rows):
+    assert [(r.entity_type, r.entity_count, r.share) for r in rows[:3]] == [(RISK, 4, 1.0), (CONTROL, 3, 1.0), ("mapping", 3, None)]
+    assert all(r.dimension == TOTAL for r in rows[:3])
+    assert [r.dimension for r in rows[3:]] == sorted(r.dimension for r in rows[3:])
+
+
+def test_spelling_variants_are_counted_under_the_most_frequent_one(rows):
+    assert _dimension(rows, "system_component") == [("Data operations", 1, 3, 0.75), ("Model operations", 2, 1, 0.25)]
+    assert _dimension(rows, "ai_system_novelty") == [
+        ("Novel AI Control/Capability", 1, 2, 0.6667),
+        ("Traditional", 2, 1, 0.3333),
+    ]
+
+
+def test_deployment_models_count_the_risks_of_their_bit(rows):
+    expected = [(m.source, sum(1 for r in SYNTHETIC_RISKS[:4] if (r.deployment_models_mask or 0) & m.bit)) for m in DEPLOYMENT_MODELS]
+    assert [(value, count) for value, _, count, _ in _dimension(rows, "deployment_model")] == expected
+
+
+def test_the_degree_distributions_count_unmapped_entities_as_zero(rows):
+    assert [(value, count) for value, _, count, _ in _dimension(rows, CONTROLS_PER_RISK)] == [("0", 2), ("1", 1), ("2", 1)]
+    assert [(value, count) for value, _, count, _ in _dimension(rows, RISKS_PER_CONTROL)] == [("0", 1), ("1", 1), ("2", 1)]
+
+
+def test_dimension_names_are_normalized():
+    assert dimension_key(" Deployment  Model") == "deployment_model"
+    assert dimension_key("SYSTEM_COMPONENT") == "system_component"
+    assert dimension_key(None) == ""
+
+
+def test_the_compendium_counts_match_its_rows():
+    risks = local_tables()[RISKS.table]
+    engine = DASFEngine.from_resources()
+    by_component = engine.dasf_summary("System component")
+    assert sum(r.entity_count for r in by_component) == engine.dasf_summary(TOTAL)[0].entity_count == len(risks)
+    counted = Counter(" ".join(r.system_component.split()).lower() for r in risks)
+    assert {r.value.lower(): r.entity_count for r in by_component} == counted
+    assert [r.entity_count for r in by_component] == sorted((r.entity_count for r in by_component), reverse=True)
+    assert engine.dasf_summary() == engine.dasf_summary(TOTAL) + [r for r in engine.dasf_summary() if r.dimension != TOTAL]
+    assert engine.dasf_summary("unknown") == []
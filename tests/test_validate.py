@@ -0,0 +1,94 @@
+"""Validation of the shipped compendium and of corrupted copies of its sheets."""
+import csv
+import os
+import shutil
+
+import pytest
+
+from dasf.schema import CONTROLS, RISKS
+from dasf.sheets import RESOURCES_DIR
+from dasf.validate import ERROR, WARNING, ValidationError, validate_resources
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f, delimiter="\t"))
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, delimiter="\t", lineterminator="\n").writerows(rows)
+
+
+@pytest.fixture
+def resources(tmp_path):
+    for sheet in (RISKS, CONTROLS):
+        shutil.copy(os.path.join(RESOURCES_DIR, sheet.file), tmp_path / sheet.file)
+    return tmp_path
+
+
+def _corrupt(resources, sheet, change):
+    path = resources / sheet.file
+    rows = _read(path)
+    change(rows)
+    _write(path, rows)
+
+
+def _checks(report, severity=ERROR):
+    return {(f.check, f.file, f.line) for f in report.findings if f.severity == severity}
+
+
+def test_the_shipped_compendium_passes_with_warnings_only():
+    report = validate_resources(RESOURCES_DIR)
+    assert report.ok
+    assert report.rows == {RISKS.file: 62, CONTROLS.file: 64}
+    assert {f.check for f in report.warnings} <= {"dangling_reference", "sheet_disagreement"}
+    report.raise_for_errors()
+
+
+def test_an_unchanged_copy_has_the_findings_of_the_original(resources):
+    assert validate_resources(str(resources)).findings == validate_resources(RESOURCES_DIR).findings
+
+
+def test_a_renamed_header_is_an_error(resources):
+    _corrupt(resources, RISKS, lambda rows: rows[0].__setitem__(1, "Component"))
+    report = validate_resources(str(resources))
+    assert ("header", RISKS.file, 1) in _checks(report)
+    with pytest.raises(ValidationError) as raised:
+        report.raise_for_errors()
+    assert raised.value.report is report
+
+
+def test_duplicate_and_malformed_ids_are_errors(resources):
+    def change(rows):
+        rows[2][0] = rows[1][0]
+        rows[3][0] = "Bogus"
+
+    _corrupt(resources, RISKS, change)
+    checks = _checks(validate_resources(str(resources)))
+    assert {("duplicate_key", RISKS.file, 2), ("duplicate_key", RISKS.file, 3), ("malformed_id", RISKS.file, 4)} <= checks
+
+
+def test_a_deployment_model_cell_must_be_yes_or_no(resources):
+    column = _read(os.path.join(RESOURCES_DIR, RISKS.file))[0].index("RAG - LLMs")
+    _corrupt(resources, RISKS, lambda rows: rows[5].__setitem__(column, "Maybe"))
+    assert ("yes_no", RISKS.file, 6) in _checks(validate_resources(str(resources)))
+
+
+def test_a_ragged_row_is_an_error(resources):
+    _corrupt(resources, CONTROLS, lambda rows: rows[1].pop())
+    assert ("row_width", CONTROLS.file, 2) in _checks(validate_resources(str(resources)))
+
+
+def test_a_dangling_control_reference_is_a_warning_unless_strict(resources):
+    column = _read(os.path.join(RESOURCES_DIR, RISKS.file))[0].index("Mitigation Controls IDs")
+    _corrupt(resources, RISKS, lambda rows: rows[1].__setitem__(column, rows[1][column] + ", DASF 999"))
+    assert ("dangling_reference", RISKS.file, 2) in _checks(validate_resources(str(resources)), WARNING)
+    assert ("dangling_reference", RISKS.file, 2) in _checks(validate_resources(str(resources), strict=True))
+
+
+def test_a_missing_sheet_is_an_error(resources):
+    os.remove(resources / CONTROLS.file)
+    report = validate_resources(str(resources))
+    assert not report.ok
+    assert ("header", CONTROLS.file, None) in _checks(report)